@@ -3,10 +3,10 @@ from celery import Celery
 from django.conf import settings
 
 # Установите переменную окружения для Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'your_project.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 # Создаем экземпляр Celery
-app = Celery('your_project')
+app = Celery('app')
 
 # Загружаем конфигурацию из settings.py
 app.config_from_object('django.conf:settings', namespace='CELERY')
@@ -21,4 +21,12 @@ app.conf.beat_schedule = {
         'schedule': 86400,  # Каждые 24 часа (в секундах)
         'args': (False,),
     },
+    'sync-wb-products': {
+        'task': 'wb_api.tasks.sync_wb_products_task',
+        'schedule': 900,  # Каждые 15 минут: забираются только изменения с прошлого запуска
+    },
+    'sync-wb-orders': {
+        'task': 'wb_api.tasks.sync_wb_orders_task',
+        'schedule': 300,  # Каждые 5 минут по курсору updatedAt
+    },
 }
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""
+Компактное колоночное хранилище каталога для аналитики.
+
+Список вложенных dict из ProductSchema.dict() занимает килобайты на товар.
+ProductColumns хранит фиксированные поля в типизированных массивах array
+(8 байт на значение), строки интернируются, а остатки по складам лежат в
+CSR-раскладке: склады товара i - stock_warehouse[stock_offsets[i]:stock_offsets[i + 1]].
+
+Фильтры и агрегаты выполняются векторно через NumPy, если он установлен
+(массивы передаются без копирования через numpy.frombuffer), иначе -
+циклами по массивам.
+"""
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from wb_api.client.models.schemas import ProductListSchema
+from wb_api.client.validation import rehydrate
+from wb_api.models import WBProduct
+from wb_api.sync import BRAND_ATTRIBUTES
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NO_CATEGORY = -1
+
+
+def _category_id(value) -> int:
+    if value in (None, ''):
+        return NO_CATEGORY
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return NO_CATEGORY
+
+
+class ProductColumns:
+    """
+    Колонки каталога товаров.
+
+    Строится из ответа API (from_schema, from_data) или из WBProduct
+    (from_queryset); цена и скидка берутся по первой цене товара.
+    """
+
+    def __init__(self):
+        self.product_id: List[str] = []
+        self.name: List[str] = []
+        self.brand: List[str] = []
+        self.price = array('d')
+        self.discount = array('d')
+        self.category_id = array('q')
+        self.total_stock = array('q')
+        self.stock_offsets = array('q', [0])
+        self.stock_warehouse = array('q')
+        self.stock_amount = array('q')
+
+    def __len__(self):
+        return len(self.product_id)
+
+    def append(self, product_id: str, name: str, price: float, discount: float, category_id: int,
+               brand: str = '', stocks: Iterable[Tuple[int, int]] = ()):
+        self.product_id.append(product_id)
+        self.name.append(sys.intern(name))
+        self.brand.append(sys.intern(brand))
+        self.price.append(price)
+        self.discount.append(discount)
+        self.category_id.append(category_id)
+        total = 0
+        for warehouse_id, amount in stocks:
+            self.stock_warehouse.append(warehouse_id)
+            self.stock_amount.append(amount)
+            total += amount
+        self.stock_offsets.append(len(self.stock_warehouse))
+        self.total_stock.append(total)
+
+    @classmethod
+    def from_schema(cls, products) -> 'ProductColumns':
+        """Из ProductListSchema или последовательности ProductSchema (в т.ч. собранных в режиме trusted)"""
+        if isinstance(products, ProductListSchema):
+            products = products.items
+        columns = cls()
+        for product in products:
+            price = product.prices[0] if product.prices else None
+            brand = next((a.value for a in product.attributes if a.name.lower() in BRAND_ATTRIBUTES), '')
+            columns.append(
+                product.product_id,
+                product.name,
+                float(price.price) if price else 0.0,
+                float(price.discount or 0) if price else 0.0,
+                _category_id(product.category_id),
+                brand,
+                ((int(s.warehouse_id), int(s.amount)) for s in product.stocks),
+            )
+        return columns
+
+    @classmethod
+    def from_data(cls, data, mode: Optional[str] = None) -> 'ProductColumns':
+        """Из данных ответа get_prds (проверены при получении; сборка в режиме WB_VALIDATION_MODE)"""
+        return cls.from_schema(rehydrate(ProductListSchema, data, mode))
+
+    @classmethod
+    def from_queryset(cls, queryset=None, stocks: bool = True, chunk_size: int = 2000) -> 'ProductColumns':
+        """
+        Из строк WBProduct.
+
+        Args:
+            stocks: заполнить остатки по складам из data (иначе только total_stock)
+        """
+        queryset = WBProduct.objects.all() if queryset is None else queryset
+        fields = ['product_id', 'name', 'price', 'discount', 'category', 'brand', 'total_stock']
+        if stocks:
+            fields.append('data')
+        columns = cls()
+        for row in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+            product_id, name, price, discount, category, brand, total_stock = row[:7]
+            columns.append(product_id, name, float(price), float(discount), _category_id(category), brand)
+            if stocks:
+                for stock in (row[7] or {}).get('stocks') or []:
+                    columns.stock_warehouse.append(int(stock['warehouseId']))
+                    columns.stock_amount.append(int(stock['amount']))
+                columns.stock_offsets[-1] = len(columns.stock_warehouse)
+            columns.total_stock[-1] = total_stock
+        return columns
+
+    def column(self, name: str):
+        """Числовая колонка как numpy.ndarray (без копирования) или array"""
+        values = getattr(self, name)
+        if numpy is not None and isinstance(values, array):
+            return numpy.frombuffer(values, dtype=numpy.float64 if values.typecode == 'd' else numpy.int64)
+        return values
+
+    def stocks(self, index: int) -> Dict[int, int]:
+        start, end = self.stock_offsets[index], self.stock_offsets[index + 1]
+        return dict(zip(self.stock_warehouse[start:end], self.stock_amount[start:end]))
+
+    def row(self, index: int) -> dict:
+        category_id = self.category_id[index]
+        return {
+            'product_id': self.product_id[index],
+            'name': self.name[index],
+            'brand': self.brand[index],
+            'price': self.price[index],
+            'discount': self.discount[index],
+            'category_id': None if category_id == NO_CATEGORY else category_id,
+            'total_stock': self.total_stock[index],
+            'stocks': self.stocks(index),
+        }
+
+    def select(self, category_id: Optional[int] = None, min_price: Optional[float] = None,
+               max_price: Optional[float] = None, in_stock: Optional[bool] = None,
+               brand: Optional[str] = None) -> Sequence[int]:
+        """Индексы товаров, удовлетворяющих всем заданным условиям"""
+        if numpy is not None:
+            mask = numpy.ones(len(self), dtype=bool)
+            if category_id is not None:
+                mask &= self.column('category_id') == category_id
+            if min_price is not None:
+                mask &= self.column('price') >= min_price
+            if max_price is not None:
+                mask &= self.column('price') <= max_price
+            if in_stock is not None:
+                mask &= (self.column('total_stock') > 0) == in_stock
+            if brand is not None:
+                mask &= numpy.array(self.brand, dtype=object) == brand
+            return numpy.flatnonzero(mask)
+
+        return [
+            i for i in range(len(self))
+            if (category_id is None or self.category_id[i] == category_id)
+            and (min_price is None or self.price[i] >= min_price)
+            and (max_price is None or self.price[i] <= max_price)
+            and (in_stock is None or (self.total_stock[i] > 0) == in_stock)
+            and (brand is None or self.brand[i] == brand)
+        ]
+
+    def take(self, indices: Iterable[int]) -> 'ProductColumns':
+        """Новое хранилище из товаров с заданными индексами"""
+        columns = type(self)()
+        for i in indices:
+            start, end = self.stock_offsets[i], self.stock_offsets[i + 1]
+            columns.append(
+                self.product_id[i], self.name[i], self.price[i], self.discount[i], self.category_id[i],
+                self.brand[i], zip(self.stock_warehouse[start:end], self.stock_amount[start:end]),
+            )
+            columns.total_stock[-1] = self.total_stock[i]
+        return columns
+
+    def filter(self, **conditions) -> 'ProductColumns':
+        """take(select(**conditions))"""
+        return self.take(self.select(**conditions))
+
+    def total_stock_sum(self) -> int:
+        if numpy is not None:
+            return int(self.column('total_stock').sum())
+        return sum(self.total_stock)
+
+    def _group(self, keys: str, values: str) -> Dict[int, Tuple[int, float]]:
+        """{ключ: (число строк, сумма values)} по колонке keys"""
+        if numpy is not None:
+            unique, inverse = numpy.unique(self.column(keys), return_inverse=True)
+            counts = numpy.bincount(inverse, minlength=len(unique))
+            sums = numpy.bincount(inverse, weights=self.column(values), minlength=len(unique))
+            return {int(k): (int(c), float(s)) for k, c, s in zip(unique, counts, sums)}
+        groups: Dict[int, Tuple[int, float]] = {}
+        for key, value in zip(getattr(self, keys), getattr(self, values)):
+            count, total = groups.get(key, (0, 0.0))
+            groups[key] = (count + 1, total + value)
+        return groups
+
+    def avg_price_by_category(self) -> Dict[Optional[int], float]:
+        return {
+            None if key == NO_CATEGORY else key: total / count
+            for key, (count, total) in self._group('category_id', 'price').items()
+        }
+
+    def stock_by_category(self) -> Dict[Optional[int], int]:
+        return {
+            None if key == NO_CATEGORY else key: int(total)
+            for key, (_, total) in self._group('category_id', 'total_stock').items()
+        }
+
+    def stock_by_warehouse(self) -> Dict[int, int]:
+        return {key: int(total) for key, (_, total) in self._group('stock_warehouse', 'stock_amount').items()}
+
+    def memory_usage(self) -> int:
+        """Приблизительный объем данных в байтах (строки учитываются один раз)"""
+        arrays = (self.price, self.discount, self.category_id, self.total_stock,
+                  self.stock_offsets, self.stock_warehouse, self.stock_amount)
+        size = sum(a.buffer_info()[1] * a.itemsize for a in arrays)
+        size += sum(sys.getsizeof(column) for column in (self.product_id, self.name, self.brand))
+        strings = {id(s): s for column in (self.product_id, self.name, self.brand) for s in column}
+        return size + sum(sys.getsizeof(s) for s in strings.values())
@@ -4,3 +4,6 @@ from django.utils import timezone
 class WbApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'wb_api'
+
+    def ready(self):
+        from wb_api import checks  # noqa: F401 - регистрация проверок
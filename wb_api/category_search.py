@@ -0,0 +1,214 @@
+"""
+Поиск категорий по части названия.
+
+Индекс строится по дереву категорий (wb_api.category_tree) и хранит:
+- отсортированный список слов названий - поиск по префиксу бинарным поиском;
+- инвертированный индекс триграмм (как в pg_trgm) - нечеткий поиск с
+  опечатками и по середине слова.
+
+Результаты ранжируются: точное совпадение названия, затем название и слова,
+начинающиеся с запроса, затем по сходству триграмм; у каждого результата
+полный путь от корня. Индекс перестраивается при смене дерева категорий.
+
+На PostgreSQL поиск может выполняться в БД по GIN-индексу pg_trgm
+(WB_CATEGORY_SEARCH['USE_DB'], миграция 0013_category_name_trigram).
+"""
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from wb_api.category_tree import CategoryIndex, get_category_index
+from wb_api.models import WBCategoryNode
+
+_NON_WORD = re.compile(r'[^\w]+')
+PATH_SEPARATOR = ' / '
+
+
+def search_options():
+    options = getattr(settings, 'WB_CATEGORY_SEARCH', {})
+    return {
+        'limit': options.get('LIMIT', 20),
+        'min_similarity': options.get('MIN_SIMILARITY', 0.3),
+        'max_limit': options.get('MAX_LIMIT', 100),
+        'use_db': options.get('USE_DB', False),
+    }
+
+
+def normalize(text: str) -> str:
+    """Нижний регистр, ё -> е, знаки препинания -> пробелы"""
+    return _NON_WORD.sub(' ', text.lower().replace('ё', 'е')).strip()
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """Триграммы слов текста с дополнением пробелами, как в pg_trgm"""
+    grams = set()
+    for word in normalize(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+@dataclass
+class CategoryMatch:
+    id: int
+    name: str
+    path: str
+    depth: int
+    score: float
+
+    def as_dict(self):
+        return {'id': self.id, 'name': self.name, 'path': self.path, 'depth': self.depth, 'score': round(self.score, 3)}
+
+
+class CategorySearchIndex:
+    """
+    Индекс поиска по названиям узлов CategoryIndex.
+
+    Args:
+        tree: дерево категорий (для путей и глубины)
+    """
+
+    # Ранги совпадений; итоговый score = ранг + сходство триграмм
+    EXACT, NAME_PREFIX, WORD_PREFIX, FUZZY = 3, 2, 1, 0
+
+    def __init__(self, tree: CategoryIndex):
+        self.tree = tree
+        self.names: Dict[int, str] = {}
+        self.grams: Dict[int, FrozenSet[str]] = {}
+        self.postings: Dict[str, List[int]] = {}
+        words = []
+        for category_id, node in tree.nodes.items():
+            name = normalize(node.name)
+            self.names[category_id] = name
+            self.grams[category_id] = trigrams(name)
+            for gram in self.grams[category_id]:
+                self.postings.setdefault(gram, []).append(category_id)
+            words.extend((word, category_id) for word in set(name.split()))
+        self.words = sorted(words)
+
+    def path(self, category_id: int) -> str:
+        return PATH_SEPARATOR.join(
+            [node.name for node in self.tree.ancestors(category_id)] + [self.tree.nodes[category_id].name]
+        )
+
+    def _prefix_ids(self, prefix: str) -> set:
+        found = set()
+        for word, category_id in self.words[bisect_left(self.words, (prefix,)):]:
+            if not word.startswith(prefix):
+                break
+            found.add(category_id)
+        return found
+
+    def search(self, query: str, limit: Optional[int] = None, min_similarity: Optional[float] = None) -> List[CategoryMatch]:
+        options = search_options()
+        limit = limit or options['limit']
+        min_similarity = options['min_similarity'] if min_similarity is None else min_similarity
+        query = normalize(query)
+        if not query:
+            return []
+
+        ranks: Dict[int, int] = {}
+        query_words = query.split()
+        for category_id in set.intersection(*(self._prefix_ids(word) for word in query_words)):
+            name = self.names[category_id]
+            ranks[category_id] = (
+                self.EXACT if name == query else self.NAME_PREFIX if name.startswith(query) else self.WORD_PREFIX
+            )
+
+        query_grams = trigrams(query)
+        if len(ranks) >= limit:
+            # Префиксных совпадений хватает на всю выдачу: нечеткие (ранг 0) в нее не попадут
+            shared = Counter({category_id: len(query_grams & self.grams[category_id]) for category_id in ranks})
+        else:
+            shared = Counter(category_id for gram in query_grams for category_id in self.postings.get(gram, ()))
+        similarity = {}
+        for category_id, common in shared.items():
+            value = common / (len(query_grams) + len(self.grams[category_id]) - common)
+            if value >= min_similarity or category_id in ranks:
+                similarity[category_id] = value
+                ranks.setdefault(category_id, self.FUZZY)
+
+        best = sorted(
+            ranks,
+            key=lambda i: (-(ranks[i] + similarity.get(i, 0.0)), self.tree.nodes[i].depth, self.names[i]),
+        )[:limit]
+        return [
+            CategoryMatch(i, self.tree.nodes[i].name, self.path(i), self.tree.nodes[i].depth,
+                          ranks[i] + similarity.get(i, 0.0))
+            for i in best
+        ]
+
+
+class _SearchIndexHolder:
+    """Индекс поиска процесса, перестраиваемый при смене CategoryIndex"""
+
+    def __init__(self):
+        self._index: Optional[CategorySearchIndex] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> CategorySearchIndex:
+        tree = get_category_index()
+        with self._lock:
+            if self._index is None or self._index.tree is not tree:
+                self._index = CategorySearchIndex(tree)
+            return self._index
+
+
+search_index = _SearchIndexHolder()
+
+
+def search_db(query: str, limit: int, min_similarity: float) -> List[CategoryMatch]:
+    """
+    Поиск в PostgreSQL.
+
+    Условие name % query (оператор pg_trgm с порогом pg_trgm.similarity_threshold)
+    выполняется по GIN-индексу wb_category_name_trgm, сходство считается только
+    для найденных строк. Пути собираются по колонке path одним запросом имен предков.
+    """
+    from django.contrib.postgres.lookups import TrigramSimilar
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", [str(min_similarity)])
+        rows = list(
+            WBCategoryNode.objects
+            .filter(TrigramSimilar(F('name'), query))
+            .annotate(similarity=TrigramSimilarity('name', query))
+            .order_by('-similarity', 'depth', 'name')
+            .values_list('category_id', 'name', 'path', 'depth', 'similarity')[:limit]
+        )
+
+    ancestors = {category_id: _ancestor_ids(path) for category_id, _, path, _, _ in rows}
+    names = dict(
+        WBCategoryNode.objects
+        .filter(category_id__in={i for ids in ancestors.values() for i in ids})
+        .values_list('category_id', 'name')
+    )
+    return [
+        CategoryMatch(
+            category_id, name, PATH_SEPARATOR.join([names.get(i, '') for i in ancestors[category_id]] + [name]),
+            depth, similarity,
+        )
+        for category_id, name, path, depth, similarity in rows
+    ]
+
+
+def _ancestor_ids(path: str) -> List[int]:
+    return [int(part) for part in path.strip('/').split('/')[:-1]]
+
+
+def search_categories(query: str, limit: Optional[int] = None) -> List[CategoryMatch]:
+    """Ранжированный поиск категорий по части названия (limit не больше MAX_LIMIT)"""
+    options = search_options()
+    limit = min(limit or options['limit'], options['max_limit'])
+    if options['use_db'] and connection.vendor == 'postgresql':
+        return search_db(normalize(query), limit, options['min_similarity'])
+    return search_index.get().search(query, limit)
@@ -0,0 +1,282 @@
+"""
+Индекс дерева категорий маркетплейса.
+
+get_categories возвращает рекурсивное дерево, и вопросы вида "корневая
+категория товара" или "все потомки X" требовали обхода всего дерева.
+Дерево раскладывается в таблицу WBCategoryNode с материализованным путем
+и в CategoryIndex в памяти процесса:
+
+- parent, depth, root - O(1);
+- ancestors - O(глубина) по пути;
+- is_descendant - O(1): поддерево занимает непрерывный отрезок в порядке
+  сортировки по path;
+- subtree - срез этого отрезка, O(размер результата).
+
+Таблица обновляется при каждой загрузке категорий из API (обновление 24-часового
+кэша get_categories): записываются только изменившиеся узлы, после чего
+индексы процессов перечитывают таблицу по смене ее версии (число строк и
+последний updated_at), которую видят все процессы. Версия проверяется не
+чаще раза в WB_CATEGORY_INDEX_CHECK_INTERVAL секунд, между проверками
+обращения к индексу не выполняют запросов к БД.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+
+from wb_api.exceptions import WBAPIError
+from wb_api.models import WBCategoryNode
+
+FIELDS = ('parent_id', 'name', 'path', 'depth', 'position', 'is_visible')
+
+
+@dataclass(frozen=True)
+class CategoryNode:
+    id: int
+    parent_id: Optional[int]
+    name: str
+    path: str
+    depth: int
+    position: int = 0
+    is_visible: bool = True
+
+    @property
+    def ancestor_ids(self) -> List[int]:
+        """ID предков от корня к родителю"""
+        return [int(part) for part in self.path.strip('/').split('/')[:-1]]
+
+
+@dataclass
+class CategorySyncResult:
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+    @property
+    def changed(self):
+        return bool(self.created or self.updated or self.deleted)
+
+
+def _value(item, name, alias=None):
+    """Поле категории из dict (python- или alias-ключи) или CategorySchema"""
+    if isinstance(item, dict):
+        return item[name] if name in item else item.get(alias)
+    return getattr(item, name, None)
+
+
+def flatten(categories) -> List[CategoryNode]:
+    """
+    Узлы дерева в порядке обхода в глубину.
+
+    Принимает CategoryListSchema, данные ответа get_categories или список
+    категорий. Родитель определяется вложенностью children, а для категорий
+    верхнего уровня - полем parent_id (плоский список).
+    """
+    if isinstance(categories, dict):
+        categories = categories.get('items') or []
+    elif not isinstance(categories, (list, tuple)):
+        categories = categories.items
+
+    raw: Dict[int, dict] = {}
+    children: Dict[Optional[int], List[int]] = {}
+
+    def collect(items, parent_id):
+        for item in items or []:
+            category_id = int(_value(item, 'id'))
+            parent = parent_id if parent_id is not None else _value(item, 'parent_id', 'parentId')
+            visible = _value(item, 'is_visible', 'isVisible')
+            raw[category_id] = {
+                'parent_id': int(parent) if parent is not None else None,
+                'name': _value(item, 'name'),
+                'is_visible': True if visible is None else bool(visible),
+            }
+            collect(_value(item, 'children'), category_id)
+
+    collect(categories, None)
+    for category_id, values in raw.items():
+        parent_id = values['parent_id'] if values['parent_id'] in raw else None
+        values['parent_id'] = parent_id
+        children.setdefault(parent_id, []).append(category_id)
+
+    nodes: List[CategoryNode] = []
+    stack = [(category_id, '/', 0, position) for position, category_id in enumerate(children.get(None, []))]
+    stack.reverse()
+    while stack:
+        category_id, parent_path, depth, position = stack.pop()
+        path = f"{parent_path}{category_id}/"
+        nodes.append(CategoryNode(category_id, position=position, path=path, depth=depth, **raw[category_id]))
+        for child_position, child_id in reversed(list(enumerate(children.get(category_id, [])))):
+            stack.append((child_id, path, depth + 1, child_position))
+    return nodes
+
+
+class CategoryIndex:
+    """Дерево категорий в памяти с запросами за O(1)/O(глубина)"""
+
+    def __init__(self, nodes: Iterable[CategoryNode]):
+        self.nodes: Dict[int, CategoryNode] = {}
+        self.children: Dict[Optional[int], List[int]] = {}
+        for node in sorted(nodes, key=lambda n: (n.depth, n.position)):
+            self.nodes[node.id] = node
+            self.children.setdefault(node.parent_id, []).append(node.id)
+
+        # Порядок по path: поддерево узла - отрезок order[start[id]:end[id]]
+        self.order = sorted(self.nodes, key=lambda category_id: self.nodes[category_id].path)
+        self.start = {category_id: i for i, category_id in enumerate(self.order)}
+        self.end: Dict[int, int] = {}
+        open_nodes: List[int] = []
+        for i, category_id in enumerate(self.order):
+            path = self.nodes[category_id].path
+            while open_nodes and not path.startswith(self.nodes[open_nodes[-1]].path):
+                self.end[open_nodes.pop()] = i
+            open_nodes.append(category_id)
+        for category_id in open_nodes:
+            self.end[category_id] = len(self.order)
+
+    @classmethod
+    def from_db(cls) -> 'CategoryIndex':
+        rows = WBCategoryNode.objects.values_list('category_id', *FIELDS)
+        return cls(CategoryNode(category_id, *values) for category_id, *values in rows)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, category_id):
+        return category_id in self.nodes
+
+    def get(self, category_id: int) -> Optional[CategoryNode]:
+        return self.nodes.get(category_id)
+
+    def parent(self, category_id: int) -> Optional[CategoryNode]:
+        parent_id = self.nodes[category_id].parent_id
+        return self.nodes.get(parent_id) if parent_id is not None else None
+
+    def depth(self, category_id: int) -> int:
+        return self.nodes[category_id].depth
+
+    def ancestors(self, category_id: int) -> List[CategoryNode]:
+        """Предки от корня к родителю"""
+        return [self.nodes[ancestor_id] for ancestor_id in self.nodes[category_id].ancestor_ids]
+
+    def root(self, category_id: int) -> CategoryNode:
+        node = self.nodes[category_id]
+        return self.nodes[int(node.path.split('/', 2)[1])]
+
+    def roots(self) -> List[CategoryNode]:
+        return [self.nodes[category_id] for category_id in self.children.get(None, [])]
+
+    def children_of(self, category_id: Optional[int]) -> List[CategoryNode]:
+        return [self.nodes[child_id] for child_id in self.children.get(category_id, [])]
+
+    def is_descendant(self, category_id: int, ancestor_id: int) -> bool:
+        """category_id лежит в поддереве ancestor_id (включая сам узел)"""
+        return self.start[ancestor_id] <= self.start[category_id] < self.end[ancestor_id]
+
+    def subtree_ids(self, category_id: int) -> List[int]:
+        """ID узла и всех его потомков"""
+        return self.order[self.start[category_id]:self.end[category_id]]
+
+
+def sync_category_tree(categories) -> CategorySyncResult:
+    """
+    Запись дерева категорий в WBCategoryNode: создаются и обновляются только
+    изменившиеся узлы, отсутствующие в ответе удаляются.
+    """
+    nodes = flatten(categories)
+    current = {
+        values[0]: values[1:]
+        for values in WBCategoryNode.objects.values_list('category_id', *FIELDS)
+    }
+    result = CategorySyncResult()
+    changed = []
+    for node in nodes:
+        values = tuple(getattr(node, field) for field in FIELDS)
+        stored = current.pop(node.id, None)
+        if stored == values:
+            continue
+        if stored is None:
+            result.created += 1
+        else:
+            result.updated += 1
+        changed.append(WBCategoryNode(category_id=node.id, **dict(zip(FIELDS, values))))
+    result.deleted = len(current)
+
+    if result.changed:
+        with transaction.atomic():
+            if changed:
+                WBCategoryNode.objects.bulk_create(
+                    changed,
+                    update_conflicts=True,
+                    unique_fields=['category_id'],
+                    update_fields=[*FIELDS, 'updated_at'],
+                )
+            if current:
+                WBCategoryNode.objects.filter(category_id__in=current).delete()
+        category_index.reset()
+    return result
+
+
+def load_category_tree(token: Optional[str] = None) -> CategorySyncResult:
+    """
+    Заполнение WBCategoryNode полным деревом из get_categories.
+
+    Для фоновой задачи и команды sync_wb_categories: представления только
+    читают таблицу и не обращаются к API.
+
+    Raises:
+        WBAPIError: категории не загрузились
+    """
+    from wb_api.client.categories import WBCategoriesClient
+
+    response = WBCategoriesClient(token=token or getattr(settings, 'WB_API_TOKEN', None)).get_categories()
+    if not response.success:
+        raise WBAPIError(response.error, status_code=response.status_code)
+    return sync_category_tree(response.data)
+
+
+def tree_version():
+    """
+    Версия дерева в БД: (число узлов, последний updated_at).
+
+    Любая запись sync_category_tree меняет updated_at или число строк, поэтому
+    версия меняется для всех процессов без общего кэша.
+    """
+    version = WBCategoryNode.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    return version['count'], version['updated']
+
+
+class _IndexHolder:
+    """CategoryIndex процесса, перечитываемый при смене версии дерева в БД"""
+
+    def __init__(self):
+        self._index: Optional[CategoryIndex] = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> CategoryIndex:
+        interval = getattr(settings, 'WB_CATEGORY_INDEX_CHECK_INTERVAL', 5)
+        index = self._index
+        if index is not None and time.monotonic() - self._checked_at < interval:
+            return index
+        version = tree_version()
+        with self._lock:
+            if self._index is None or version != self._version:
+                self._index, self._version = CategoryIndex.from_db(), version
+            self._checked_at = time.monotonic()
+            return self._index
+
+    def reset(self):
+        with self._lock:
+            self._index = None
+
+
+category_index = _IndexHolder()
+
+
+def get_category_index() -> CategoryIndex:
+    return category_index.get()
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Кэши, не видимые другим процессам (gunicorn-воркерам, Celery)
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    """Кэш Django по умолчанию должен быть общим для всех процессов"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            f"Кэш Django по умолчанию ({backend}) виден только своему процессу",
+            hint="Настройте общий CACHES['default'] (DatabaseCache или RedisCache): через него "
+                 "процессы подавляют повторные обновления кэша API и делят отрисованные фрагменты",
+            id='wb_api.W001',
+        )]
+    return []
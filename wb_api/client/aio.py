@@ -0,0 +1,311 @@
+# wb_api/client/aio.py
+"""
+Асинхронные клиенты Wildberries API.
+
+Повторяют иерархию синхронных клиентов (те же имена методов и тот же
+WBResponse в результате), но работают поверх пула соединений httpx,
+поэтому один воркер может держать сотни запросов одновременно.
+"""
+import asyncio
+import http.cookiejar
+import time
+import weakref
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from wb_api import codec
+from wb_api.models import WBResponse
+from .categories import build_categories_params, update_category_tree, validate_categories
+from .models.cache import cache_api_call, cache_namespace, invalidate_tags, product_tag
+from .orders import normalize_orders
+from .ratelimit import get_rate_limiter, parse_retry_after
+from .resilience import get_resilience
+from .sessions import reject_cookies_policy
+from .stats import api_stats
+from .models.schemas import ProductListSchema, ProductSchema
+from .validation import validated_response
+from .products import (
+    assemble_details, build_prds_params, detail_calls, lookup_cached_details, product_list_tags,
+    single_product_tags, store_details,
+)
+
+
+def build_async_http_client(headers: Optional[Dict[str, str]] = None) -> httpx.AsyncClient:
+    """Создание httpx-клиента с пулом соединений из настроек"""
+    limits = httpx.Limits(
+        max_connections=getattr(settings, 'WB_ASYNC_MAX_CONNECTIONS', 200),
+        max_keepalive_connections=getattr(settings, 'WB_ASYNC_MAX_KEEPALIVE', 50),
+    )
+    return httpx.AsyncClient(
+        headers=headers,
+        cookies=http.cookiejar.CookieJar(policy=reject_cookies_policy()),  # Клиент общий для всех продавцов
+        limits=limits,
+        timeout=getattr(settings, 'WB_HTTP_TIMEOUT', 30),
+    )
+
+
+# Общие httpx-клиенты по циклам событий (соединения httpx привязаны к циклу)
+_loop_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]' = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Общий для процесса httpx-клиент текущего цикла событий.
+
+    Под ASGI цикл один на процесс, и пул соединений переиспользуется всеми
+    запросами; клиент цикла, завершенного async_to_sync, удаляется вместе с ним.
+    Закрывать клиент не нужно.
+    """
+    loop = asyncio.get_running_loop()
+    client = _loop_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _loop_clients[loop] = build_async_http_client()
+    return client
+
+
+class AsyncWBClientBase:
+    BASE_URL = settings.WB_API_URL  # Используем URL из настроек
+
+    def __init__(self, token: str = None, http_client: Optional[httpx.AsyncClient] = None, tenant: str = None):
+        self.token = token or "test_key"
+        self.tenant = tenant or ''  # Пространство имен кэша; пустое - хэш токена (см. cache_namespace)
+        self.BASE_URL = "https://api.test"  # Переопределяем для тестов
+        self._owns_http = http_client is None
+        self.http = http_client or build_async_http_client()
+        self.headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json"
+        }
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Закрытие пула соединений (только если клиент создал его сам)"""
+        if self._owns_http:
+            await self.http.aclose()
+
+    async def check_creds(self, token: str) -> WBResponse:
+        """Проверка валидности токена отдельным клиентом: токен и tenant этого клиента не меняются"""
+        return await type(self)(token=token, http_client=self.http)._request('GET', '/v1/auth/test')
+
+    async def get_products(self) -> WBResponse:
+        """Получение списка товаров"""
+        return await self._request('GET', '/api/v1/supplier/stocks')
+
+    async def get_orders(self) -> WBResponse:
+        """Получение списка заказов"""
+        return await self._request('GET', '/api/v1/supplier/orders')
+
+    async def _request(self, method: str, endpoint: str, **kwargs) -> WBResponse:
+        response = await get_resilience().acall(method, endpoint, lambda: self._attempt(method, endpoint, **kwargs))
+        if api_stats.flush_due():
+            await sync_to_async(api_stats.flush)()
+        return response
+
+    async def _attempt(self, method: str, endpoint: str, **kwargs) -> WBResponse:
+        """Попытка запроса в пределах лимита частоты (с повтором после 429)"""
+        limiter = get_rate_limiter()
+        for _ in range(limiter.max_retries + 1):
+            await limiter.await_slot(self.token, endpoint)
+            started = time.perf_counter()
+            response, retry_after = await self._send(method, endpoint, **kwargs)
+            api_stats.record(endpoint, response.status_code, response.success, time.perf_counter() - started)
+            if response.status_code != 429:
+                break
+            await limiter.apenalize(self.token, endpoint, retry_after)
+        return response
+
+    async def _send(self, method: str, endpoint: str, **kwargs) -> Tuple[WBResponse, Optional[float]]:
+        url = f"{self.BASE_URL}{endpoint}"
+        headers = {**self.headers, **kwargs.pop('headers', {})}
+        try:
+            response = await self.http.request(method, url, headers=headers, **kwargs)
+            if response.status_code != 200:
+                retry_after = None
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                return WBResponse(
+                    success=False,
+                    data=None,
+                    error=response.text,
+                    status_code=response.status_code
+                ), retry_after
+            return WBResponse(
+                success=True,
+                data=codec.loads(response.content) if response.content else None,
+                error=None,
+                status_code=response.status_code
+            ), None
+        except Exception as e:
+            return WBResponse(
+                success=False,
+                data=None,
+                error=f"Request failed: {str(e)}",
+                status_code=500
+            ), None
+
+
+class AsyncWBProductsClient(AsyncWBClientBase):
+    @cache_api_call(ttl=1800, stale_ttl=3600, tags=product_list_tags)  # 30 минут + 1 час stale-while-revalidate
+    async def get_prds(self, filter: Optional[Dict] = None) -> WBResponse:
+        """Получение списка товаров продавца (см. WBProductsClient.get_prds)"""
+        response = await self._request('GET', '/swagger/products', params=build_prds_params(filter))
+        return validated_response(response, ProductListSchema)
+
+    @cache_api_call(ttl=3600, tags=single_product_tags)
+    async def get_prd(self, prd_id: str) -> WBResponse:
+        """Получение информации о товаре"""
+        response = await self._request('GET', f'/swagger/products/{prd_id}')
+        return validated_response(response, ProductSchema, by_alias=False)
+
+    async def set_prd(self, prd_id: str, data: Dict) -> WBResponse:
+        """Обновление товара со сбросом связанных записей кэша"""
+        update_data = {k: v for k, v in data.items() if v is not None}
+        response = await self._request('PATCH', f'/swagger/products/{prd_id}', json=update_data)
+        if response.success:
+            await sync_to_async(invalidate_tags)(product_tag(prd_id))
+        return response
+
+    @cache_api_call(ttl=86400, tags=single_product_tags)  # 24 часа кэширования для комиссий
+    async def get_comission(self, prd_id: str) -> WBResponse:
+        """Получение информации о комиссии для товара"""
+        return await self._request('GET', f'/swagger/products/{prd_id}/commission')
+
+    async def get_prds_details(self, ids: Iterable[str], include_commission: bool = True,
+                               max_concurrency: Optional[int] = None) -> WBResponse:
+        """Пакетное получение карточек товаров (см. WBProductsClient.get_prds_details)"""
+        ids = list(ids)
+        semaphore = asyncio.Semaphore(max_concurrency or getattr(settings, 'WB_BULK_MAX_CONCURRENCY', 8))
+        results, misses = await sync_to_async(lookup_cached_details)(
+            detail_calls(ids, include_commission), cache_namespace(self)
+        )
+
+        async def fetch(method, prd_id):
+            async with semaphore:
+                return await getattr(type(self), method).__wrapped__(self, prd_id)
+
+        responses = await asyncio.gather(*(fetch(*call) for call in misses), return_exceptions=True)
+        fetched = {
+            call: response if isinstance(response, WBResponse)
+            else WBResponse(success=False, data=None, error=str(response), status_code=500)
+            for call, response in zip(misses, responses)
+        }
+
+        await sync_to_async(store_details)(self, fetched)
+        results.update(fetched)
+        return assemble_details(ids, include_commission, results)
+
+
+class AsyncWBOrdersClient(AsyncWBClientBase):
+    @cache_api_call(ttl=3600)
+    async def get_orders(self, params: Optional[Dict[str, Any]] = None) -> WBResponse:
+        response = await self._request("GET", "/api/v1/orders", params=params)
+        return normalize_orders(response)
+
+
+class AsyncWBCategoriesClient(AsyncWBClientBase):
+    @cache_api_call(ttl=86400)  # 24 часа кэширования для категорий
+    async def get_categories(self, filter: Optional[Dict] = None) -> WBResponse:
+        """Получение списка категорий маркетплейса (см. WBCategoriesClient.get_categories)"""
+        response = validate_categories(
+            await self._request('GET', '/v1/categories', params=build_categories_params(filter))
+        )
+        await sync_to_async(update_category_tree)(response, filter)
+        return response
+
+
+class AsyncWBClient:
+    """Асинхронный аналог WBClient"""
+
+    def __init__(self, base_url: str, api_key: str, http_client: Optional[httpx.AsyncClient] = None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self._owns_http = http_client is None
+        self.http = http_client or build_async_http_client()
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._owns_http:
+            await self.http.aclose()
+
+    async def check_creds(self, token: str) -> WBResponse:
+        """Проверка валидности токена (токен клиента не меняется)"""
+        try:
+            response = await self.http.get(
+                f"{self.base_url}/v1/auth/test", headers={**self.headers, "Authorization": f"Bearer {token}"}
+            )
+            return WBResponse(
+                success=response.status_code == 200,
+                data=codec.loads(response.content) if response.status_code == 200 else None,
+                error=None if response.status_code == 200 else response.text
+            )
+        except Exception as e:
+            return WBResponse(success=False, data=None, error=str(e))
+
+    async def _request(self, method: str, endpoint: str, **kwargs) -> WBResponse:
+        """Базовый метод для выполнения запросов"""
+        url = f"{self.base_url}{endpoint}"
+        headers = {**self.headers, **kwargs.pop('headers', {})}
+        response = None
+        try:
+            response = await self.http.request(method, url, headers=headers, **kwargs)
+            response.raise_for_status()
+
+            return WBResponse(
+                success=True,
+                data=codec.loads(response.content) if response.content else None,
+                error=None
+            )
+
+        except httpx.HTTPStatusError as http_err:
+            return WBResponse(
+                success=False,
+                data=None,
+                error=f"HTTP error: {http_err} - {response.text if response is not None else ''}"
+            )
+        except httpx.HTTPError as req_err:
+            return WBResponse(
+                success=False,
+                data=None,
+                error=f"Request failed: {req_err}"
+            )
+        except Exception as e:
+            return WBResponse(
+                success=False,
+                data=None,
+                error=f"Unexpected error: {e}"
+            )
+
+    async def get_products(self, force_refresh: bool = False) -> WBResponse:
+        """Получение списка товаров с опцией принудительного обновления"""
+        headers = {'Cache-Control': 'no-cache'} if force_refresh else {}
+        return await self._request('GET', '/v1/products', headers=headers)
+
+    async def update_product(self, product_id: str, data: Dict[str, Any], force_refresh: bool = False) -> WBResponse:
+        """Обновление товара с опцией принудительного обновления"""
+        headers = {'Cache-Control': 'no-cache'} if force_refresh else {}
+        return await self._request('PUT', f'/v1/products/{product_id}', json=data, headers=headers)
+
+    async def get_orders(self) -> WBResponse:
+        """Получение списка заказов"""
+        return await self._request('GET', '/v1/orders')
+
+    async def get_categories(self) -> WBResponse:
+        """Получение списка категорий"""
+        return await self._request('GET', '/v1/categories')
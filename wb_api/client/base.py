@@ -1,32 +1,30 @@
 # wb_api/client/base.py
-from dataclasses import dataclass
-from typing import Any, Optional
-import requests
+import time
+from typing import Optional, Tuple
+
 from django.conf import settings
 
-@dataclass
-class WBResponse:
-    success: bool
-    data: Any
-    error: Optional[str]
-    status_code: int
+from wb_api import codec
+from wb_api.models import WBResponse
+from .ratelimit import get_rate_limiter, parse_retry_after
+from .resilience import get_resilience
+from .sessions import get_session
+from .stats import api_stats
+from .streaming import JSONStream, response_chunks
+
 
 class WBClientBase:
     BASE_URL = settings.WB_API_URL  # Используем URL из настроек
 
-    def __init__(self, token: str = None):
+    def __init__(self, token: str = None, tenant: str = None):
         self.token = token or "test_key"
+        self.tenant = tenant or ''  # Пространство имен кэша; пустое - хэш токена (см. cache_namespace)
         self.BASE_URL = "https://api.test"  # Переопределяем для тестов
-        self.session = requests.Session()
-        self.session.headers.update({
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
-        })
+        self.session = get_session(self.BASE_URL)  # Общая для процесса сессия с пулом соединений
 
     def check_creds(self, token: str) -> WBResponse:
-        """Проверка валидности токена"""
-        self.session.headers.update({"Authorization": f"Bearer {token}"})
-        return self._request('GET', '/v1/auth/test')
+        """Проверка валидности токена отдельным клиентом: токен и tenant этого клиента не меняются"""
+        return type(self)(token=token)._request('GET', '/v1/auth/test')
 
     def get_products(self) -> WBResponse:
         """Получение списка товаров"""
@@ -37,26 +35,57 @@ class WBClientBase:
         return self._request('GET', '/api/v1/supplier/orders')
 
     def _request(self, method: str, endpoint: str, **kwargs):
+        response = get_resilience().call(method, endpoint, lambda: self._attempt(method, endpoint, **kwargs))
+        api_stats.maybe_flush()
+        return response
+
+    def _attempt(self, method: str, endpoint: str, **kwargs) -> WBResponse:
+        """Попытка запроса в пределах лимита частоты (с повтором после 429)"""
+        limiter = get_rate_limiter()
+        for _ in range(limiter.max_retries + 1):
+            limiter.wait(self.token, endpoint)
+            started = time.perf_counter()
+            response, retry_after = self._send(method, endpoint, **kwargs)
+            api_stats.record(endpoint, response.status_code, response.success, time.perf_counter() - started)
+            if response.status_code != 429:
+                break
+            # Лимит превышен: пауза группы для всех запросов продавца, затем повтор
+            limiter.penalize(self.token, endpoint, retry_after)
+        return response
+
+    def _send(self, method: str, endpoint: str, **kwargs) -> Tuple[WBResponse, Optional[float]]:
+        """Один HTTP-запрос; возвращает ответ и Retry-After для 429"""
         url = f"{self.BASE_URL}{endpoint}"
+        # Учетные данные передаются с запросом: сессия общая для всех продавцов
+        headers = {"Authorization": f"Bearer {self.token}", **kwargs.pop('headers', {})}
         try:
-            response = self.session.request(method, url, **kwargs)
+            response = self.session.request(method, url, headers=headers, **kwargs)
             if response.status_code != 200:  # Добавьте эту проверку
+                retry_after = None
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
                 return WBResponse(
                     success=False,
                     data=None,
                     error=response.text,
                     status_code=response.status_code
-                )
+                ), retry_after
+            if kwargs.get('stream'):
+                # Тело читается по частям при обходе data.items() (см. streaming.py)
+                chunk_size = getattr(settings, 'WB_STREAM_CHUNK_SIZE', 64 * 1024)
+                data = JSONStream(response_chunks(response, chunk_size), close=response.close)
+            else:
+                data = codec.loads(response.content) if response.content else None
             return WBResponse(
                 success=True,
-                data=response.json() if response.content else None,
+                data=data,
                 error=None,
                 status_code=response.status_code
-            )
+            ), None
         except Exception as e:
             return WBResponse(
                 success=False,
                 data=None,
                 error=f"Request failed: {str(e)}",  # Унифицированный формат ошибки
                 status_code=500
-            )
\ No newline at end of file
+            ), None
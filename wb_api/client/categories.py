@@ -1,9 +1,46 @@
+import logging
+
 from .base import WBClientBase
 from .models.cache import cache_api_call
-from .models.schemas import CategorySchema, CategoryListSchema
+from .models.schemas import CategoryListSchema
+from .validation import validated_response
 from typing import Optional, Dict
+from wb_api.category_tree import sync_category_tree
 from wb_api.models import WBResponse
 
+logger = logging.getLogger(__name__)
+
+
+def build_categories_params(filter: Optional[Dict] = None) -> Dict:
+    """Преобразование фильтра get_categories в query-параметры API"""
+    params = {}
+    if filter:
+        if 'parent_id' in filter:
+            params['parentId'] = filter['parent_id']
+        if 'depth' in filter:
+            params['depth'] = filter['depth']
+    return params
+
+
+def validate_categories(response: WBResponse) -> WBResponse:
+    """Валидация ответа со списком категорий"""
+    return validated_response(response, CategoryListSchema, by_alias=False)
+
+
+def update_category_tree(response: WBResponse, filter: Optional[Dict] = None):
+    """
+    Обновление индекса категорий (wb_api.category_tree) по свежему полному дереву.
+
+    Вызывается только при загрузке из API, то есть при обновлении кэша
+    get_categories; ошибка записи индекса не влияет на ответ.
+    """
+    if not response.success or filter:
+        return
+    try:
+        sync_category_tree(response.data)
+    except Exception as e:
+        logger.warning(f"Не удалось обновить дерево категорий: {e}")
+
 
 class WBCategoriesClient(WBClientBase):
     @cache_api_call(ttl=86400)  # 24 часа кэширования для категорий
@@ -16,26 +53,7 @@ class WBCategoriesClient(WBClientBase):
                 - parent_id: ID родительской категории
                 - depth: глубина вложенности
         """
-        params = {}
-        if filter:
-            if 'parent_id' in filter:
-                params['parentId'] = filter['parent_id']
-            if 'depth' in filter:
-                params['depth'] = filter['depth']
-
-        response = self._request('GET', '/v1/categories', params=params)
-        if response.success:
-            try:
-                validated_data = CategoryListSchema.parse_obj(response.data)
-                return WBResponse(
-                    success=True,
-                    data=validated_data.dict(),
-                    error=None
-                )
-            except Exception as e:
-                return WBResponse(
-                    success=False,
-                    data=None,
-                    error=f"Validation error: {str(e)}"
-                )
+        params = build_categories_params(filter)
+        response = validate_categories(self._request('GET', '/v1/categories', params=params))
+        update_category_tree(response, filter)
         return response
\ No newline at end of file
@@ -1,40 +1,47 @@
 from typing import Optional, Dict, Any
 import requests
+from wb_api import codec
 from wb_api.models import WBResponse
+from .resilience import get_resilience
+from .sessions import get_session
 
 class WBClient:
     def __init__(self, base_url: str, api_key: str):
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
-        self.session = requests.Session()
-        self.session.headers.update({
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        })
+        self.session = get_session(self.base_url)
+
+    def _headers(self, extra=None):
+        return {"Authorization": f"Bearer {self.api_key}", **(extra or {})}
 
     def check_creds(self, token: str) -> WBResponse:
-        """Проверка валидности токена"""
-        self.session.headers.update({"Authorization": f"Bearer {token}"})
+        """Проверка валидности токена (токен клиента не меняется)"""
         try:
-            response = self.session.get(f"{self.base_url}/v1/auth/test")
+            response = self.session.get(
+                f"{self.base_url}/v1/auth/test", headers=self._headers({"Authorization": f"Bearer {token}"})
+            )
             return WBResponse(
                 success=response.status_code == 200,
-                data=response.json() if response.status_code == 200 else None,
+                data=codec.loads(response.content) if response.status_code == 200 else None,
                 error=None if response.status_code == 200 else response.text
             )
         except Exception as e:
             return WBResponse(success=False, data=None, error=str(e))
 
     def _request(self, method: str, endpoint: str, **kwargs) -> WBResponse:
-        """Базовый метод для выполнения запросов"""
+        """Базовый метод для выполнения запросов (с повторами и circuit breaker)"""
+        return get_resilience().call(method, endpoint, lambda: self._send(method, endpoint, **kwargs))
+
+    def _send(self, method: str, endpoint: str, **kwargs) -> WBResponse:
         url = f"{self.base_url}{endpoint}"
+        headers = self._headers(kwargs.pop('headers', None))
         try:
-            response = self.session.request(method, url, **kwargs)
+            response = self.session.request(method, url, headers=headers, **kwargs)
             response.raise_for_status()
 
             return WBResponse(
                 success=True,
-                data=response.json() if response.content else None,
+                data=codec.loads(response.content) if response.content else None,
                 error=None
             )
 
@@ -42,33 +49,34 @@ class WBClient:
             return WBResponse(
                 success=False,
                 data=None,
-                error=f"HTTP error: {http_err} - {response.text if 'response' in locals() else ''}"
+                error=f"HTTP error: {http_err} - {response.text if 'response' in locals() else ''}",
+                status_code=response.status_code
             )
         except requests.exceptions.RequestException as req_err:
             return WBResponse(
                 success=False,
                 data=None,
-                error=f"Request failed: {req_err}"
+                error=f"Request failed: {req_err}",
+                status_code=500
             )
         except Exception as e:
             return WBResponse(
                 success=False,
                 data=None,
-                error=f"Unexpected error: {e}"
+                error=f"Unexpected error: {e}",
+                status_code=500
             )
 
     def get_products(self, force_refresh: bool = False) -> WBResponse:
         """Получение списка товаров с опцией принудительного обновления"""
-        if force_refresh:
-            # Логика принудительного обновления кэша
-            self.session.headers.update({'Cache-Control': 'no-cache'})
-        return self._request('GET', '/v1/products')
+        # Сессия общая для процесса - заголовок передается только с этим запросом
+        headers = {'Cache-Control': 'no-cache'} if force_refresh else {}
+        return self._request('GET', '/v1/products', headers=headers)
 
     def update_product(self, product_id: str, data: Dict[str, Any], force_refresh: bool = False) -> WBResponse:
         """Обновление товара с опцией принудительного обновления"""
-        if force_refresh:
-            self.session.headers.update({'Cache-Control': 'no-cache'})
-        return self._request('PUT', f'/v1/products/{product_id}', json=data)
+        headers = {'Cache-Control': 'no-cache'} if force_refresh else {}
+        return self._request('PUT', f'/v1/products/{product_id}', json=data, headers=headers)
 
     def get_orders(self) -> WBResponse:
         """Получение списка заказов"""
@@ -0,0 +1,452 @@
+"""
+Хранилища кэша ответов API для cache_api_call.
+
+Хранилище выбирается настройкой WB_CACHE_BACKEND:
+
+    WB_CACHE_BACKEND = {
+        'BACKEND': 'wb_api.client.models.backends.RedisCacheBackend',
+        'OPTIONS': {'url': 'redis://localhost:6379/1'},
+    }
+
+Перед любым хранилищем работает кэш в памяти процесса (memory_cache).
+"""
+import hashlib
+import math
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+from wb_api import codec
+from .compression import PLAIN, decode_payload, decoded_size
+from .singleflight import AdvisoryLock, CacheLock
+
+
+class CacheEntry:
+    """
+    Запись кэша: payload ответа, срок свежести и конец льготного периода.
+
+    Запись, прочитанная в сжатом виде (raw + encoding), распаковывается
+    только при первом обращении к payload.
+    """
+
+    def __init__(self, payload=None, expires_at=None, stale_until=None, raw=None, encoding=PLAIN):
+        self._payload = payload
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.raw = raw
+        self.encoding = encoding
+
+    @property
+    def payload(self):
+        if self.raw is not None:
+            self._payload = decode_payload(self.raw, self.encoding)
+            self.raw = None
+        return self._payload
+
+    @property
+    def size(self):
+        """Оценка размера payload в байтах (без распаковки сжатых данных)"""
+        if self.raw is not None:
+            return decoded_size(self.raw, self.encoding)
+        return len(codec.dumps(self._payload, default=str))
+
+    def is_fresh(self, now=None):
+        return self.expires_at > (now or timezone.now())
+
+    def is_usable(self, now=None):
+        """Свежая запись или устаревшая, но в пределах stale_until"""
+        now = now or timezone.now()
+        return self.is_fresh(now) or (self.stale_until is not None and self.stale_until > now)
+
+    @property
+    def retain_until(self):
+        return self.stale_until or self.expires_at
+
+    @property
+    def version(self) -> str:
+        """Версия записи: меняется при каждой перезаписи ключа (вместе с expires_at)"""
+        return f"{self.expires_at.timestamp():.6f}"
+
+
+class BaseCacheBackend:
+    """Интерфейс хранилища кэша ответов API"""
+
+    def get(self, key) -> Optional[CacheEntry]:
+        """Пригодная запись (свежая или в льготном периоде) или None"""
+        raise NotImplementedError
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        """Свежие записи по списку ключей"""
+        entries = {key: self.get(key) for key in keys}
+        return {key: entry for key, entry in entries.items() if entry is not None and entry.is_fresh()}
+
+    def set(self, key, entry: CacheEntry, tags: Iterable[str] = ()):
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags: Iterable[str]) -> List[str]:
+        """Удаление записей с любым из тегов; возвращает удаленные ключи"""
+        raise NotImplementedError
+
+    def lock(self, key) -> CacheLock:
+        """Межпроцессная блокировка обновления ключа"""
+        raise NotImplementedError
+
+    def clear(self, expired_only=False) -> int:
+        """Очистка хранилища (или только записей с истекшим льготным периодом)"""
+        raise NotImplementedError
+
+
+class ORMCacheBackend(BaseCacheBackend):
+    """
+    Кэш в таблицах БД (ClientAPICache + APICacheTag), блокировки - advisory lock.
+
+    Крупные payload'ы хранятся сжатыми (см. WB_CACHE_COMPRESSION).
+    """
+
+    def __init__(self, model='wb_api.ClientAPICache', tag_model='wb_api.APICacheTag'):
+        self.model_label = model
+        self.tag_model_label = tag_model
+
+    @cached_property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @cached_property
+    def tag_model(self):
+        return apps.get_model(self.tag_model_label)
+
+    def get(self, key):
+        return self.model.get_cached_entry(key)
+
+    def get_many(self, keys):
+        return self.model.get_cached_entries(keys)
+
+    def set(self, key, entry, tags=()):
+        self.model.objects.update_or_create(
+            endpoint=self.model._generate_cache_key(key),
+            defaults={
+                **self.model.storage_fields(entry.payload),
+                'expires_at': entry.expires_at,
+                'stale_until': entry.stale_until
+            }
+        )
+        if tags:
+            self.tag_model.objects.filter(key=key).delete()
+            self.tag_model.objects.bulk_create(
+                [self.tag_model(tag=tag, key=key) for tag in set(tags)],
+                batch_size=1000,
+                ignore_conflicts=True
+            )
+
+    def invalidate_tags(self, tags):
+        with transaction.atomic():
+            keys = list(self.tag_model.objects.filter(tag__in=tags).values_list('key', flat=True).distinct())
+            if keys:
+                self._delete_keys(keys)
+        return keys
+
+    def _delete_keys(self, keys):
+        self.model.objects.filter(endpoint__in=[self.model._generate_cache_key(key) for key in keys]).delete()
+        self.tag_model.objects.filter(key__in=keys).delete()
+
+    def lock(self, key):
+        return AdvisoryLock(key)
+
+    def clear(self, expired_only=False):
+        if not expired_only:
+            count, _ = self.model.objects.all().delete()
+            self.tag_model.objects.all().delete()
+            return count
+        now = timezone.now()
+        expired = self.model.objects.filter(expires_at__lt=now).exclude(stale_until__gt=now)
+        # Ключ записи - endpoint без завершающего ':' (см. _generate_cache_key)
+        keys = [endpoint[:-1] for endpoint in expired.values_list('endpoint', flat=True)]
+        with transaction.atomic():
+            for start in range(0, len(keys), 1000):
+                self._delete_keys(keys[start:start + 1000])
+        return len(keys)
+
+
+class DjangoCacheLock(CacheLock):
+    """Блокировка через атомарный cache.add() кэша Django"""
+
+    def __init__(self, key, cache, lock_key, timeout):
+        super().__init__(key)
+        self.cache = cache
+        self.lock_key = lock_key
+        self.timeout = timeout
+
+    def try_acquire(self):
+        self.acquired = self.cache.add(self.lock_key, True, timeout=self.timeout)
+        return self.acquired
+
+    def release(self):
+        if self.acquired:
+            self.cache.delete(self.lock_key)
+        self.acquired = False
+
+
+def _digest(value):
+    return hashlib.sha1(value.encode()).hexdigest()
+
+
+def _lock_ttl():
+    """Срок жизни блокировки: с запасом больше времени ожидания"""
+    return 2 * getattr(settings, 'WB_CACHE_LOCK_TIMEOUT', 30)
+
+
+class DjangoCacheBackend(BaseCacheBackend):
+    """
+    Кэш во фреймворке кэширования Django (locmem, file, memcached и т.д.).
+
+    Индекс тегов хранится в том же кэше: тег -> {ключ: конец хранения записи}.
+    Индекс тега изменяется под блокировкой cache.add(), при каждом изменении
+    из него удаляются истекшие ключи, а живет он до конца хранения самой
+    долгой записи. Для clear() рекомендуется отдельный alias, так как он
+    очищает его целиком.
+    """
+
+    def __init__(self, alias='default', prefix='wb_api'):
+        self.alias = alias
+        self.prefix = prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _entry_key(self, key):
+        return f"{self.prefix}:entry:{_digest(key)}"
+
+    def _tag_key(self, tag):
+        return f"{self.prefix}:tagindex:{_digest(tag)}"
+
+    def get(self, key):
+        value = self.cache.get(self._entry_key(key))
+        if value is None:
+            return None
+        entry = CacheEntry(*value[:3])
+        return entry if entry.is_usable() else None
+
+    def get_many(self, keys):
+        entry_keys = {self._entry_key(key): key for key in keys}
+        values = self.cache.get_many(list(entry_keys))
+        entries = {entry_keys[entry_key]: CacheEntry(*value[:3]) for entry_key, value in values.items()}
+        return {key: entry for key, entry in entries.items() if entry.is_fresh()}
+
+    def set(self, key, entry, tags=()):
+        timeout = max(1, math.ceil((entry.retain_until - timezone.now()).total_seconds()))
+        entry_key, tags = self._entry_key(key), set(tags)
+        previous = self.cache.get(entry_key)
+        # Теги записи хранятся вместе с ней, чтобы при перезаписи убрать ключ из прежних тегов
+        self.cache.set(entry_key, (entry.payload, entry.expires_at, entry.stale_until, sorted(tags)), timeout)
+        for tag in set(previous[3] if previous and len(previous) > 3 else ()) - tags:
+            self._update_tag(tag, key, None)
+        for tag in tags:
+            self._update_tag(tag, key, entry.retain_until.timestamp())
+
+    def _update_tag(self, tag, key, retain_until: Optional[float]):
+        """Добавление (retain_until) или удаление (None) ключа в индексе тега с очисткой истекших"""
+        tag_key = self._tag_key(tag)
+        lock = DjangoCacheLock(tag_key, self.cache, f"{tag_key}:lock", _lock_ttl())
+        lock.acquire(getattr(settings, 'WB_CACHE_LOCK_TIMEOUT', 30))
+        try:
+            now = time.time()
+            members = {k: ts for k, ts in (self.cache.get(tag_key) or {}).items() if ts > now and k != key}
+            if retain_until is not None:
+                members[key] = retain_until
+            if members:
+                self.cache.set(tag_key, members, timeout=max(1, math.ceil(max(members.values()) - now)))
+            else:
+                self.cache.delete(tag_key)
+        finally:
+            lock.release()
+
+    def invalidate_tags(self, tags):
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        keys = set().union(*self.cache.get_many(tag_keys).values())
+        self.cache.delete_many([self._entry_key(key) for key in keys] + tag_keys)
+        return list(keys)
+
+    def lock(self, key):
+        return DjangoCacheLock(key, self.cache, f"{self.prefix}:lock:{_digest(key)}", _lock_ttl())
+
+    def clear(self, expired_only=False):
+        # Истекшие записи кэш Django удаляет сам по timeout
+        if expired_only:
+            return 0
+        self.cache.clear()
+        return 0
+
+
+class RedisLock(CacheLock):
+    """Блокировка SET NX PX с освобождением только владельцем"""
+    RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(self, key, redis, lock_key, timeout):
+        super().__init__(key)
+        self.redis = redis
+        self.lock_key = lock_key
+        self.timeout = timeout
+        self.owner = uuid.uuid4().hex
+
+    def try_acquire(self):
+        self.acquired = bool(self.redis.set(self.lock_key, self.owner, nx=True, px=int(self.timeout * 1000)))
+        return self.acquired
+
+    def release(self):
+        if self.acquired:
+            self.redis.eval(self.RELEASE_SCRIPT, 1, self.lock_key, self.owner)
+        self.acquired = False
+
+
+class RedisCacheBackend(BaseCacheBackend):
+    """
+    Кэш в Redis (или совместимом по протоколу хранилище: KeyDB, Dragonfly, Valkey).
+
+    Записи хранятся как JSON со сроком жизни до конца льготного периода.
+    Тег - sorted set ключей с концом хранения записи в качестве score: при
+    каждой записи из него удаляются истекшие ключи, а сам тег живет до конца
+    хранения самой долгой записи. Теги записи хранятся рядом с ней, и при
+    перезаписи ключ убирается из прежних тегов. Требует пакет redis.
+    """
+
+    # KEYS: теги записи, новые теги..., прежние теги...; ARGV: ключ, конец хранения (мс), сейчас (мс), число новых
+    SET_TAGS_SCRIPT = """
+local new_count = tonumber(ARGV[4])
+for i = new_count + 2, #KEYS do
+  redis.call('zrem', KEYS[i], ARGV[1])
+end
+redis.call('del', KEYS[1])
+for i = 2, new_count + 1 do
+  redis.call('zadd', KEYS[i], ARGV[2], ARGV[1])
+  redis.call('zremrangebyscore', KEYS[i], '-inf', ARGV[3])
+  local last = redis.call('zrange', KEYS[i], -1, -1, 'WITHSCORES')
+  if last[2] then
+    redis.call('pexpireat', KEYS[i], math.floor(tonumber(last[2])))
+  end
+  redis.call('sadd', KEYS[1], KEYS[i])
+end
+if new_count > 0 then
+  redis.call('pexpireat', KEYS[1], ARGV[2])
+end
+return new_count
+"""
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='wb_api', client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.redis = client
+        self.prefix = prefix
+
+    def _entry_key(self, key):
+        return f"{self.prefix}:entry:{key}"
+
+    def _tag_key(self, tag):
+        return f"{self.prefix}:tagindex:{tag}"
+
+    def _entry_tags_key(self, key):
+        return f"{self.prefix}:tags:{key}"
+
+    @staticmethod
+    def _dump(entry):
+        return codec.dumps({
+            'payload': entry.payload,
+            'expires_at': entry.expires_at.timestamp(),
+            'stale_until': entry.stale_until.timestamp() if entry.stale_until else None,
+        }, default=codec.django_default)
+
+    @staticmethod
+    def _load(raw):
+        value = codec.loads(raw)
+        stale_until = value['stale_until']
+        return CacheEntry(
+            value['payload'],
+            datetime.fromtimestamp(value['expires_at'], tz=dt_timezone.utc),
+            datetime.fromtimestamp(stale_until, tz=dt_timezone.utc) if stale_until else None,
+        )
+
+    def get(self, key):
+        raw = self.redis.get(self._entry_key(key))
+        if raw is None:
+            return None
+        entry = self._load(raw)
+        return entry if entry.is_usable() else None
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.redis.mget([self._entry_key(key) for key in keys])
+        entries = {key: self._load(raw) for key, raw in zip(keys, values) if raw is not None}
+        return {key: entry for key, entry in entries.items() if entry.is_fresh()}
+
+    def set(self, key, entry, tags=()):
+        now_ms = int(time.time() * 1000)
+        retain_ms = int(entry.retain_until.timestamp() * 1000)
+        self.redis.set(self._entry_key(key), self._dump(entry), px=max(1, retain_ms - now_ms))
+
+        entry_tags_key = self._entry_tags_key(key)
+        new = sorted({self._tag_key(tag) for tag in tags})
+        previous = {tag.decode() if isinstance(tag, bytes) else tag for tag in self.redis.smembers(entry_tags_key)}
+        if new or previous:
+            stale = sorted(previous - set(new))
+            self.redis.eval(self.SET_TAGS_SCRIPT, 1 + len(new) + len(stale), entry_tags_key, *new, *stale,
+                            key, retain_ms, now_ms, len(new))
+
+    def invalidate_tags(self, tags):
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        pipe = self.redis.pipeline()
+        for tag_key in tag_keys:
+            pipe.zrange(tag_key, 0, -1)
+        keys = sorted({
+            key.decode() if isinstance(key, bytes) else key
+            for members in pipe.execute() for key in members
+        })
+        pipe = self.redis.pipeline()
+        if keys:
+            pipe.delete(*[self._entry_key(key) for key in keys], *[self._entry_tags_key(key) for key in keys])
+        pipe.delete(*tag_keys)
+        pipe.execute()
+        return keys
+
+    def lock(self, key):
+        return RedisLock(key, self.redis, f"{self.prefix}:lock:{key}", _lock_ttl())
+
+    def clear(self, expired_only=False):
+        # Истекшие записи Redis удаляет сам по PX
+        if expired_only:
+            return 0
+        count = 0
+        for redis_key in self.redis.scan_iter(match=f"{self.prefix}:*"):
+            count += self.redis.delete(redis_key)
+        return count
+
+
+@lru_cache(maxsize=None)
+def get_cache_backend() -> BaseCacheBackend:
+    """Хранилище кэша из настройки WB_CACHE_BACKEND (по умолчанию - таблицы БД)"""
+    config = getattr(settings, 'WB_CACHE_BACKEND', {})
+    backend_cls = import_string(config.get('BACKEND', 'wb_api.client.models.backends.ORMCacheBackend'))
+    return backend_cls(**config.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def reset_cache_backend(setting, **kwargs):
+    if setting == 'WB_CACHE_BACKEND':
+        get_cache_backend.cache_clear()
@@ -1,24 +1,66 @@
 from django.db import models
 from django.utils import timezone
-import json
+import hashlib
+import inspect
+import logging
 from datetime import timedelta
 from functools import wraps
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache as django_cache
+
+from wb_api import codec
 from wb_api.models import WBResponse
+from .backends import CacheEntry, get_cache_backend
+from .compression import PLAIN, encode_payload
+from .memory import MemoryCache
+from .singleflight import AsyncSingleFlight, SingleFlight
+from ..resilience import is_transient, stale_if_error
+
+logger = logging.getLogger(__name__)
 
 
 class ClientAPICache(models.Model):
     endpoint = models.CharField(max_length=255, unique=True)
-    response = models.JSONField()
+    # Несжатый payload; для крупных ответов пуст, данные лежат в payload
+    response = codec.JSONField(null=True, blank=True)
+    # Сжатый JSON payload'а (encoding: 'gzip' или 'zstd')
+    payload = models.BinaryField(null=True, blank=True)
+    encoding = models.CharField(max_length=10, blank=True, default=PLAIN)
     expires_at = models.DateTimeField()
+    stale_until = models.DateTimeField(null=True, blank=True)
+
+    ENTRY_FIELDS = ('response', 'payload', 'encoding', 'expires_at', 'stale_until')
+
+    @staticmethod
+    def _generate_cache_key(endpoint, params=None):
+        """Ключ строки кэша на основе endpoint и параметров"""
+        return f"{endpoint}:{codec.canonical(params) if params else ''}"
+
+    @staticmethod
+    def storage_fields(payload, options=None):
+        """Значения колонок для payload с учетом порога сжатия"""
+        response, raw, encoding = encode_payload(payload, options)
+        return {'response': response, 'payload': raw, 'encoding': encoding}
+
+    @staticmethod
+    def _to_entry(response, payload, encoding, expires_at, stale_until):
+        if encoding:
+            return CacheEntry(None, expires_at, stale_until, raw=payload, encoding=encoding)
+        return CacheEntry(response, expires_at, stale_until)
 
     @classmethod
-    def set_cached_response(cls, endpoint, response, params=None, ttl=300):
-        from django.utils import timezone
-        from datetime import timedelta
-        import json
+    def set_cached_response(cls, endpoint, response, params=None, ttl=300, stale_ttl=None):
+        """
+        Сохранение ответа в кэш; возвращает CacheEntry записи
 
-        cache_key = f"{endpoint}:{json.dumps(params, sort_keys=True) if params else ''}"
+        Args:
+            ttl: время свежести записи, секунды
+            stale_ttl: льготный период после ttl, в течение которого запись
+                еще можно отдавать (stale-while-revalidate)
+        """
+        cache_key = cls._generate_cache_key(endpoint, params)
 
         serialized_data = {
             'success': response.success,
@@ -26,54 +68,364 @@ class ClientAPICache(models.Model):
             'error': response.error,
             'status_code': response.status_code
         }
+        expires_at = timezone.now() + timedelta(seconds=ttl)
+        stale_until = expires_at + timedelta(seconds=stale_ttl) if stale_ttl else None
 
         cls.objects.update_or_create(
             endpoint=cache_key,
             defaults={
-                'response': serialized_data,
-                'expires_at': timezone.now() + timedelta(seconds=ttl)
+                **cls.storage_fields(serialized_data),
+                'expires_at': expires_at,
+                'stale_until': stale_until
             }
         )
+        return CacheEntry(serialized_data, expires_at, stale_until)
 
     @classmethod
-    def get_cached_response(cls, endpoint, params=None):
-        import json
-        from django.utils import timezone
-
-        cache_key = f"{endpoint}:{json.dumps(params, sort_keys=True) if params else ''}"
+    def get_cached_entry(cls, endpoint, params=None):
+        """Пригодная запись кэша (свежая или в льготном периоде) или None"""
+        cache_key = cls._generate_cache_key(endpoint, params)
         try:
             cached = cls.objects.get(endpoint=cache_key)
-            if cached.expires_at > timezone.now():
-                return cached.response
+            entry = cls._to_entry(*(getattr(cached, field) for field in cls.ENTRY_FIELDS))
+            if entry.is_usable():
+                return entry
             cached.delete()
         except cls.DoesNotExist:
             return None
 
+    @classmethod
+    def get_cached_response(cls, endpoint, params=None):
+        entry = cls.get_cached_entry(endpoint, params)
+        return entry.payload if entry and entry.is_fresh() else None
+
+    @classmethod
+    def get_cached_entries(cls, endpoints):
+        """Пакетное чтение свежих записей одним запросом: {endpoint: CacheEntry}"""
+        keys = {cls._generate_cache_key(endpoint): endpoint for endpoint in endpoints}
+        rows = cls.objects.filter(
+            endpoint__in=list(keys),
+            expires_at__gt=timezone.now()
+        ).values_list('endpoint', *cls.ENTRY_FIELDS)
+        return {keys[row[0]]: cls._to_entry(*row[1:]) for row in rows}
+
+
+class APICacheTag(models.Model):
+    """
+    Индекс тег -> ключ кэша для точечной инвалидации.
+
+    Тег описывает сущность, упомянутую в закэшированном ответе
+    (product:<id>, category:<id>, seller:<hash токена>).
+    """
+    tag = models.CharField(max_length=100)
+    key = models.CharField(max_length=255, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'key'], name='api_cache_tag_unique'),
+        ]
+
+
+def product_tag(prd_id):
+    return f"product:{prd_id}"
+
+
+def category_tag(category_id):
+    return f"category:{category_id}"
+
+
+def seller_key(token):
+    """Идентификатор продавца: хэш токена, чтобы не хранить сам токен в БД"""
+    return hashlib.sha256(str(token).encode()).hexdigest()[:16]
 
-def cache_api_call(ttl=300):
+
+def seller_tag(token):
+    return f"seller:{seller_key(token)}"
+
+
+# Первый уровень кэша: память процесса перед хранилищем из WB_CACHE_BACKEND
+memory_cache = MemoryCache.from_settings()
+
+# Объединение одновременных промахов по одному ключу внутри процесса
+single_flight = SingleFlight()
+async_single_flight = AsyncSingleFlight()
+
+
+def _lock_timeout():
+    return getattr(settings, 'WB_CACHE_LOCK_TIMEOUT', 30)
+
+
+def _remember(cache_key, entry):
+    """Помещение записи в memory_cache до конца ее льготного периода"""
+    memory_cache.set(cache_key, entry, entry.retain_until, size=entry.size)
+
+
+def _load_cached(cache_key):
+    """Чтение записи из хранилища с прогревом memory_cache"""
+    entry = get_cache_backend().get(cache_key)
+    if entry is not None:
+        _remember(cache_key, entry)
+    return entry
+
+
+def get_cached_entry(cache_key):
+    """Пригодная запись кэша (сначала память процесса, затем хранилище) или None"""
+    entry = memory_cache.get(cache_key)
+    if entry is None:
+        entry = _load_cached(cache_key)
+    return entry
+
+
+async def aget_cached_entry(cache_key):
+    """get_cached_entry() для корутин: хранилище читается через sync_to_async"""
+    entry = memory_cache.get(cache_key)
+    if entry is None:
+        entry = await sync_to_async(_load_cached)(cache_key)
+    return entry
+
+
+def get_cached(cache_key):
+    """Payload свежей записи кэша или None"""
+    entry = get_cached_entry(cache_key)
+    return entry.payload if entry and entry.is_fresh() else None
+
+
+def get_many_cached(cache_keys):
+    """Пакетное чтение свежих записей: промахи памяти дочитываются из хранилища одним запросом"""
+    found, missing = {}, []
+    for key in cache_keys:
+        entry = memory_cache.get(key)
+        if entry is not None and entry.is_fresh():
+            found[key] = entry.payload
+        else:
+            missing.append(key)
+    if missing:
+        for key, entry in get_cache_backend().get_many(missing).items():
+            _remember(key, entry)
+            found[key] = entry.payload
+    return found
+
+
+def set_cached(cache_key, response, ttl, stale_ttl=None, tags=()):
+    """Сохранение ответа в хранилище и в память процесса с одинаковым expires_at"""
+    expires_at = timezone.now() + timedelta(seconds=ttl)
+    # Запись хранится и после stale_ttl - как резерв на случай недоступности API
+    retain = max(stale_ttl or 0, stale_if_error())
+    entry = CacheEntry(
+        payload={
+            'success': response.success,
+            'data': response.data,
+            'error': response.error,
+            'status_code': response.status_code
+        },
+        expires_at=expires_at,
+        stale_until=expires_at + timedelta(seconds=retain) if retain else None
+    )
+    get_cache_backend().set(cache_key, entry, tags)
+    _remember(cache_key, entry)
+
+
+def invalidate_tags(*tags):
+    """
+    Удаление всех записей кэша, помеченных любым из тегов.
+
+    Возвращает число удаленных ключей. Другие процессы перестают отдавать
+    удаленные записи из своей памяти не позже чем через WB_CACHE_MEMORY['MAX_TTL']
+    секунд (по умолчанию 30).
+    """
+    keys = get_cache_backend().invalidate_tags(tags)
+    for key in keys:
+        memory_cache.delete(key)
+    return len(keys)
+
+
+def cache_namespace(client):
+    """Пространство имен кэша клиента: tenant, по умолчанию - хэш токена продавца (seller_key)"""
+    tenant = getattr(client, 'tenant', '')
+    if tenant:
+        return tenant
+    token = getattr(client, 'token', None)
+    return seller_key(token) if token else ''
+
+
+def make_cache_key(func_name, args, kwargs, namespace=''):
+    """Ключ кэша для вызова метода клиента (с префиксом пространства имен, если оно задано)"""
+    key = f"{func_name}:{args}:{kwargs}"
+    return f"{namespace}|{key}" if namespace else key
+
+
+def _refresh_flag(cache_key):
+    return f"wb_api:refresh:{cache_key}"
+
+
+def refresh_done(cache_key):
+    """Снятие отметки о поставленном обновлении: следующее устаревание снова ставит задачу"""
+    django_cache.delete(_refresh_flag(cache_key))
+
+
+def schedule_refresh(client, func_name, cache_key, args, kwargs, stale_ttl):
+    """
+    Постановка фонового обновления устаревшей записи в очередь Celery.
+
+    Повторная постановка для того же ключа подавляется, пока задача не
+    завершится (refresh_done), но не дольше stale_ttl - на случай потери задачи.
+    """
+    from wb_api.tasks import refresh_api_cache_task
+
+    if not django_cache.add(_refresh_flag(cache_key), True, timeout=stale_ttl):
+        return
+    client_cls = type(client)
+    namespace = cache_namespace(client)
+    try:
+        refresh_api_cache_task.delay(
+            f"{client_cls.__module__}.{client_cls.__qualname__}",
+            func_name, client.token, list(args), kwargs, tenant=namespace
+        )
+    except Exception as e:
+        refresh_done(cache_key)
+        logger.warning(f"Не удалось поставить обновление кэша {cache_key}: {e}")
+
+
+def _serves_stale(entry, stale_ttl):
+    """Устаревшая запись в пределах stale_ttl метода: отдается с фоновым обновлением"""
+    return bool(stale_ttl) and timezone.now() <= entry.expires_at + timedelta(seconds=stale_ttl)
+
+
+def _fallback(result, entry, cache_key):
+    """Последний сохраненный ответ вместо ошибки, если API недоступно"""
+    if entry is not None and isinstance(result, WBResponse) and is_transient(result):
+        logger.warning(f"API недоступно ({result.error}), отдается устаревший кэш {cache_key}")
+        return WBResponse(**entry.payload)
+    return result
+
+
+def _entry_tags(client, tags, result, args, kwargs):
+    """Теги записи: продавец клиента и теги, вычисленные по результату"""
+    entry_tags = [seller_tag(client.token)] if getattr(client, 'token', None) else []
+    if tags is not None:
+        entry_tags.extend(tags(client, result, *args, **kwargs))
+    return entry_tags
+
+
+def cache_api_call(ttl=300, stale_ttl=None, tags=None):
+    """
+    Кэширование результата метода клиента.
+
+    Каждая запись помечается тегом продавца (seller_tag) и тегами,
+    которые возвращает tags(client, result, *args, **kwargs); по ним
+    invalidate_tags() точечно сбрасывает кэш после изменений.
+
+    Ответ ищется сначала в памяти процесса (memory_cache), затем в хранилище
+    из настройки WB_CACHE_BACKEND (по умолчанию - таблица ClientAPICache).
+    Кэшируются только успешные ответы.
+
+    Промахи по одному ключу объединяются: внутри процесса одновременные вызовы
+    ждут результат первого (single_flight), между процессами обновление ключа
+    выполняется под блокировкой хранилища (advisory lock для БД), а дождавшиеся
+    блокировки перечитывают кэш.
+
+    При заданном stale_ttl запись, устаревшая не более чем на stale_ttl секунд,
+    отдается сразу, а ее обновление ставится в очередь Celery
+    (wb_api.tasks.refresh_api_cache_task).
+
+    Если API недоступно (сетевая ошибка, 5xx, разомкнутый circuit breaker),
+    отдается последний сохраненный ответ: записи хранятся еще
+    WB_RESILIENCE['STALE_IF_ERROR'] секунд после истечения.
+
+    Ключи записей получают префикс tenant клиента (по умолчанию - хэш токена,
+    см. cache_namespace), поэтому ответы разных продавцов не смешиваются.
+
+    Поддерживает как обычные методы, так и корутины (async-клиенты):
+    для корутин обращения к БД выполняются через sync_to_async.
+    """
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                cache_key = make_cache_key(func.__name__, args, kwargs, cache_namespace(self))
+
+                # Проверка кэша
+                entry = await aget_cached_entry(cache_key)
+                if entry is not None:
+                    if entry.is_fresh():
+                        return WBResponse(**entry.payload)
+                    if _serves_stale(entry, stale_ttl):
+                        await sync_to_async(schedule_refresh)(
+                            self, func.__name__, cache_key, args, kwargs, stale_ttl
+                        )
+                        return WBResponse(**entry.payload)
+
+                result = await async_single_flight.do(cache_key, lambda: fill(self, cache_key, args, kwargs))
+                return _fallback(result, entry, cache_key)
+
+            async def fill(self, cache_key, args, kwargs):
+                """Заполнение промаха под межпроцессной блокировкой ключа"""
+                lock = get_cache_backend().lock(cache_key)
+                await lock.aacquire(_lock_timeout())
+                try:
+                    if lock.contended:
+                        # Пока ждали блокировку, ключ мог заполнить другой процесс
+                        entry = await sync_to_async(_load_cached)(cache_key)
+                        if entry is not None and entry.is_fresh():
+                            return WBResponse(**entry.payload)
+                    return await refresh(self, *args, **kwargs)
+                finally:
+                    await sync_to_async(lock.release)()
+
+            async def refresh(self, *args, **kwargs):
+                """Вызов оригинальной корутины и сохранение результата в кэш"""
+                result = await func(self, *args, **kwargs)
+                if isinstance(result, WBResponse) and result.success:
+                    cache_key = make_cache_key(func.__name__, args, kwargs, cache_namespace(self))
+                    entry_tags = _entry_tags(self, tags, result, args, kwargs)
+                    await sync_to_async(set_cached)(cache_key, result, ttl, stale_ttl, entry_tags)
+                return result
+
+            async_wrapper.cache_ttl = ttl
+            async_wrapper.refresh = refresh
+            return async_wrapper
+
         @wraps(func)
         def wrapper(self, *args, **kwargs):
-            cache_key = f"{func.__name__}:{args}:{kwargs}"
+            cache_key = make_cache_key(func.__name__, args, kwargs, cache_namespace(self))
 
             # Проверка кэша
-            cached = ClientAPICache.get_cached_response(cache_key)
-            if cached:
-                return WBResponse(**cached)
+            entry = get_cached_entry(cache_key)
+            if entry is not None:
+                if entry.is_fresh():
+                    return WBResponse(**entry.payload)
+                if _serves_stale(entry, stale_ttl):
+                    schedule_refresh(self, func.__name__, cache_key, args, kwargs, stale_ttl)
+                    return WBResponse(**entry.payload)
 
-            # Вызов оригинальной функции
-            result = func(self, *args, **kwargs)
+            result = single_flight.do(cache_key, lambda: fill(self, cache_key, args, kwargs), timeout=_lock_timeout())
+            return _fallback(result, entry, cache_key)
 
-            # Сохранение в кэш
-            if isinstance(result, WBResponse):
-                ClientAPICache.set_cached_response(
-                    endpoint=cache_key,
-                    response=result,
-                    ttl=ttl
-                )
+        def fill(self, cache_key, args, kwargs):
+            """Заполнение промаха под межпроцессной блокировкой ключа"""
+            lock = get_cache_backend().lock(cache_key)
+            lock.acquire(_lock_timeout())
+            try:
+                if lock.contended:
+                    # Пока ждали блокировку, ключ мог заполнить другой процесс
+                    entry = _load_cached(cache_key)
+                    if entry is not None and entry.is_fresh():
+                        return WBResponse(**entry.payload)
+                return refresh(self, *args, **kwargs)
+            finally:
+                lock.release()
 
+        def refresh(self, *args, **kwargs):
+            """Вызов оригинальной функции и сохранение результата в кэш"""
+            result = func(self, *args, **kwargs)
+            if isinstance(result, WBResponse) and result.success:
+                entry_tags = _entry_tags(self, tags, result, args, kwargs)
+                cache_key = make_cache_key(func.__name__, args, kwargs, cache_namespace(self))
+                set_cached(cache_key, result, ttl, stale_ttl, entry_tags)
             return result
 
+        wrapper.cache_ttl = ttl
+        wrapper.refresh = refresh
         return wrapper
 
-    return decorator
\ No newline at end of file
+    return decorator
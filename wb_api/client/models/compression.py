@@ -0,0 +1,87 @@
+"""
+Сжатое бинарное хранение крупных payload'ов кэша.
+
+Payload не меньше WB_CACHE_COMPRESSION['THRESHOLD'] байт сериализуется в JSON,
+сжимается ('gzip' из стандартной библиотеки или 'zstd' при установленном
+пакете zstandard) и хранится в бинарной колонке; распаковка выполняется
+только при обращении к данным.
+"""
+import gzip
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from wb_api import codec
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Значение encoding для несжатых записей в JSONField
+PLAIN = ''
+
+
+def _zstd():
+    if zstandard is None:
+        raise ImproperlyConfigured("Для сжатия кэша 'zstd' установите пакет zstandard")
+    return zstandard
+
+
+def compress(data: bytes, encoding: str, level=None) -> bytes:
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=level or 6)
+    if encoding == 'zstd':
+        return _zstd().ZstdCompressor(level=level or 3).compress(data)
+    raise ImproperlyConfigured(f"Unknown cache compression: {encoding}")
+
+
+def decompress(raw: bytes, encoding: str) -> bytes:
+    if encoding == 'gzip':
+        # zlib с wbits=31 распаковывает gzip без файловой обертки gzip.GzipFile
+        return zlib.decompress(raw, wbits=31)
+    if encoding == 'zstd':
+        return _zstd().ZstdDecompressor().decompress(raw)
+    raise ImproperlyConfigured(f"Unknown cache compression: {encoding}")
+
+
+def decoded_size(raw: bytes, encoding: str) -> int:
+    """Размер распакованных данных без распаковки (из заголовков формата)"""
+    if encoding == 'gzip':
+        return int.from_bytes(raw[-4:], 'little')  # ISIZE из трейлера gzip
+    if encoding == 'zstd':
+        size = _zstd().frame_content_size(raw)
+        if size >= 0:
+            return size
+    return len(raw)
+
+
+def get_options():
+    options = getattr(settings, 'WB_CACHE_COMPRESSION', {})
+    return {
+        'threshold': options.get('THRESHOLD'),
+        'encoding': options.get('CODEC', 'gzip'),
+        'level': options.get('LEVEL'),
+    }
+
+
+def encode_payload(payload, options=None):
+    """
+    Подготовка payload к записи в БД.
+
+    Returns:
+        (json_payload, raw, encoding): либо payload для JSONField,
+        либо сжатые байты для бинарной колонки
+    """
+    options = options or get_options()
+    if options['threshold'] is None:
+        return payload, None, PLAIN
+    data = codec.dumps(payload, default=codec.django_default)
+    if len(data) < options['threshold']:
+        return payload, None, PLAIN
+    return None, compress(data, options['encoding'], options['level']), options['encoding']
+
+
+def decode_payload(raw, encoding):
+    return codec.loads(decompress(bytes(raw), encoding))
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from wb_api import codec
+
+
+class MemoryCache:
+    """
+    Потокобезопасный in-memory кэш процесса с ограничением по числу записей и байтам.
+
+    Используется как первый уровень перед ClientAPICache: срок жизни записи
+    берется из expires_at строки в БД, поэтому запись никогда не живет в памяти
+    дольше, чем в базе, и дополнительно ограничен max_ttl: invalidate_tags
+    очищает память только своего процесса, остальные процессы перечитывают
+    хранилище не позже чем через max_ttl секунд.
+
+    Политики вытеснения:
+        - 'lru': вытесняется запись, к которой дольше всего не обращались
+        - 'fifo': вытесняется самая старая по времени добавления запись
+    """
+    POLICIES = ('lru', 'fifo')
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, policy='lru', max_ttl=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.max_ttl = max_ttl
+        self.current_bytes = 0
+        self._entries = OrderedDict()  # key -> (payload, expires_ts, size)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        options = getattr(settings, 'WB_CACHE_MEMORY', {})
+        return cls(
+            max_entries=options.get('MAX_ENTRIES', 1024),
+            max_bytes=options.get('MAX_BYTES', 64 * 1024 * 1024),
+            policy=options.get('POLICY', 'lru'),
+            max_ttl=options.get('MAX_TTL', 30),
+        )
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Непросроченный payload по ключу или None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, expires_ts, _ = entry
+            if expires_ts <= time.time():
+                self._pop(key)
+                return None
+            if self.policy == 'lru':
+                self._entries.move_to_end(key)
+            return payload
+
+    def set(self, key, payload, expires_at, size=None):
+        """
+        Сохранение payload до момента expires_at (datetime).
+
+        Записи больше max_bytes не кэшируются; остальные вытесняют старые
+        по выбранной политике, пока не уложатся в лимиты.
+        """
+        if not self.enabled:
+            return
+        expires_ts = expires_at.timestamp()
+        if self.max_ttl is not None:
+            expires_ts = min(expires_ts, time.time() + self.max_ttl)
+        if size is None:
+            size = len(codec.dumps(payload, default=str))
+        if size > self.max_bytes:
+            self.delete(key)
+            return
+
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (payload, expires_ts, size)
+            self.current_bytes += size
+            while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
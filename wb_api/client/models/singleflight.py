@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+
+
+class SingleFlight:
+    """
+    Объединение одновременных вызовов по ключу внутри процесса.
+
+    Первый вызвавший (лидер) выполняет функцию, остальные потоки ждут
+    его результат на общем Future, а не выполняют ее повторно.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout=None):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                # Лидер завис - выполняем вызов самостоятельно
+                return fn()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class AsyncSingleFlight:
+    """Аналог SingleFlight для корутин: ожидающие получают результат задачи лидера"""
+
+    def __init__(self):
+        self._tasks = {}
+
+    async def do(self, key, coro_fn):
+        loop_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(loop_key)
+        if task is None:
+            task = self._tasks[loop_key] = asyncio.ensure_future(coro_fn())
+            task.add_done_callback(lambda _: self._tasks.pop(loop_key, None))
+        return await asyncio.shield(task)
+
+
+class CacheLock:
+    """
+    Межпроцессная блокировка ключа кэша.
+
+    Подклассы реализуют неблокирующий try_acquire() и release(),
+    ожидание с таймаутом (синхронное и для корутин) общее.
+    """
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, key):
+        self.key = key
+        self.acquired = False
+        self.contended = False  # Блокировку пришлось ждать
+
+    def try_acquire(self):
+        raise NotImplementedError
+
+    def release(self):
+        raise NotImplementedError
+
+    def acquire(self, timeout):
+        """Ожидание блокировки не дольше timeout секунд; возвращает успех"""
+        deadline = time.monotonic() + timeout
+        while not self.try_acquire():
+            self.contended = True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.POLL_INTERVAL)
+        return True
+
+    async def aacquire(self, timeout):
+        """acquire() для корутин: ожидание не блокирует поток sync_to_async"""
+        deadline = time.monotonic() + timeout
+        while not await sync_to_async(self.try_acquire)():
+            self.contended = True
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(self.POLL_INTERVAL)
+        return True
+
+
+class AdvisoryLock(CacheLock):
+    """
+    Блокировка ключа через advisory lock PostgreSQL.
+
+    Блокировка сессионная: снимается явно через release() (или при разрыве
+    соединения). На других СУБД межпроцессной блокировки нет, и try_acquire()
+    всегда успешен.
+    """
+
+    def __init__(self, key):
+        super().__init__(key)
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        self.lock_id = int.from_bytes(digest, 'big', signed=True)
+
+    @property
+    def supported(self):
+        return connection.vendor == 'postgresql'
+
+    def try_acquire(self):
+        if not self.supported:
+            self.acquired = True
+            return True
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [self.lock_id])
+            self.acquired = cursor.fetchone()[0]
+        return self.acquired
+
+    def release(self):
+        if self.acquired and self.supported:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [self.lock_id])
+        self.acquired = False
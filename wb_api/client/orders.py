@@ -1,21 +1,49 @@
 # wb_api/client/orders.py
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
+from django.conf import settings
 from .base import WBClientBase, WBResponse
 from .models.cache import cache_api_call
+from .models.schemas import OrderSchema
+from .pagination import iter_pages
+
+
+def normalize_orders(response: WBResponse) -> WBResponse:
+    """Нормализация ответа со списком заказов"""
+    if response.success and isinstance(response.data, dict):
+        # Нормализуем данные для единообразия
+        orders = response.data.get('orders', [])
+        return WBResponse(
+            success=True,
+            data={'orders': orders},
+            error=None,
+            status_code=200
+        )
+    return response
 
 
 class WBOrdersClient(WBClientBase):
     @cache_api_call(ttl=3600)
     def get_orders(self, params: Optional[Dict[str, Any]] = None) -> WBResponse:
         response = self._request("GET", "/api/v1/orders", params=params)
+        return normalize_orders(response)
+
+    def iter_orders(self, params: Optional[Dict[str, Any]] = None, page_size: Optional[int] = None,
+                    prefetch: bool = True, stream: bool = False) -> Iterator[OrderSchema]:
+        """
+        Постраничный обход всех заказов без кэширования
+
+        Args:
+            params: query-параметры как в get_orders (limit и offset задаются итератором)
+            page_size: размер страницы (по умолчанию WB_PAGE_SIZE)
+            prefetch: загружать следующую страницу, пока обрабатывается текущая
+            stream: разбирать страницу по мере чтения тела ответа, не загружая его целиком
+        """
+        page_size = page_size or getattr(settings, 'WB_PAGE_SIZE', 1000)
+        request_kwargs = {'stream': True} if stream else {}
+        base_params = {k: v for k, v in (params or {}).items() if k not in ('limit', 'offset')}
+
+        def fetch_page(offset):
+            page_params = {**base_params, 'limit': page_size, 'offset': offset}
+            return self._request("GET", "/api/v1/orders", params=page_params, **request_kwargs)
 
-        if response.success and isinstance(response.data, dict):
-            # Нормализуем данные для единообразия
-            orders = response.data.get('orders', [])
-            return WBResponse(
-                success=True,
-                data={'orders': orders},
-                error=None,
-                status_code=200
-            )
-        return response
\ No newline at end of file
+        return iter_pages(fetch_page, page_size, OrderSchema, items_keys=('orders', 'items'), prefetch=prefetch)
@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Sequence, Type
+
+from pydantic import BaseModel, ValidationError
+
+from wb_api.exceptions import WBAPIError, WBValidationError
+from wb_api.models import WBResponse
+from .stats import api_stats, mark_worker_thread
+from .streaming import JSONStream
+from .validation import adapter
+
+
+def page_items(data, items_keys: Sequence[str]):
+    """Список элементов страницы по первому найденному ключу"""
+    if isinstance(data, dict):
+        for key in items_keys:
+            if key in data:
+                return data[key] or []
+    return []
+
+
+def validate_items(validator, items) -> Iterator[BaseModel]:
+    for item in items:
+        try:
+            yield validator.validate_python(item)
+        except ValidationError as e:
+            raise WBValidationError(str(e)) from e
+
+
+def iter_pages(fetch_page: Callable[[int], WBResponse], page_size: int, schema: Type[BaseModel],
+               items_keys: Sequence[str] = ('items',), prefetch: bool = True) -> Iterator[BaseModel]:
+    """
+    Обход всех страниц списка по limit/offset с поэлементной валидацией.
+
+    В памяти одновременно находятся не более двух страниц: текущая и,
+    при prefetch=True, следующая, которая загружается в фоновом потоке,
+    пока вызывающий код обрабатывает текущую.
+
+    Если fetch_page возвращает ответ с JSONStream (запрос с stream=True),
+    элементы разбираются по мере чтения тела, а следующая страница
+    запрашивается после дочитывания текущей.
+
+    Args:
+        fetch_page: функция загрузки страницы по offset
+        page_size: размер страницы (limit)
+        schema: pydantic-схема элемента
+        items_keys: ключи списка элементов в ответе
+        prefetch: загружать следующую страницу заранее
+
+    Raises:
+        WBAPIError: страница не загрузилась
+        WBValidationError: элемент не прошел валидацию
+    """
+    executor = ThreadPoolExecutor(max_workers=1, initializer=mark_worker_thread) if prefetch else None
+
+    def request(offset):
+        return executor.submit(fetch_page, offset) if executor else fetch_page(offset)
+
+    validator = adapter(schema)
+    try:
+        offset = 0
+        pending = request(offset)
+        while True:
+            response = pending.result() if executor else pending
+            if not response.success:
+                raise WBAPIError(response.error, status_code=response.status_code)
+            if executor:
+                # Страница загружена потоком предзагрузки - статистику сбрасывает потребитель
+                api_stats.maybe_flush()
+
+            stream = response.data if isinstance(response.data, JSONStream) else None
+            if stream is not None:
+                yield from validate_items(validator, stream.items(items_keys))
+                count, total = stream.count, stream.envelope.get('total')
+            else:
+                items = page_items(response.data, items_keys)
+                count = len(items)
+                total = response.data.get('total') if isinstance(response.data, dict) else None
+
+            next_offset = offset + count
+            # При известном total короткая страница не конец: API может ограничивать limit
+            has_more = (count > 0 and next_offset < total) if total is not None else count >= page_size
+            if has_more:
+                pending = request(next_offset)
+            if stream is None:
+                yield from validate_items(validator, items)
+
+            if not has_more:
+                return
+            offset = next_offset
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,52 @@
+"""
+Пул клиентов для обслуживания многих продавцов в одном процессе.
+
+Клиент хранит только свой токен и пространство имен кэша, а соединения
+берет из общей сессии (wb_api.client.sessions), поэтому клиенты разных
+продавцов можно использовать одновременно из разных потоков: учетные
+данные передаются с каждым запросом, а записи кэша разделены по tenant.
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional, Type, TypeVar
+
+from .models.cache import seller_key
+
+ClientT = TypeVar('ClientT')
+
+
+class ClientPool:
+    """
+    Клиенты по (класс клиента, токен, tenant) с ограничением размера (LRU).
+
+    По умолчанию tenant - хэш токена продавца (seller_key), то есть кэш
+    каждого продавца изолирован.
+    """
+
+    def __init__(self, max_clients: int = 1024):
+        self.max_clients = max_clients
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, client_cls: Type[ClientT], token: str, tenant: Optional[str] = None) -> ClientT:
+        tenant = tenant if tenant is not None else seller_key(token)
+        key = (client_cls, token, tenant)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = client_cls(token=token, tenant=tenant)
+                if len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(key)
+        return client
+
+    def __len__(self):
+        return len(self._clients)
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+
+client_pool = ClientPool()
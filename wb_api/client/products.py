@@ -1,12 +1,133 @@
 from .base import WBClientBase, WBResponse
-from .models.cache import cache_api_call
+from .models.cache import (
+    cache_api_call, cache_namespace, category_tag, get_many_cached, invalidate_tags, make_cache_key, product_tag,
+    seller_tag, set_cached,
+)
 from .models.schemas import ProductSchema, ProductListSchema
+from .pagination import iter_pages
+from .stats import api_stats, mark_worker_thread
+from .validation import validated_response
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple
+from django.conf import settings
+
+
+def build_prds_params(filter: Optional[Dict] = None) -> Dict[str, Any]:
+    """Преобразование фильтра get_prds в query-параметры API"""
+    params = {}
+    if filter:
+        if 'status' in filter:
+            params['status'] = filter['status']
+        if 'date_from' in filter:
+            if isinstance(filter['date_from'], datetime):
+                params['dateFrom'] = filter['date_from'].isoformat()
+            else:
+                params['dateFrom'] = filter['date_from']
+        if 'limit' in filter:
+            params['limit'] = filter['limit']
+        if 'offset' in filter:
+            params['offset'] = filter['offset']
+    return params
+
+
+def _items(data):
+    if isinstance(data, dict):
+        return data.get('items') or data.get('products') or []
+    return []
+
+
+def _product_entity_tags(product):
+    """Теги товара и его категории по словарю товара (в alias- или python-нотации)"""
+    if not isinstance(product, dict):
+        return []
+    tags = []
+    prd_id = product.get('productId', product.get('product_id'))
+    if prd_id is not None:
+        tags.append(product_tag(prd_id))
+    category_id = product.get('categoryId', product.get('category_id'))
+    if category_id is not None:
+        tags.append(category_tag(category_id))
+    return tags
+
+
+def product_list_tags(client, result, filter=None):
+    """Теги get_prds: все товары и категории из списка"""
+    return [tag for product in _items(result.data) for tag in _product_entity_tags(product)]
+
+
+def single_product_tags(client, result, prd_id):
+    """Теги get_prd/get_comission: сам товар и его категория"""
+    return [product_tag(prd_id), *_product_entity_tags(result.data)]
+
+
+def detail_calls(ids: Iterable[str], include_commission: bool = True) -> List[Tuple[str, str]]:
+    """Список уникальных вызовов (метод, prd_id), нужных для get_prds_details"""
+    methods = ('get_prd', 'get_comission') if include_commission else ('get_prd',)
+    return [(method, prd_id) for prd_id in dict.fromkeys(ids) for method in methods]
+
+
+def lookup_cached_details(calls: List[Tuple[str, str]], namespace: str = ''):
+    """
+    Проверка кэша для всех вызовов: память процесса, затем один запрос к БД.
+
+    Args:
+        calls: вызовы (метод, prd_id)
+        namespace: пространство имен кэша клиента (cache_namespace)
+
+    Returns:
+        (найденные ответы {(метод, prd_id): WBResponse}, список промахов)
+    """
+    keys = {call: make_cache_key(call[0], (call[1],), {}, namespace) for call in calls}
+    cached = get_many_cached(keys.values())
+    results, misses = {}, []
+    for call, key in keys.items():
+        if key in cached:
+            results[call] = WBResponse(**cached[key])
+        else:
+            misses.append(call)
+    return results, misses
+
+
+def store_details(client, fetched: Dict[Tuple[str, str], WBResponse]):
+    """Сохранение успешно загруженных ответов в кэш с TTL соответствующих методов"""
+    for (method, prd_id), response in fetched.items():
+        if not response.success:
+            continue
+        set_cached(
+            make_cache_key(method, (prd_id,), {}, cache_namespace(client)), response,
+            getattr(type(client), method).cache_ttl,
+            tags=[seller_tag(client.token), *single_product_tags(client, response, prd_id)]
+        )
+
+
+def assemble_details(ids: List[str], include_commission: bool,
+                     results: Dict[Tuple[str, str], WBResponse]) -> WBResponse:
+    """Сборка результата get_prds_details в порядке входных ID"""
+    items, errors = [], {}
+    for prd_id in ids:
+        product = results[('get_prd', prd_id)]
+        commission = results.get(('get_comission', prd_id))
+        item_errors = [r.error or f"HTTP {r.status_code}" for r in (product, commission) if r is not None and not r.success]
+        error = '; '.join(item_errors) or None
+        if error:
+            errors[prd_id] = error
+        items.append({
+            'prd_id': prd_id,
+            'product': product.data if product.success else None,
+            'commission': commission.data if commission is not None and commission.success else None,
+            'error': error,
+        })
+    return WBResponse(
+        success=not errors,
+        data={'items': items, 'errors': errors},
+        error=f"Не удалось загрузить {len(errors)} из {len(set(ids))} товаров" if errors else None,
+        status_code=200
+    )
 
 
 class WBProductsClient(WBClientBase):
-    @cache_api_call(ttl=1800)  # 30 минут кэширования для списка товаров
+    @cache_api_call(ttl=1800, stale_ttl=3600, tags=product_list_tags)  # 30 минут + 1 час stale-while-revalidate
     def get_prds(self, filter: Optional[Dict] = None) -> WBResponse:
         """
         Получение списка товаров продавца с возможностью фильтрации
@@ -17,86 +138,91 @@ class WBProductsClient(WBClientBase):
                 - date_from: дата начала периода
                 - date_to: дата окончания периода
                 - limit: ограничение количества
+                - offset: смещение
         """
-        params = {}
-        if filter:
-            if 'status' in filter:
-                params['status'] = filter['status']
-            if 'date_from' in filter:
-                if isinstance(filter['date_from'], datetime):
-                    params['dateFrom'] = filter['date_from'].isoformat()
-                else:
-                    params['dateFrom'] = filter['date_from']
-            if 'limit' in filter:
-                params['limit'] = filter['limit']
-
+        params = build_prds_params(filter)
         response = self._request('GET', '/swagger/products', params=params)
+        return validated_response(response, ProductListSchema)
+
+    def iter_prds(self, filter: Optional[Dict] = None, page_size: Optional[int] = None,
+                  prefetch: bool = True, stream: bool = False) -> Iterator[ProductSchema]:
+        """
+        Постраничный обход всех товаров продавца без кэширования
+
+        Товары валидируются и отдаются по одному, поэтому расход памяти
+        не зависит от размера каталога.
+
+        Args:
+            filter: фильтр как в get_prds (limit и offset игнорируются)
+            page_size: размер страницы (по умолчанию WB_PAGE_SIZE)
+            prefetch: загружать следующую страницу, пока обрабатывается текущая
+            stream: разбирать страницу по мере чтения тела ответа, не загружая его целиком
+        """
+        page_size = page_size or getattr(settings, 'WB_PAGE_SIZE', 1000)
+        request_kwargs = {'stream': True} if stream else {}
+        base_filter = {k: v for k, v in (filter or {}).items() if k not in ('limit', 'offset')}
+
+        def fetch_page(offset):
+            params = build_prds_params({**base_filter, 'limit': page_size, 'offset': offset})
+            return self._request('GET', '/swagger/products', params=params, **request_kwargs)
 
-        try:
-            if isinstance(response, WBResponse):
-                return response
-
-            validated_data = ProductListSchema.parse_obj(response.json())
-            return WBResponse(
-                success=True,
-                data=validated_data.dict(by_alias=True),
-                error=None,
-                status_code=response.status_code  # Добавляем status_code
-            )
-        except Exception as e:
-            return WBResponse(
-                success=False,
-                data=None,
-                error=f"Validation error: {str(e)}",
-                status_code=500  # Добавляем status_code
-            )
-
-    @cache_api_call(ttl=3600)
+        return iter_pages(fetch_page, page_size, ProductSchema, items_keys=('items', 'products'), prefetch=prefetch)
+
+    @cache_api_call(ttl=3600, tags=single_product_tags)
     def get_prd(self, prd_id: str) -> WBResponse:
         """Получение информации о товаре"""
         response = self._request('GET', f'/swagger/products/{prd_id}')
-        if isinstance(response, WBResponse):
-            return response
-
-        try:
-            validated = ProductSchema.parse_obj(response.json())
-            return WBResponse(
-                success=True,
-                data=validated.dict(),
-                error=None,
-                status_code=response.status_code
-            )
-        except Exception as e:
-            return WBResponse(
-                success=False,
-                data=None,
-                error=str(e),
-                status_code=500
-            )
+        return validated_response(response, ProductSchema, by_alias=False)
 
     def set_prd(self, prd_id: str, data: Dict) -> WBResponse:
-        """Обновление товара"""
-        try:
-            # Преобразуем входные данные
-            update_data = {k: v for k, v in data.items() if v is not None}
-            response = self._request('PATCH', f'/swagger/products/{prd_id}', json=update_data)
-
-            self._invalidate_cache(f'get_prd:{prd_id}')
-            return WBResponse(
-                success=response.ok,
-                data=response.json() if response.ok else None,
-                error=None if response.ok else response.text,
-                status_code=response.status_code
-            )
-        except Exception as e:
-            return WBResponse(
-                success=False,
-                data=None,
-                error=str(e),
-                status_code=500
-            )
-
-    @cache_api_call(ttl=86400)  # 24 часа кэширования для комиссий
+        """Обновление товара со сбросом всех закэшированных ответов, где он упоминается"""
+        update_data = {k: v for k, v in data.items() if v is not None}
+        response = self._request('PATCH', f'/swagger/products/{prd_id}', json=update_data)
+        if response.success:
+            invalidate_tags(product_tag(prd_id))
+        return response
+
+    @cache_api_call(ttl=86400, tags=single_product_tags)  # 24 часа кэширования для комиссий
     def get_comission(self, prd_id: str) -> WBResponse:
         """Получение информации о комиссии для товара"""
-        return self._request('GET', f'/swagger/products/{prd_id}/commission')
\ No newline at end of file
+        return self._request('GET', f'/swagger/products/{prd_id}/commission')
+
+    def get_prds_details(self, ids: Iterable[str], include_commission: bool = True,
+                         max_concurrency: Optional[int] = None) -> WBResponse:
+        """
+        Пакетное получение карточек товаров (и комиссий) с ограниченной параллельностью
+
+        Сначала одним запросом проверяется кэш get_prd/get_comission, промахи
+        загружаются пулом из max_concurrency потоков и сохраняются в кэш.
+
+        Args:
+            ids: список ID товаров
+            include_commission: загружать ли комиссию для каждого товара
+            max_concurrency: размер пула (по умолчанию WB_BULK_MAX_CONCURRENCY)
+
+        Returns:
+            WBResponse с data = {'items': [...], 'errors': {prd_id: ошибка}},
+            items идут в порядке входных ID
+        """
+        ids = list(ids)
+        max_concurrency = max_concurrency or getattr(settings, 'WB_BULK_MAX_CONCURRENCY', 8)
+        results, misses = lookup_cached_details(detail_calls(ids, include_commission), cache_namespace(self))
+
+        fetched = {}
+        if misses:
+            with ThreadPoolExecutor(max_workers=max_concurrency, initializer=mark_worker_thread) as pool:
+                # В потоках вызываем методы без кэша: работа с БД остается в текущем потоке
+                futures = {
+                    pool.submit(getattr(type(self), method).__wrapped__, self, prd_id): (method, prd_id)
+                    for method, prd_id in misses
+                }
+                for future in as_completed(futures):
+                    try:
+                        fetched[futures[future]] = future.result()
+                    except Exception as e:
+                        fetched[futures[future]] = WBResponse(success=False, data=None, error=str(e), status_code=500)
+
+        store_details(self, fetched)
+        api_stats.maybe_flush()
+        results.update(fetched)
+        return assemble_details(ids, include_commission, results)
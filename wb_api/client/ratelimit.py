@@ -0,0 +1,238 @@
+"""
+Ограничение частоты запросов к API Wildberries.
+
+Лимиты WB действуют на токен продавца и группу методов, поэтому на каждую
+пару (продавец, группа эндпоинтов) заводится token bucket. Корзины считаются
+по алгоритму GCRA: в хранилище лежит одно число - теоретическое время
+прибытия следующего запроса (TAT), а reserve() сразу резервирует место и
+возвращает, сколько нужно подождать. Так синхронные и асинхронные клиенты,
+потоки и процессы (при общем хранилище) делят один лимит и идут с
+максимально разрешенной скоростью.
+
+Ответ 429 сдвигает корзину на Retry-After: следующие запросы этой группы
+ждут, а не получают повторный отказ.
+"""
+import asyncio
+import re
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Dict, Optional, Sequence
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models.cache import seller_key
+
+
+class BaseRateLimitStore:
+    """
+    Хранилище состояния корзин.
+
+    reserve() резервирует один запрос и возвращает задержку до него в секундах;
+    block() запрещает запросы по ключу на seconds секунд.
+    """
+    BLOCKING = False  # Вызовы ходят в сеть - в асинхронном коде выполняются в потоке
+
+    def reserve(self, key: str, interval: float, burst: int) -> float:
+        raise NotImplementedError
+
+    def block(self, key: str, seconds: float, interval: float, burst: int):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocalRateLimitStore(BaseRateLimitStore):
+    """Корзины в памяти процесса: для тестов и одиночного воркера"""
+
+    def __init__(self):
+        self._tat: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, key, interval, burst):
+        with self._lock:
+            now = time.time()
+            tat = max(self._tat.get(key, now), now) + interval
+            self._tat[key] = tat
+        return max(0.0, tat - burst * interval - now)
+
+    def block(self, key, seconds, interval, burst):
+        with self._lock:
+            now = time.time()
+            self._tat[key] = max(self._tat.get(key, now), now + seconds + (burst - 1) * interval)
+
+    def clear(self):
+        with self._lock:
+            self._tat.clear()
+
+
+class RedisRateLimitStore(BaseRateLimitStore):
+    """
+    Корзины в Redis, общие для всех процессов и воркеров Celery.
+
+    Расчет выполняется Lua-скриптом по часам Redis, поэтому расхождение
+    часов между серверами не влияет на лимит. Требует пакет redis.
+    """
+    BLOCKING = True
+    RESERVE_SCRIPT = """
+        local t = redis.call('TIME')
+        local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+        local interval, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+        local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now) + interval
+        redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000) + 1000)
+        return tostring(math.max(0, tat - burst * interval - now))
+    """
+    BLOCK_SCRIPT = """
+        local t = redis.call('TIME')
+        local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+        local seconds, interval, burst = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+        local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now + seconds + (burst - 1) * interval)
+        redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000) + 1000)
+        return 1
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='wb_api:ratelimit', client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.redis = client
+        self.prefix = prefix
+
+    def reserve(self, key, interval, burst):
+        return float(self.redis.eval(self.RESERVE_SCRIPT, 1, f"{self.prefix}:{key}", interval, burst))
+
+    def block(self, key, seconds, interval, burst):
+        self.redis.eval(self.BLOCK_SCRIPT, 1, f"{self.prefix}:{key}", seconds, interval, burst)
+
+    def clear(self):
+        for redis_key in self.redis.scan_iter(f"{self.prefix}:*"):
+            self.redis.delete(redis_key)
+
+
+@dataclass
+class RateLimitGroup:
+    name: str
+    rate: float  # Запросов в секунду
+    burst: int = 1
+    prefixes: Sequence[str] = ()
+
+    @property
+    def interval(self):
+        return 1 / self.rate
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Значение заголовка Retry-After (секунды или HTTP-дата) в секундах"""
+    if not value:
+        return None
+    value = value.strip()
+    if re.fullmatch(r'\d+(\.\d+)?', value):
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Лимиты запросов по группам эндпоинтов.
+
+    Args:
+        store: хранилище корзин
+        groups: группы с префиксами путей; первый совпавший префикс определяет группу
+        default: группа для остальных эндпоинтов
+        enabled: False - запросы не ограничиваются
+        retry_after_default: пауза после 429 без заголовка Retry-After, секунды
+        max_retries: число повторов запроса после 429
+    """
+
+    def __init__(self, store: BaseRateLimitStore, groups: Sequence[RateLimitGroup] = (),
+                 default: Optional[RateLimitGroup] = None, enabled: bool = True,
+                 retry_after_default: float = 1, max_retries: int = 2):
+        self.store = store
+        self.groups = list(groups)
+        self.default = default or RateLimitGroup('default', rate=10, burst=10)
+        self.enabled = enabled
+        self.retry_after_default = retry_after_default
+        self.max_retries = max_retries
+
+    @classmethod
+    def from_settings(cls):
+        options = getattr(settings, 'WB_RATE_LIMIT', {})
+        store_config = options.get('STORE', {})
+        store_cls = import_string(store_config.get('BACKEND', 'wb_api.client.ratelimit.LocalRateLimitStore'))
+        groups = [
+            RateLimitGroup(name, rate=group['RATE'], burst=group.get('BURST', 1), prefixes=group.get('PREFIXES', ()))
+            for name, group in options.get('GROUPS', {}).items()
+        ]
+        default = options.get('DEFAULT', {'RATE': 10, 'BURST': 10})
+        return cls(
+            store_cls(**store_config.get('OPTIONS', {})),
+            groups,
+            RateLimitGroup('default', rate=default['RATE'], burst=default.get('BURST', 1)),
+            enabled=options.get('ENABLED', True),
+            retry_after_default=options.get('RETRY_AFTER_DEFAULT', 1),
+            max_retries=options.get('MAX_429_RETRIES', 2),
+        )
+
+    def group(self, endpoint: str) -> RateLimitGroup:
+        for group in self.groups:
+            if any(endpoint.startswith(prefix) for prefix in group.prefixes):
+                return group
+        return self.default
+
+    def _key(self, token, group):
+        return f"{seller_key(token)}:{group.name}"
+
+    def reserve(self, token: str, endpoint: str) -> float:
+        """Резервирование запроса; возвращает задержку перед ним в секундах"""
+        if not self.enabled:
+            return 0.0
+        group = self.group(endpoint)
+        return self.store.reserve(self._key(token, group), group.interval, group.burst)
+
+    def penalize(self, token: str, endpoint: str, retry_after: Optional[float] = None) -> float:
+        """Пауза группы после ответа 429; возвращает ее длительность"""
+        seconds = self.retry_after_default if retry_after is None else retry_after
+        if self.enabled:
+            group = self.group(endpoint)
+            self.store.block(self._key(token, group), seconds, group.interval, group.burst)
+        return seconds
+
+    def wait(self, token: str, endpoint: str):
+        delay = self.reserve(token, endpoint)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def await_slot(self, token: str, endpoint: str):
+        if self.store.BLOCKING:
+            delay = await sync_to_async(self.reserve, thread_sensitive=False)(token, endpoint)
+        else:
+            delay = self.reserve(token, endpoint)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def apenalize(self, token: str, endpoint: str, retry_after: Optional[float] = None) -> float:
+        if self.store.BLOCKING:
+            return await sync_to_async(self.penalize, thread_sensitive=False)(token, endpoint, retry_after)
+        return self.penalize(token, endpoint, retry_after)
+
+
+@lru_cache(maxsize=None)
+def get_rate_limiter() -> RateLimiter:
+    """Ограничитель запросов из настройки WB_RATE_LIMIT"""
+    return RateLimiter.from_settings()
+
+
+@receiver(setting_changed)
+def reset_rate_limiter(setting, **kwargs):
+    if setting == 'WB_RATE_LIMIT':
+        get_rate_limiter.cache_clear()
@@ -0,0 +1,216 @@
+"""
+Устойчивость запросов к API: повторы, hedging и circuit breaker.
+
+- Повторы: идемпотентные методы повторяются при сетевых ошибках и 5xx
+  с экспоненциальной паузой и полным jitter (random(0, base * 2^n)).
+- Hedging: если GET не ответил за WB_RESILIENCE['HEDGE_AFTER'] секунд,
+  отправляется дубликат, и используется первый успешный ответ.
+- Circuit breaker: после BREAKER_FAILURES неудачных вызовов подряд эндпоинт
+  считается недоступным, и запросы к нему сразу возвращают 503 без обращения
+  к API; cache_api_call в этом случае отдает последний сохраненный ответ.
+  Через BREAKER_RECOVERY секунд пропускается один пробный запрос.
+"""
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from wb_api.models import WBResponse
+from .stats import normalize_endpoint
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+TRANSIENT_STATUSES = frozenset({408, 500, 502, 503, 504})
+
+
+def is_transient(response: WBResponse) -> bool:
+    """Ошибка, вызванная состоянием API или сети, а не самим запросом"""
+    return not response.success and response.status_code in TRANSIENT_STATUSES
+
+
+class CircuitBreaker:
+    """Состояние эндпоинта: closed - запросы идут, open - отклоняются, half-open - пробный запрос"""
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record(self, success: bool):
+        with self._lock:
+            if success:
+                self.state, self.failures = self.CLOSED, 0
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state, self.opened_at = self.OPEN, time.monotonic()
+
+
+class Resilience:
+    """
+    Политика выполнения запроса.
+
+    Args:
+        retries: число повторов идемпотентного запроса
+        backoff_base: базовая пауза перед повтором, секунды
+        backoff_max: максимальная пауза, секунды
+        hedge_after: задержка дубликата GET, секунды (None - без hedging)
+        breaker_failures: неудач подряд до размыкания (0 - без circuit breaker)
+        breaker_recovery: время до пробного запроса, секунды
+    """
+
+    def __init__(self, retries: int = 2, backoff_base: float = 0.2, backoff_max: float = 5,
+                 hedge_after: Optional[float] = None, breaker_failures: int = 5, breaker_recovery: float = 30):
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.breaker_failures = breaker_failures
+        self.breaker_recovery = breaker_recovery
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @classmethod
+    def from_settings(cls):
+        options = getattr(settings, 'WB_RESILIENCE', {})
+        return cls(
+            retries=options.get('RETRIES', 2),
+            backoff_base=options.get('BACKOFF_BASE', 0.2),
+            backoff_max=options.get('BACKOFF_MAX', 5),
+            hedge_after=options.get('HEDGE_AFTER'),
+            breaker_failures=options.get('BREAKER_FAILURES', 5),
+            breaker_recovery=options.get('BREAKER_RECOVERY', 30),
+        )
+
+    def breaker(self, endpoint: str) -> Optional[CircuitBreaker]:
+        if not self.breaker_failures:
+            return None
+        key = normalize_endpoint(endpoint)
+        with self._lock:
+            breaker = self.breakers.get(key)
+            if breaker is None:
+                breaker = self.breakers[key] = CircuitBreaker(self.breaker_failures, self.breaker_recovery)
+        return breaker
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def should_retry(self, method: str, response: WBResponse, attempt: int) -> bool:
+        return attempt < self.retries and method.upper() in IDEMPOTENT_METHODS and is_transient(response)
+
+    def _hedges(self, method):
+        return self.hedge_after is not None and method.upper() == 'GET'
+
+    @staticmethod
+    def circuit_open(endpoint: str) -> WBResponse:
+        return WBResponse(success=False, data=None, error=f"Circuit open: {endpoint} is unavailable", status_code=503)
+
+    def call(self, method: str, endpoint: str, send: Callable[[], WBResponse]) -> WBResponse:
+        """Выполнение запроса send() с повторами, hedging и circuit breaker"""
+        breaker = self.breaker(endpoint)
+        if breaker is not None and not breaker.allow():
+            return self.circuit_open(endpoint)
+
+        attempt = 0
+        while True:
+            response = self._hedged(send) if self._hedges(method) else send()
+            if not self.should_retry(method, response, attempt):
+                break
+            time.sleep(self.backoff(attempt))
+            attempt += 1
+
+        if breaker is not None:
+            breaker.record(not is_transient(response))
+        return response
+
+    async def acall(self, method: str, endpoint: str, send: Callable[[], Awaitable[WBResponse]]) -> WBResponse:
+        """call() для корутин"""
+        breaker = self.breaker(endpoint)
+        if breaker is not None and not breaker.allow():
+            return self.circuit_open(endpoint)
+
+        attempt = 0
+        while True:
+            response = await (self._ahedged(send) if self._hedges(method) else send())
+            if not self.should_retry(method, response, attempt):
+                break
+            await asyncio.sleep(self.backoff(attempt))
+            attempt += 1
+
+        if breaker is not None:
+            breaker.record(not is_transient(response))
+        return response
+
+    def _hedged(self, send):
+        """Первый успешный из основного запроса и дубликата, отправленного через hedge_after"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(thread_name_prefix='wb-hedge')
+        futures = {self._executor.submit(send)}
+        done, _ = wait(futures, timeout=self.hedge_after)
+        if not done:
+            futures.add(self._executor.submit(send))
+        response = None
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                response = future.result()
+                if response.success:
+                    return response
+        return response
+
+    async def _ahedged(self, send):
+        tasks = {asyncio.ensure_future(send())}
+        done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+        if not done:
+            tasks.add(asyncio.ensure_future(send()))
+        response = None
+        try:
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    response = task.result()
+                    if response.success:
+                        return response
+            return response
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+@lru_cache(maxsize=None)
+def get_resilience() -> Resilience:
+    """Политика запросов из настройки WB_RESILIENCE"""
+    return Resilience.from_settings()
+
+
+@receiver(setting_changed)
+def reset_resilience(setting, **kwargs):
+    if setting == 'WB_RESILIENCE':
+        get_resilience.cache_clear()
+
+
+def stale_if_error() -> int:
+    """Сколько секунд после истечения запись кэша хранится как резерв на случай сбоя API"""
+    return getattr(settings, 'WB_RESILIENCE', {}).get('STALE_IF_ERROR', 0) or 0
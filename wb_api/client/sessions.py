@@ -0,0 +1,101 @@
+"""
+Общие HTTP-сессии синхронных клиентов.
+
+Клиенты создаются на каждый запрос представления, поэтому собственная
+requests.Session у каждого означала новое TCP/TLS-соединение на каждую
+страницу. Реестр хранит одну сессию на базовый URL на весь процесс:
+соединения пула переиспользуются (keep-alive) клиентами всех продавцов,
+ответы запрашиваются сжатыми (gzip/deflate), а при завершении процесса
+сессии закрываются.
+
+В сессии нет учетных данных: клиент передает Authorization с каждым
+запросом, поэтому одна сессия безопасно обслуживает любое число токенов.
+Cookie в общих сессиях не сохраняются: иначе Set-Cookie ответа одному
+продавцу отправлялся бы с запросами остальных.
+"""
+import atexit
+import http.cookiejar
+import threading
+from collections import OrderedDict
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+def reject_cookies_policy() -> http.cookiejar.CookiePolicy:
+    """Политика cookie, не принимающая и не отправляющая cookie ни для одного домена"""
+    return http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+
+
+class SessionRegistry:
+    """
+    Реестр сессий requests с ограниченным числом записей (LRU).
+
+    Args:
+        pool_connections: число пулов соединений (хостов) в адаптере
+        pool_maxsize: максимум соединений в пуле одного хоста
+        max_sessions: максимум сессий (базовых URL); самая давно использованная закрывается
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 50, max_sessions: int = 1024):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_sessions = max_sessions
+        self._sessions: 'OrderedDict[str, requests.Session]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        options = getattr(settings, 'WB_HTTP_POOL', {})
+        return cls(
+            pool_connections=options.get('POOL_CONNECTIONS', 10),
+            pool_maxsize=options.get('POOL_MAXSIZE', 50),
+            max_sessions=options.get('MAX_SESSIONS', 1024),
+        )
+
+    def create(self) -> requests.Session:
+        session = requests.Session()
+        session.cookies.set_policy(reject_cookies_policy())
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+        return session
+
+    def get(self, base_url: str) -> requests.Session:
+        """Сессия для base_url; создается при первом обращении"""
+        evicted = None
+        with self._lock:
+            session = self._sessions.get(base_url)
+            if session is not None:
+                self._sessions.move_to_end(base_url)
+                return session
+            session = self._sessions[base_url] = self.create()
+            if len(self._sessions) > self.max_sessions:
+                _, evicted = self._sessions.popitem(last=False)
+        if evicted is not None:
+            evicted.close()
+        return session
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+session_registry = SessionRegistry.from_settings()
+atexit.register(session_registry.close_all)
+
+
+def get_session(base_url: str) -> requests.Session:
+    return session_registry.get(base_url)
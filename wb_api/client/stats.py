@@ -0,0 +1,199 @@
+"""
+Агрегация статистики запросов к API в памяти процесса.
+
+_request клиентов только увеличивает счетчики в буфере (без обращений к БД);
+раз в WB_API_STATS['FLUSH_INTERVAL'] секунд накопленные значения сбрасываются
+в WBAPIStats/WBAPILatencyBucket атомарными инкрементами F(), поэтому
+одновременные сбросы нескольких процессов не теряют обновлений.
+
+Сброс выполняется только в вызывающем потоке (запроса, задачи, команды):
+потоки внутренних пулов помечаются mark_worker_thread и в БД не пишут -
+их соединения никто бы не закрыл.
+"""
+import atexit
+import bisect
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы времени ответа, секунды
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LATENCY_LABELS = tuple(str(b) for b in LATENCY_BUCKETS) + ('+Inf',)
+
+_thread_state = threading.local()
+
+_ID_SEGMENT = re.compile(r'^(?!v\d+$).*\d')
+
+
+def normalize_endpoint(endpoint: str) -> str:
+    """
+    Шаблон пути без идентификаторов: /swagger/products/123 -> /swagger/products/{id}
+
+    Сегменты с цифрами считаются идентификаторами, кроме версий API (v1, v2...).
+    """
+    path = endpoint.split('?', 1)[0]
+    return '/'.join('{id}' if _ID_SEGMENT.match(part) else part for part in path.split('/'))[:100]
+
+
+def mark_worker_thread():
+    """initializer для ThreadPoolExecutor: поток пула не сбрасывает статистику в БД"""
+    _thread_state.worker = True
+
+
+def is_worker_thread() -> bool:
+    return getattr(_thread_state, 'worker', False)
+
+
+@dataclass
+class EndpointStats:
+    count: int = 0
+    success: int = 0
+    total_time: float = 0.0
+    last_time: Optional[float] = None
+    last_at: Optional[datetime] = None
+    buckets: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, success, elapsed, at):
+        self.count += 1
+        self.success += int(success)
+        self.total_time += elapsed
+        self.last_time = elapsed
+        self.last_at = at
+        label = LATENCY_LABELS[bisect.bisect_left(LATENCY_BUCKETS, elapsed)]
+        self.buckets[label] = self.buckets.get(label, 0) + 1
+
+    def merge(self, other: 'EndpointStats'):
+        self.count += other.count
+        self.success += other.success
+        self.total_time += other.total_time
+        if other.last_at and (self.last_at is None or other.last_at > self.last_at):
+            self.last_time, self.last_at = other.last_time, other.last_at
+        for label, count in other.buckets.items():
+            self.buckets[label] = self.buckets.get(label, 0) + count
+
+
+def _increment(model, lookup, increments, values=None):
+    """Атомарное увеличение счетчиков строки; строка создается при отсутствии"""
+    values = values or {}
+    update = {name: F(name) + delta for name, delta in increments.items()}
+    if model.objects.filter(**lookup).update(**update, **values):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **increments, **values)
+    except IntegrityError:
+        # Строку успел создать другой процесс
+        model.objects.filter(**lookup).update(**update, **values)
+
+
+class StatsAggregator:
+    """
+    Буфер статистики запросов по (эндпоинт, код ответа).
+
+    Args:
+        flush_interval: период сброса в БД, секунды
+        enabled: False - запросы не учитываются
+    """
+
+    def __init__(self, flush_interval: float = 10, enabled: bool = True):
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._pending: Dict[Tuple[str, int], EndpointStats] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def from_settings(cls):
+        options = getattr(settings, 'WB_API_STATS', {})
+        return cls(
+            flush_interval=options.get('FLUSH_INTERVAL', 10),
+            enabled=options.get('ENABLED', True),
+        )
+
+    def record(self, endpoint: str, status_code: int, success: bool, elapsed: float):
+        if not self.enabled:
+            return
+        key = (normalize_endpoint(endpoint), status_code)
+        now = timezone.now()
+        with self._lock:
+            stats = self._pending.get(key)
+            if stats is None:
+                stats = self._pending[key] = EndpointStats()
+            stats.add(success, elapsed, now)
+
+    def flush_due(self) -> bool:
+        return bool(self._pending) and time.monotonic() - self._last_flush >= self.flush_interval
+
+    def maybe_flush(self):
+        """
+        Сброс, если с прошлого прошло flush_interval секунд (вызывается из _request)
+
+        В потоках пулов (mark_worker_thread) ничего не делает: накопленное
+        сбросит вызывающий поток после завершения пула.
+        """
+        if not is_worker_thread() and self.flush_due():
+            self.flush()
+
+    def pending(self) -> Dict[Tuple[str, int], EndpointStats]:
+        with self._lock:
+            return dict(self._pending)
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+
+    def flush(self) -> int:
+        """Запись накопленной статистики в БД; возвращает число записанных ключей"""
+        from wb_api.models import WBAPILatencyBucket, WBAPIStats
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+
+        written = 0
+        for (endpoint, status_code), stats in pending.items():
+            lookup = {'endpoint': endpoint, 'status_code': status_code}
+            try:
+                with transaction.atomic():
+                    _increment(
+                        WBAPIStats, lookup,
+                        {'request_count': stats.count, 'success_count': stats.success,
+                         'total_response_time': stats.total_time},
+                        {'last_response_time': stats.last_time, 'last_request_at': stats.last_at},
+                    )
+                    for label, count in stats.buckets.items():
+                        _increment(WBAPILatencyBucket, {**lookup, 'le': label}, {'count': count})
+            except Exception as e:
+                logger.warning(f"Не удалось записать статистику {endpoint}: {e}")
+                self._restore(endpoint, status_code, stats)
+                continue
+            written += 1
+        return written
+
+    def _restore(self, endpoint, status_code, stats):
+        """Возврат несохраненных значений в буфер до следующего сброса"""
+        with self._lock:
+            current = self._pending.setdefault((endpoint, status_code), EndpointStats())
+            current.merge(stats)
+
+
+api_stats = StatsAggregator.from_settings()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        api_stats.flush()
+    except Exception:
+        pass
@@ -0,0 +1,135 @@
+"""
+Потоковый разбор крупных списков из ответа API.
+
+Обычный разбор держит в памяти тело ответа, распарсенный dict и модели.
+В потоковом режиме (stream=True) тело читается частями, а элементы списка
+(items/products/orders) декодируются и отдаются по одному: в памяти
+остаются только текущий элемент и непрочитанный хвост буфера. Остальные
+поля верхнего уровня (total, limit...) собираются в envelope.
+
+Значения разбираются JSONDecoder.raw_decode прямо в буфере: граница
+элемента определяется самим декодером (на C), без отдельного сканирования.
+"""
+import codecs
+import json
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+import requests
+
+from wb_api.exceptions import WBAPIError, WBValidationError
+
+_WHITESPACE = ' \t\r\n'
+# Прочитанная часть буфера удаляется, когда превышает этот размер
+COMPACT_AFTER = 64 * 1024
+_decoder = json.JSONDecoder()
+
+
+class JSONStream:
+    """
+    JSON-объект ответа, читаемый по частям.
+
+    Args:
+        chunks: итератор частей тела ответа (bytes)
+        close: функция освобождения соединения после чтения
+    """
+
+    def __init__(self, chunks: Iterable[bytes], close: Optional[Callable[[], None]] = None):
+        self._chunks = iter(chunks)
+        self._close = close
+        self._text = ''
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._pos = 0
+        self._eof = False
+        self.envelope: Dict[str, object] = {}
+        self.items_key: Optional[str] = None
+        self.count = 0  # Сколько элементов списка уже отдано
+
+    def _fill(self) -> bool:
+        """Чтение следующей части тела; False - тело закончилось"""
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            if text:
+                if self._pos > COMPACT_AFTER:
+                    self._text, self._pos = self._text[self._pos:], 0
+                self._text += text
+                return True
+        self._eof = True
+        return False
+
+    def _peek(self, skip: str = _WHITESPACE) -> str:
+        """Следующий значимый символ (пропуская skip); тело не должно заканчиваться"""
+        while True:
+            while self._pos < len(self._text) and self._text[self._pos] in skip:
+                self._pos += 1
+            if self._pos < len(self._text):
+                return self._text[self._pos]
+            if not self._fill():
+                raise WBValidationError("Unexpected end of JSON stream")
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise WBValidationError(f"Invalid JSON stream: expected {char!r} at {self._pos}")
+        self._pos += 1
+
+    def _read_value(self):
+        """
+        Декодированное значение, начинающееся с текущей позиции.
+
+        Незаконченное в буфере значение разбирается повторно после чтения
+        следующей части; значение, упирающееся в конец буфера, тоже
+        дочитывается (число могло оборваться на границе частей).
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._text, self._pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise WBValidationError(f"Invalid JSON stream: {e}") from e
+            if end == len(self._text) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def items(self, items_keys: Sequence[str] = ('items',)) -> Iterator:
+        """
+        Элементы первого списка из items_keys по одному.
+
+        После исчерпания итератора envelope содержит остальные поля объекта.
+        """
+        try:
+            self._expect('{')
+            while True:
+                if self._peek(_WHITESPACE + ',') == '}':
+                    self._pos += 1
+                    return
+                key = self._read_value()
+                self._expect(':')
+                if self.items_key is None and key in items_keys and self._peek() == '[':
+                    self.items_key = key
+                    self._pos += 1
+                    while self._peek(_WHITESPACE + ',') != ']':
+                        item = self._read_value()
+                        self.count += 1
+                        yield item
+                    self._pos += 1
+                else:
+                    self.envelope[key] = self._read_value()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+
+def response_chunks(response: requests.Response, chunk_size: int) -> Iterator[bytes]:
+    """Части тела ответа requests; обрыв соединения превращается в WBAPIError"""
+    try:
+        yield from response.iter_content(chunk_size)
+    except requests.RequestException as e:
+        raise WBAPIError(f"Request failed: {e}", status_code=500) from e
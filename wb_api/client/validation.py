@@ -0,0 +1,158 @@
+"""
+Валидация ответов API через заранее собранные TypeAdapter'ы pydantic v2.
+
+Ответы API перед кэшированием всегда проходят полную валидацию
+(validated_response), поэтому в кэше лежат только проверенные данные.
+Режимы сборки моделей (parse):
+    strict  - полная валидация;
+    lazy    - валидируется только обертка списка (total, limit...), элементы
+              items проверяются при обращении к ним;
+    trusted - модели собираются без валидации (model_construct); только для
+              данных, прочитанных из нашего кэша (rehydrate).
+
+Сравнение режимов: manage.py benchmark_wb_validation.
+"""
+import typing
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import Any, Dict, List, Type, TypeVar
+
+from django.conf import settings
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from wb_api.models import WBResponse
+
+STRICT, LAZY, TRUSTED = 'strict', 'lazy', 'trusted'
+MODES = (STRICT, LAZY, TRUSTED)
+
+ModelT = TypeVar('ModelT', bound=BaseModel)
+
+
+def default_mode() -> str:
+    return getattr(settings, 'WB_VALIDATION_MODE', STRICT)
+
+
+@lru_cache(maxsize=None)
+def adapter(tp) -> TypeAdapter:
+    """TypeAdapter типа; схема валидации собирается один раз на процесс"""
+    return TypeAdapter(tp)
+
+
+def _unwrap(annotation):
+    """Optional[X] -> X"""
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    if typing.get_origin(annotation) is typing.Union and len(args) == 1:
+        return args[0]
+    return annotation
+
+
+def _model_class(annotation):
+    annotation = _unwrap(annotation)
+    return annotation if isinstance(annotation, type) and issubclass(annotation, BaseModel) else None
+
+
+@lru_cache(maxsize=None)
+def _construct_plan(model_cls):
+    """(имя поля, ключ во входных данных, вложенная модель, это список моделей) для каждого поля"""
+    plan = []
+    for name, info in model_cls.model_fields.items():
+        annotation = _unwrap(info.annotation)
+        nested, is_list = _model_class(annotation), False
+        if typing.get_origin(annotation) in (list, List):
+            nested, is_list = _model_class(typing.get_args(annotation)[0]), True
+        plan.append((name, info.alias or name, nested, is_list))
+    return tuple(plan)
+
+
+def construct(model_cls: Type[ModelT], data: Dict[str, Any]) -> ModelT:
+    """
+    Сборка модели с вложенными моделями без валидации.
+
+    Ключи принимаются как в alias-, так и в python-нотации. Значения не
+    приводятся к типам полей: даты из JSON-кэша остаются строками.
+    """
+    values = {}
+    for name, alias, nested, is_list in _construct_plan(model_cls):
+        if alias in data:
+            value = data[alias]
+        elif name in data:
+            value = data[name]
+        else:
+            continue
+        if nested is not None and value is not None:
+            if is_list:
+                value = [construct(nested, item) if isinstance(item, dict) else item for item in value]
+            elif isinstance(value, dict):
+                value = construct(nested, value)
+        values[name] = value
+    return model_cls.model_construct(**values)
+
+
+class LazyItems(Sequence):
+    """Список элементов, каждый из которых валидируется при первом обращении"""
+
+    def __init__(self, raw: List[Any], item_type: Type[BaseModel]):
+        self.raw = raw
+        self.item_type = item_type
+        self._validated: Dict[int, BaseModel] = {}
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.raw)))]
+        if index < 0:
+            index += len(self.raw)
+        item = self._validated.get(index)
+        if item is None:
+            item = self._validated[index] = adapter(self.item_type).validate_python(self.raw[index])
+        return item
+
+
+def _items_type(schema: Type[BaseModel], items_field: str):
+    annotation = schema.model_fields[items_field].annotation
+    return _model_class(typing.get_args(annotation)[0])
+
+
+def parse(schema: Type[ModelT], data: Any, mode: str = STRICT, items_field: str = 'items') -> ModelT:
+    """
+    Модель schema по данным в заданном режиме.
+
+    В режиме lazy поле items_field списочной схемы заменяется на LazyItems;
+    для остальных схем lazy равносилен strict.
+
+    Raises:
+        pydantic.ValidationError: данные не прошли валидацию (strict, lazy)
+    """
+    if mode == TRUSTED:
+        return construct(schema, data)
+    if mode == LAZY and items_field in schema.model_fields and isinstance(data, dict):
+        raw = data.get(items_field) or []
+        envelope = adapter(schema).validate_python({**data, items_field: []})
+        return envelope.model_copy(update={items_field: LazyItems(raw, _items_type(schema, items_field))})
+    return adapter(schema).validate_python(data)
+
+
+def rehydrate(schema: Type[ModelT], data: Any, mode: str = None) -> ModelT:
+    """
+    Модель по данным из нашего кэша (их уже проверил validated_response)
+    в режиме WB_VALIDATION_MODE.
+    """
+    return parse(schema, data, mode or default_mode())
+
+
+def validated_response(response: WBResponse, schema: Type[BaseModel], by_alias: bool = True) -> WBResponse:
+    """
+    Полная проверка данных успешного ответа API перед кэшированием.
+
+    Данные заменяются результатом валидации (JSON-совместимый dict) независимо
+    от WB_VALIDATION_MODE: непроверенные элементы в кэш не попадают.
+    """
+    if not response.success:
+        return response
+    try:
+        data = adapter(schema).validate_python(response.data).model_dump(mode='json', by_alias=by_alias)
+    except ValidationError as e:
+        return WBResponse(success=False, data=None, error=f"Validation error: {e}", status_code=500)
+    return WBResponse(success=True, data=data, error=None, status_code=response.status_code)
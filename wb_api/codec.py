@@ -0,0 +1,162 @@
+"""
+JSON-кодек приложения.
+
+Ответы API, payload'ы кэша и ключи кэша сериализуются на каждом вызове,
+поэтому все места используют один кодек: orjson (реализация на C) при
+установленном пакете, иначе стандартный json. Кодек выбирается настройкой
+WB_JSON_CODEC: 'auto' (по умолчанию), 'orjson', 'json' или путь к своему
+классу с методами loads/dumps.
+
+loads принимает bytes (тело ответа разбирается без декодирования в str),
+dumps возвращает bytes в компактной форме без экранирования не-ASCII.
+Даты и время при заданном default сериализуются им в обоих кодеках,
+поэтому результат не зависит от выбранного кодека.
+"""
+import datetime
+import json
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.db import models
+from django.db.models.fields.json import KeyTransform
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Ошибка разбора; orjson.JSONDecodeError - ее подкласс
+JSONDecodeError = json.JSONDecodeError
+
+_django_default = DjangoJSONEncoder().default
+
+
+class StdlibCodec:
+    """Стандартный модуль json"""
+    name = 'json'
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, obj, sort_keys: bool = False, default: Optional[Callable] = None) -> bytes:
+        return json.dumps(
+            obj, ensure_ascii=False, separators=(',', ':'), sort_keys=sort_keys, default=default,
+        ).encode()
+
+
+class OrjsonCodec:
+    """
+    orjson; ключи-не-строки (int в params) сериализуются как в json.
+
+    При заданном default даты и время передаются ему, как в json (без этого
+    orjson записал бы их сам в своем формате).
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("Для WB_JSON_CODEC='orjson' установите пакет orjson")
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, obj, sort_keys: bool = False, default: Optional[Callable] = None) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        if default is not None:
+            option |= orjson.OPT_PASSTHROUGH_DATETIME
+        return orjson.dumps(obj, default=default, option=option)
+
+
+CODECS = {'json': StdlibCodec, 'orjson': OrjsonCodec}
+
+
+@lru_cache(maxsize=None)
+def get_codec():
+    """Кодек из настройки WB_JSON_CODEC"""
+    name = getattr(settings, 'WB_JSON_CODEC', 'auto')
+    if name == 'auto':
+        name = 'json' if orjson is None else 'orjson'
+    codec_cls = CODECS[name] if name in CODECS else import_string(name)
+    return codec_cls()
+
+
+@receiver(setting_changed)
+def reset_codec(setting, **kwargs):
+    if setting == 'WB_JSON_CODEC':
+        get_codec.cache_clear()
+
+
+def loads(data) -> Any:
+    """Разбор JSON из bytes или str"""
+    return get_codec().loads(data)
+
+
+def dumps(obj, sort_keys: bool = False, default: Optional[Callable] = None) -> bytes:
+    return get_codec().dumps(obj, sort_keys=sort_keys, default=default)
+
+
+def dumps_str(obj, sort_keys: bool = False, default: Optional[Callable] = None) -> str:
+    return dumps(obj, sort_keys=sort_keys, default=default).decode()
+
+
+def isoformat_default(value):
+    """default для canonical: даты и время в ISO 8601, прочее - str"""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def canonical(params) -> str:
+    """Каноническая запись параметров для ключей кэша (ключи отсортированы)"""
+    return dumps_str(params, sort_keys=True, default=isoformat_default)
+
+
+def django_default(value):
+    """default для dumps: даты, Decimal, UUID и т.п. как в DjangoJSONEncoder"""
+    return _django_default(value)
+
+
+class CodecJSONEncoder(DjangoJSONEncoder):
+    """Кодировщик для json.dumps(cls=...): весь документ сериализуется кодеком приложения"""
+
+    def encode(self, o):
+        return dumps_str(o, default=django_default)
+
+
+class JSONField(models.JSONField):
+    """
+    JSONField, читающий и записывающий значения через кодек приложения.
+
+    Даты, Decimal и т.п. записываются как в DjangoJSONEncoder (django_default).
+    """
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if self.encoder is not None:
+            return super().get_db_prep_value(value, connection, prepared)
+        if not prepared:
+            value = self.get_prep_value(value)
+        return connection.ops.adapt_json_value(value, CodecJSONEncoder)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None or self.decoder is not None:
+            return super().from_db_value(value, expression, connection)
+        if isinstance(expression, KeyTransform) and not isinstance(value, str):
+            return value
+        try:
+            return loads(value)
+        except JSONDecodeError:
+            return value
+
+
+class JSONResponse(HttpResponse):
+    """JsonResponse, сериализующий данные через кодек приложения"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data, default=django_default), **kwargs)
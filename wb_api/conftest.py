@@ -7,4 +7,27 @@ django.setup()
 
 @pytest.fixture(autouse=True)
 def enable_db_access_for_all_tests(db):
-    pass
\ No newline at end of file
+    pass
+
+
+@pytest.fixture(autouse=True)
+def clear_api_caches():
+    from django.core.cache import cache
+    from wb_api.category_tree import category_index
+    from wb_api.client.models.cache import memory_cache
+    from wb_api.client.ratelimit import get_rate_limiter
+    from wb_api.client.resilience import get_resilience
+    from wb_api.client.stats import api_stats
+    memory_cache.clear()
+    api_stats.clear()
+    get_rate_limiter().store.clear()
+    get_resilience().breakers.clear()
+    cache.clear()
+    category_index.reset()
+    yield
+    memory_cache.clear()
+    api_stats.clear()
+    get_rate_limiter().store.clear()
+    get_resilience().breakers.clear()
+    cache.clear()
+    category_index.reset()
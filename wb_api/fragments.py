@@ -0,0 +1,89 @@
+"""
+Фрагменты страниц с кэшированием отрисованного HTML.
+
+Каждый раздел (товары, заказы, категории) загружается асинхронным клиентом,
+и разделы страницы загружаются одновременно (asyncio.gather) через общий
+пул соединений процесса. Отрисованный фрагмент кэшируется по продавцу
+(tenant клиента) и версии записи кэша API, из которой он построен: пока запись свежая, страница собирается из готовых фрагментов без
+запросов к API и без отрисовки шаблонов, а новая запись (обновление,
+инвалидация по тегу) дает новую версию и новый фрагмент.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import httpx
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from wb_api.client.aio import (
+    AsyncWBCategoriesClient, AsyncWBOrdersClient, AsyncWBProductsClient, get_async_http_client,
+)
+from wb_api.client.models.cache import aget_cached_entry, cache_namespace, make_cache_key, seller_key
+from wb_api.client.pagination import page_items
+
+
+@dataclass(frozen=True)
+class Section:
+    name: str
+    title: str
+    client_cls: type
+    method: str
+    template: str
+    items_keys: Sequence[str] = ('items',)
+
+
+SECTIONS: Dict[str, Section] = {
+    section.name: section for section in (
+        Section('products', 'Товары', AsyncWBProductsClient, 'get_prds',
+                'wb_api/fragments/products.html', ('items', 'products')),
+        Section('orders', 'Заказы', AsyncWBOrdersClient, 'get_orders',
+                'wb_api/fragments/orders.html', ('orders', 'items')),
+        Section('categories', 'Категории', AsyncWBCategoriesClient, 'get_categories',
+                'wb_api/fragments/categories.html', ('items', 'categories')),
+    )
+}
+
+
+def fragment_key(section: Section, seller: str, version: str) -> str:
+    return f"wb_api:fragment:{section.name}:{seller}:{version}"
+
+
+async def render_section(section: Section, token: str, http: Optional[httpx.AsyncClient] = None) -> str:
+    """
+    HTML раздела: из кэша фрагментов, если запись API свежая и уже отрисована,
+    иначе - вызовом метода клиента и отрисовкой шаблона.
+    """
+    seller = seller_key(token)
+    client = section.client_cls(token=token, http_client=http or get_async_http_client(), tenant=seller)
+    cache_key = make_cache_key(section.method, (), {}, cache_namespace(client))
+
+    entry = await aget_cached_entry(cache_key)
+    if entry is not None and entry.is_fresh():
+        html = await django_cache.aget(fragment_key(section, seller, entry.version))
+        if html is not None:
+            return html
+
+    response = await getattr(client, section.method)()
+    context = {
+        'section': section,
+        'error': None if response.success else response.error,
+        'items': page_items(response.data, section.items_keys) if response.success else [],
+    }
+    html = render_to_string(section.template, context)
+
+    entry = await aget_cached_entry(cache_key) if response.success else None
+    if entry is not None and entry.is_fresh():
+        timeout = max(1, int((entry.retain_until - timezone.now()).total_seconds()))
+        await django_cache.aset(fragment_key(section, seller, entry.version), html, timeout)
+    return html
+
+
+async def render_sections(names: Sequence[str], token: Optional[str] = None) -> Dict[str, str]:
+    """Одновременная загрузка и отрисовка разделов через общий пул соединений процесса"""
+    token = token or getattr(settings, 'WB_API_TOKEN', None)
+    http = get_async_http_client()
+    fragments = await asyncio.gather(*(render_section(SECTIONS[name], token, http) for name in names))
+    return dict(zip(names, fragments))
@@ -0,0 +1,162 @@
+"""
+Листинг товаров из локальной копии каталога (WBProduct).
+
+Фильтры и сортировка выполняются в БД, страницы выдаются по курсору
+(keyset pagination): следующая страница начинается условием
+(поле сортировки, id) > (значение, id) последней строки предыдущей, поэтому
+запрос страницы читает из индекса только limit + 1 строк независимо от
+размера каталога и глубины листания - в отличие от OFFSET.
+"""
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import BooleanField, F, Func, Value
+from django.utils.dateparse import parse_datetime
+
+from wb_api import codec
+from wb_api.models import WBProduct
+
+# Параметр sort -> (поле, функция разбора значения из курсора); '-' перед именем - по убыванию
+SORTS = {
+    'id': ('id', int),
+    'price': ('price', Decimal),
+    'stock': ('total_stock', int),
+    'updated': ('updated_at', parse_datetime),
+}
+FIELDS = ('id', 'product_id', 'name', 'price', 'discount', 'total_stock', 'category', 'brand', 'updated_at')
+
+
+class ListingError(ValueError):
+    """Некорректные параметры листинга"""
+
+
+class RowCompare(Func):
+    """
+    Сравнение строк (field, id) > (value, pk) (или <) одним условием.
+
+    В отличие от OR двух условий, составной индекс (field, id) обслуживает
+    его как диапазон: чтение начинается сразу с позиции курсора.
+    """
+    output_field = BooleanField()
+
+    def __init__(self, field, value, pk, operator):
+        model_field = WBProduct._meta.get_field(field)
+        super().__init__(F(field), F('id'), Value(value, output_field=model_field), Value(pk))
+        self.operator = operator
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sqls, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            sqls.append(sql)
+            params.extend(expression_params)
+        return f'({sqls[0]}, {sqls[1]}) {self.operator} ({sqls[2]}, {sqls[3]})', params
+
+
+@dataclass
+class ListingPage:
+    items: List[Dict]
+    next_cursor: Optional[str]
+    limit: int
+
+    def as_dict(self):
+        return {'items': self.items, 'next_cursor': self.next_cursor, 'limit': self.limit}
+
+
+def encode_cursor(value, pk: int) -> str:
+    """Курсор из значения поля сортировки и id последней строки страницы"""
+    if isinstance(value, (Decimal, datetime)):
+        value = str(value) if isinstance(value, Decimal) else value.isoformat()  # Без потери точности
+    return base64.urlsafe_b64encode(codec.dumps([value, pk])).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, parse) -> tuple:
+    try:
+        value, pk = codec.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        value = parse(value) if value is not None else None
+        if value is None:
+            raise ValueError
+        return value, int(pk)
+    except (binascii.Error, codec.JSONDecodeError, InvalidOperation, TypeError, ValueError):
+        raise ListingError("Invalid cursor")
+
+
+def _number(params, name, cast):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return cast(value)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ListingError(f"Invalid {name}: {value}")
+
+
+def filter_products(queryset, params):
+    """
+    Фильтры листинга:
+        seller, category, brand - точное совпадение;
+        min_price, max_price - диапазон цены;
+        in_stock - 1/0 (есть ли остаток);
+        q - подстрока названия.
+    """
+    for name in ('seller', 'category', 'brand'):
+        if params.get(name):
+            queryset = queryset.filter(**{name: params[name]})
+    min_price, max_price = _number(params, 'min_price', Decimal), _number(params, 'max_price', Decimal)
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+    if params.get('in_stock') in ('1', 'true'):
+        queryset = queryset.filter(total_stock__gt=0)
+    elif params.get('in_stock') in ('0', 'false'):
+        queryset = queryset.filter(total_stock=0)
+    if params.get('q'):
+        queryset = queryset.filter(name__icontains=params['q'])
+    return queryset
+
+
+def list_products(params, queryset=None) -> ListingPage:
+    """
+    Страница листинга по параметрам запроса (QueryDict или dict).
+
+    Args:
+        params: фильтры (см. filter_products), sort (id, price, stock, updated;
+            с '-' - по убыванию), limit, cursor (next_cursor предыдущей страницы)
+
+    Raises:
+        ListingError: некорректный параметр
+    """
+    sort = params.get('sort') or 'id'
+    descending = sort.startswith('-')
+    if sort.lstrip('-') not in SORTS:
+        raise ListingError(f"Unknown sort: {sort}")
+    field, parse = SORTS[sort.lstrip('-')]
+
+    max_limit = getattr(settings, 'WB_LISTING_MAX_LIMIT', 500)
+    limit = _number(params, 'limit', int)
+    if limit is None:
+        limit = getattr(settings, 'WB_LISTING_PAGE_SIZE', 50)
+    if not 1 <= limit <= max_limit:
+        raise ListingError(f"limit must be between 1 and {max_limit}")
+
+    queryset = filter_products(WBProduct.objects.all() if queryset is None else queryset, params)
+    if params.get('cursor'):
+        value, pk = decode_cursor(params['cursor'], parse)
+        if field == 'id':
+            queryset = queryset.filter(**{'id__lt' if descending else 'id__gt': pk})
+        else:
+            queryset = queryset.filter(RowCompare(field, value, pk, '<' if descending else '>'))
+
+    order = [f'-{field}', '-id'] if descending else [field, 'id']
+    rows = list(queryset.order_by(*dict.fromkeys(order)).values(*FIELDS)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][field], rows[-1]['id'])
+    return ListingPage(rows, next_cursor, limit)
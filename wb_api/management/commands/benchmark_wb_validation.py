@@ -0,0 +1,68 @@
+import time
+from statistics import median
+
+from django.core.management.base import BaseCommand
+from wb_api.client.models.schemas import ProductListSchema
+from wb_api.client.validation import LAZY, STRICT, TRUSTED, parse
+
+
+def make_catalog(size):
+    """Синтетический ответ get_prds с вложенными ценами, остатками и атрибутами"""
+    return {
+        'items': [
+            {
+                'productId': str(i),
+                'name': f'Товар {i}',
+                'prices': [{'price': 100 + i % 500, 'currency': 'RUB', 'discount': i % 50}],
+                'stocks': [{'warehouseId': w, 'amount': (i * w) % 20} for w in range(1, 4)],
+                'models': [{'modelId': f'{i}-1', 'sizes': ['S', 'M', 'L'], 'colors': ['black']}],
+                'attributes': [{'name': 'Бренд', 'value': f'brand-{i % 100}', 'unit': None}],
+                'createdAt': '2025-01-01T00:00:00Z',
+                'updatedAt': '2025-01-02T00:00:00Z',
+                'categoryId': i % 300,
+            }
+            for i in range(size)
+        ],
+        'total': size,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Сравнение режимов валидации ответа get_prds (legacy parse_obj, strict, lazy, trusted)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items',
+            type=int,
+            default=10000,
+            help='Количество товаров в ответе'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Число повторов каждого замера (берется медиана)'
+        )
+
+    def handle(self, *args, **options):
+        data = make_catalog(options['items'])
+        cases = [
+            ('legacy parse_obj + dict', lambda: ProductListSchema.parse_obj(data).dict(by_alias=True)),
+            ('strict', lambda: parse(ProductListSchema, data, STRICT)),
+            ('strict + dump', lambda: parse(ProductListSchema, data, STRICT).model_dump(mode='json', by_alias=True)),
+            ('lazy (только обертка)', lambda: parse(ProductListSchema, data, LAZY)),
+            ('lazy + обход всех items', lambda: list(parse(ProductListSchema, data, LAZY).items)),
+            ('trusted', lambda: parse(ProductListSchema, data, TRUSTED)),
+        ]
+
+        self.stdout.write(f"Товаров: {options['items']}, повторов: {options['repeat']}")
+        baseline = None
+        for name, case in cases:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                case()
+                timings.append(time.perf_counter() - started)
+            elapsed = median(timings)
+            baseline = baseline or elapsed
+            self.stdout.write(f"{name:<28} {elapsed * 1000:9.1f} мс  x{baseline / elapsed:.1f}")
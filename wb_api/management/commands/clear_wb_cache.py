@@ -1,4 +1,6 @@
 from django.core.management.base import BaseCommand
+from wb_api.client.models.backends import get_cache_backend
+from wb_api.client.models.cache import invalidate_tags, memory_cache
 from wb_api.models import APICache
 from django.utils import timezone
 
@@ -11,11 +13,23 @@ class Command(BaseCommand):
             action='store_true',
             help='Очистить ВЕСЬ кэш (включая не просроченный)'
         )
+        parser.add_argument(
+            '--tag',
+            action='append',
+            default=[],
+            help='Сбросить только записи с тегом (например product:123, category:5); можно указать несколько раз'
+        )
 
     def handle(self, *args, **options):
-        if options['all']:
+        if options['tag']:
+            count = invalidate_tags(*options['tag'])
+            self.stdout.write(self.style.SUCCESS(f'Сброшен кэш по тегам. Удалено записей: {count}'))
+        elif options['all']:
             count, _ = APICache.objects.all().delete()
+            count += get_cache_backend().clear()
+            memory_cache.clear()
             self.stdout.write(self.style.SUCCESS(f'Очищен весь кэш. Удалено записей: {count}'))
         else:
             count, _ = APICache.objects.filter(expires_at__lt=timezone.now()).delete()
+            count += get_cache_backend().clear(expired_only=True)
             self.stdout.write(self.style.SUCCESS(f'Очищен просроченный кэш. Удалено записей: {count}'))
\ No newline at end of file
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from wb_api.client.models.cache import ClientAPICache
+from wb_api.client.models.compression import PLAIN, get_options
+
+
+class Command(BaseCommand):
+    help = 'Переводит крупные записи кэша Wildberries API в сжатое бинарное хранение'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold',
+            type=int,
+            help='Минимальный размер JSON в байтах (по умолчанию WB_CACHE_COMPRESSION["THRESHOLD"])'
+        )
+        parser.add_argument(
+            '--codec',
+            choices=['gzip', 'zstd'],
+            help='Алгоритм сжатия (по умолчанию WB_CACHE_COMPRESSION["CODEC"])'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Количество записей, обрабатываемых за один проход'
+        )
+
+    def handle(self, *args, **options):
+        compression = get_options()
+        if options['threshold'] is not None:
+            compression['threshold'] = options['threshold']
+        if options['codec']:
+            compression['encoding'] = options['codec']
+        if compression['threshold'] is None:
+            self.stdout.write(self.style.WARNING('Порог сжатия не задан: укажите --threshold или WB_CACHE_COMPRESSION'))
+            return
+
+        converted = 0
+        rows = ClientAPICache.objects.filter(encoding=PLAIN).only('id', 'response').iterator(chunk_size=options['batch_size'])
+        batch = []
+        for row in rows:
+            fields = ClientAPICache.storage_fields(row.response, compression)
+            if fields['encoding'] == PLAIN:
+                continue
+            for name, value in fields.items():
+                setattr(row, name, value)
+            batch.append(row)
+            if len(batch) >= options['batch_size']:
+                converted += self._save(batch)
+        converted += self._save(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Сжато записей кэша: {converted}'))
+
+    @staticmethod
+    def _save(batch):
+        count = len(batch)
+        ClientAPICache.objects.bulk_update(batch, ['response', 'payload', 'encoding'])
+        batch.clear()
+        return count
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from wb_api.category_tree import load_category_tree
+from wb_api.exceptions import WBError
+
+
+class Command(BaseCommand):
+    help = 'Загрузка дерева категорий Wildberries в таблицу WBCategoryNode'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--token',
+            help='API-токен продавца (по умолчанию WB_API_TOKEN)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            result = load_category_tree(options['token'])
+        except WBError as e:
+            raise CommandError(f'Ошибка загрузки категорий: {e}') from e
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Категорий добавлено: {result.created}, обновлено: {result.updated}, удалено: {result.deleted}'
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from wb_api.exceptions import WBError
+from wb_api.sync import sync_orders
+
+
+class Command(BaseCommand):
+    help = 'Инкрементальная загрузка заказов Wildberries в таблицы WBOrder/WBOrderItem'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--token',
+            help='API-токен продавца (по умолчанию WB_API_TOKEN)'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Игнорировать курсор и загрузить все заказы'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество заказов в одном пакетном upsert'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            result = sync_orders(options['token'], full=options['full'], batch_size=options['batch_size'])
+        except WBError as e:
+            raise CommandError(f'Ошибка синхронизации: {e}') from e
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Получено заказов: {result.fetched}, записано: {result.written}, курсор: {result.watermark}'
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from wb_api.exceptions import WBError
+from wb_api.sync import sync_products
+
+
+class Command(BaseCommand):
+    help = 'Инкрементальная синхронизация товаров Wildberries в таблицу WBProduct'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--token',
+            help='API-токен продавца (по умолчанию WB_API_TOKEN)'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Игнорировать водяной знак и загрузить весь каталог'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество товаров в одном пакетном upsert'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            result = sync_products(options['token'], full=options['full'], batch_size=options['batch_size'])
+        except WBError as e:
+            raise CommandError(f'Ошибка синхронизации: {e}') from e
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Получено товаров: {result.fetched}, записано: {result.written}, водяной знак: {result.watermark}'
+        ))
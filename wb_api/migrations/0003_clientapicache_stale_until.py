@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wb_api', '0002_alter_apicache_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientapicache',
+            name='stale_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
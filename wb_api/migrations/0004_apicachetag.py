@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wb_api', '0003_clientapicache_stale_until'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APICacheTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=100)),
+                ('key', models.CharField(db_index=True, max_length=255)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tag', 'key'), name='api_cache_tag_unique')],
+            },
+        ),
+    ]
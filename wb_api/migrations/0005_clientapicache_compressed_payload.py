@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wb_api', '0004_apicachetag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientapicache',
+            name='encoding',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='clientapicache',
+            name='payload',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='clientapicache',
+            name='response',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wb_api', '0005_clientapicache_compressed_payload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wbproduct',
+            name='seller',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='wbproduct',
+            name='source_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='WBSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seller', models.CharField(max_length=64)),
+                ('kind', models.CharField(max_length=20)),
+                ('watermark', models.DateTimeField(blank=True, null=True)),
+                ('synced_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Sync State',
+                'verbose_name_plural': 'Sync States',
+                'constraints': [models.UniqueConstraint(fields=('seller', 'kind'), name='wb_sync_state_unique')],
+            },
+        ),
+    ]
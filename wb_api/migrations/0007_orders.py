@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wb_api', '0006_product_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WBOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.CharField(max_length=50, unique=True)),
+                ('seller', models.CharField(blank=True, max_length=64)),
+                ('status', models.CharField(max_length=50)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('customer', models.JSONField(default=dict)),
+                ('delivery', models.JSONField(default=dict)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField()),
+                ('source_updated_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Order',
+                'verbose_name_plural': 'Orders',
+                'indexes': [models.Index(fields=['created_at'], name='wb_api_wbor_created_8941ed_idx'), models.Index(fields=['seller', 'created_at'], name='wb_api_wbor_seller_14c48c_idx'), models.Index(fields=['status', 'created_at'], name='wb_api_wbor_status_c13ca8_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WBOrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_id', models.CharField(max_length=50)),
+                ('product_id', models.CharField(max_length=50)),
+                ('quantity', models.PositiveIntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('discount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='wb_api.wborder')),
+            ],
+            options={
+                'verbose_name': 'Order Item',
+                'verbose_name_plural': 'Order Items',
+                'indexes': [models.Index(fields=['created_at'], name='wb_api_wbor_created_0bbd42_idx'), models.Index(fields=['product_id', 'created_at'], name='wb_api_wbor_product_20c539_idx')],
+                'constraints': [models.UniqueConstraint(fields=('order', 'item_id'), name='wb_order_item_unique')],
+            },
+        ),
+    ]
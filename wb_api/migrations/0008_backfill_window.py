@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wb_api', '0007_orders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WBBackfillWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seller', models.CharField(max_length=64)),
+                ('date_from', models.DateTimeField()),
+                ('date_to', models.DateTimeField()),
+                ('fetched', models.PositiveIntegerField(default=0)),
+                ('completed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Backfill Window',
+                'verbose_name_plural': 'Backfill Windows',
+                'constraints': [models.UniqueConstraint(fields=('seller', 'date_from', 'date_to'), name='wb_backfill_window_unique')],
+            },
+        ),
+    ]
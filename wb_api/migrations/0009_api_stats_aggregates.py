@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:55
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_stats(apps, schema_editor):
+    """
+    Слияние строк WBAPIStats с одинаковым endpoint перед уникальным ограничением
+
+    До этой миграции status_code не было, все старые строки получают 0 и
+    дубликаты endpoint нарушили бы (endpoint, status_code). Счетчики
+    суммируются, последнее время ответа берется у самой свежей строки.
+    """
+    WBAPIStats = apps.get_model('wb_api', 'WBAPIStats')
+    duplicates = (
+        WBAPIStats.objects.values('endpoint', 'status_code')
+        .annotate(rows=Count('id')).filter(rows__gt=1)
+    )
+    for group in duplicates:
+        rows = list(
+            WBAPIStats.objects.filter(endpoint=group['endpoint'], status_code=group['status_code']).order_by('id')
+        )
+        keep = rows[0]
+        latest = max(rows, key=lambda row: (row.last_request_at is not None, row.last_request_at or 0, row.id))
+        keep.request_count = sum(row.request_count for row in rows)
+        keep.success_count = sum(row.success_count for row in rows)
+        keep.total_response_time = sum(row.total_response_time for row in rows)
+        keep.last_response_time = latest.last_response_time
+        keep.last_request_at = latest.last_request_at
+        keep.save()
+        WBAPIStats.objects.filter(id__in=[row.id for row in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wb_api', '0008_backfill_window'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WBAPILatencyBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=100)),
+                ('status_code', models.PositiveSmallIntegerField(default=0)),
+                ('le', models.CharField(max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'API Latency Bucket',
+                'verbose_name_plural': 'API Latency Buckets',
+            },
+        ),
+        migrations.AddField(
+            model_name='wbapistats',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='wbapistats',
+            name='total_response_time',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(merge_duplicate_stats, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='wbapistats',
+            constraint=models.UniqueConstraint(fields=('endpoint', 'status_code'), name='wb_api_stats_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='wbapilatencybucket',
+            constraint=models.UniqueConstraint(fields=('endpoint', 'status_code', 'le'), name='wb_api_latency_bucket_unique'),
+        ),
+    ]
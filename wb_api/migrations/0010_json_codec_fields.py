@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:05
+
+import wb_api.codec
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wb_api', '0009_api_stats_aggregates'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apicache',
+            name='response',
+            field=wb_api.codec.JSONField(),
+        ),
+        migrations.AlterField(
+            model_name='clientapicache',
+            name='response',
+            field=wb_api.codec.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='wbproduct',
+            name='data',
+            field=wb_api.codec.JSONField(default=dict),
+        ),
+    ]
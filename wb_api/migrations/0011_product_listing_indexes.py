@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wb_api', '0010_json_codec_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wbproduct',
+            index=models.Index(fields=['price', 'id'], name='wb_product_price_id'),
+        ),
+        migrations.AddIndex(
+            model_name='wbproduct',
+            index=models.Index(fields=['total_stock', 'id'], name='wb_product_stock_id'),
+        ),
+        migrations.AddIndex(
+            model_name='wbproduct',
+            index=models.Index(fields=['updated_at', 'id'], name='wb_product_updated_id'),
+        ),
+        migrations.AddIndex(
+            model_name='wbproduct',
+            index=models.Index(fields=['category', 'price', 'id'], name='wb_product_cat_price_id'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wb_api', '0011_product_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WBCategoryNode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category_id', models.BigIntegerField(unique=True)),
+                ('parent_id', models.BigIntegerField(blank=True, null=True)),
+                ('name', models.CharField(max_length=255)),
+                ('path', models.CharField(db_index=True, max_length=1000)),
+                ('depth', models.PositiveSmallIntegerField(default=0)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('is_visible', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Category Node',
+                'verbose_name_plural': 'Category Nodes',
+                'indexes': [models.Index(fields=['parent_id'], name='wb_api_wbca_parent__f8b0b2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    # GIN-индекс pg_trgm для поиска категорий в БД (WB_CATEGORY_SEARCH['USE_DB']); только PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS wb_category_name_trgm "
+        "ON wb_api_wbcategorynode USING gin (name gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS wb_category_name_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wb_api', '0012_category_tree'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
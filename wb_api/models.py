@@ -9,7 +9,7 @@ from pydantic import BaseModel
 from django.db import models
 from django.utils import timezone
 from django.core.serializers.json import DjangoJSONEncoder
-import json
+from wb_api import codec
 
 class WBResponse(BaseModel):
     """
@@ -18,6 +18,7 @@ class WBResponse(BaseModel):
     success: bool
     data: Optional[Any] = None
     error: Optional[str] = None
+    status_code: int = 200
 
     def __bool__(self):
         return self.success
@@ -30,7 +31,7 @@ class APICacheManager(models.Manager):
 class APICache(models.Model):
     objects = APICacheManager()
     endpoint = models.CharField(max_length=255, unique=True)
-    response = models.JSONField()
+    response = codec.JSONField()
     expires_at = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -47,7 +48,7 @@ class APICache(models.Model):
     @classmethod
     def set_cached_response(cls, endpoint, response, params=None, ttl=300):
         # response должен быть WBResponse
-        cache_key = f"{endpoint}:{json.dumps(params, sort_keys=True) if params else ''}"
+        cache_key = f"{endpoint}:{codec.canonical(params) if params else ''}"
 
         cls.objects.update_or_create(
             endpoint=cache_key,
@@ -64,7 +65,7 @@ class APICache(models.Model):
 
     @classmethod
     def get_cached_response(cls, endpoint, params=None):
-        cache_key = f"{endpoint}:{json.dumps(params, sort_keys=True) if params else ''}"
+        cache_key = f"{endpoint}:{codec.canonical(params) if params else ''}"
         try:
             cached = cls.objects.get(endpoint=cache_key)
             if cached.expires_at > timezone.now():
@@ -95,7 +96,7 @@ class APICache(models.Model):
         Генерация ключа кэша на основе endpoint и параметров
         """
         if params:
-            param_str = json.dumps(params, sort_keys=True)
+            param_str = codec.canonical(params)
             return f"{endpoint}:{param_str}"
         return endpoint
 
@@ -103,38 +104,65 @@ class APICache(models.Model):
 class WBAPIStats(models.Model):
     """
     Модель для хранения статистики запросов к API Wildberries
+    (агрегаты по эндпоинту и коду ответа, пишутся пакетно из wb_api.client.stats)
     """
     endpoint = models.CharField(max_length=100)
+    status_code = models.PositiveSmallIntegerField(default=0)
     request_count = models.PositiveIntegerField(default=0)
     success_count = models.PositiveIntegerField(default=0)
+    total_response_time = models.FloatField(default=0)
     last_response_time = models.FloatField(null=True, blank=True)
     last_request_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         verbose_name = 'API Statistics'
         verbose_name_plural = 'API Statistics'
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'status_code'], name='wb_api_stats_unique'),
+        ]
 
     def __str__(self):
-        return f"{self.endpoint} - {self.request_count} requests"
+        return f"{self.endpoint} [{self.status_code}] - {self.request_count} requests"
+
+    @property
+    def avg_response_time(self):
+        return self.total_response_time / self.request_count if self.request_count else None
 
     @classmethod
-    def record_request(cls, endpoint, success, response_time):
+    def record_request(cls, endpoint, success, response_time, status_code=None):
         """
-        Запись статистики запроса
+        Запись статистики запроса (в буфер процесса, в БД - при очередном сбросе)
         """
-        stats, _ = cls.objects.get_or_create(endpoint=endpoint)
-        stats.request_count += 1
-        if success:
-            stats.success_count += 1
-        stats.last_response_time = response_time
-        stats.last_request_at = timezone.now()
-        stats.save()
+        from wb_api.client.stats import api_stats
+
+        if status_code is None:
+            status_code = 200 if success else 0
+        api_stats.record(endpoint, status_code, success, response_time)
+
+
+class WBAPILatencyBucket(models.Model):
+    """Гистограмма времени ответа: число запросов с временем не больше le секунд"""
+    endpoint = models.CharField(max_length=100)
+    status_code = models.PositiveSmallIntegerField(default=0)
+    le = models.CharField(max_length=10)  # Верхняя граница корзины, '+Inf' - все остальные
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'API Latency Bucket'
+        verbose_name_plural = 'API Latency Buckets'
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'status_code', 'le'], name='wb_api_latency_bucket_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint} [{self.status_code}] <= {self.le}: {self.count}"
 
 
 class WBProduct(models.Model):
     """
     Модель для хранения основных данных о товарах Wildberries
-    (альтернативное кэширование для часто используемых товаров)
+    (альтернативное кэширование для часто используемых товаров).
+    Заполняется синхронизацией wb_api.sync.ProductSyncEngine.
     """
     product_id = models.CharField(max_length=50, unique=True)
     name = models.TextField()
@@ -143,8 +171,10 @@ class WBProduct(models.Model):
     total_stock = models.PositiveIntegerField(default=0)
     category = models.CharField(max_length=100, blank=True)
     brand = models.CharField(max_length=100, blank=True)
+    seller = models.CharField(max_length=64, blank=True, db_index=True)
+    source_updated_at = models.DateTimeField(null=True, blank=True)  # updatedAt товара в API
     updated_at = models.DateTimeField(auto_now=True)
-    data = models.JSONField(default=dict)
+    data = codec.JSONField(default=dict)
 
     class Meta:
         verbose_name = 'WB Product'
@@ -153,7 +183,134 @@ class WBProduct(models.Model):
             models.Index(fields=['product_id']),
             models.Index(fields=['price']),
             models.Index(fields=['category']),
+            # Keyset-пагинация листинга (wb_api.listing): поле сортировки + id
+            models.Index(fields=['price', 'id'], name='wb_product_price_id'),
+            models.Index(fields=['total_stock', 'id'], name='wb_product_stock_id'),
+            models.Index(fields=['updated_at', 'id'], name='wb_product_updated_id'),
+            models.Index(fields=['category', 'price', 'id'], name='wb_product_cat_price_id'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} - {self.name[:50]}"
+
+
+class WBOrder(models.Model):
+    """
+    Заказ Wildberries, загруженный wb_api.sync.OrderSyncEngine.
+
+    История заказов растет до миллионов строк, поэтому все выборки идут по
+    диапазонам created_at: индексы по дате создания заменяют партиционирование.
+    """
+    order_id = models.CharField(max_length=50, unique=True)
+    seller = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=50)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    customer = models.JSONField(default=dict)
+    delivery = models.JSONField(default=dict)
+    city = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField()
+    source_updated_at = models.DateTimeField()  # updatedAt заказа в API
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Order'
+        verbose_name_plural = 'Orders'
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['seller', 'created_at']),
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} ({self.status})"
+
+
+class WBOrderItem(models.Model):
+    """Позиция заказа; created_at продублирован из заказа для выборок по периоду"""
+    order = models.ForeignKey(WBOrder, on_delete=models.CASCADE, related_name='items')
+    item_id = models.CharField(max_length=50)
+    product_id = models.CharField(max_length=50)
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    discount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Order Item'
+        verbose_name_plural = 'Order Items'
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'item_id'], name='wb_order_item_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['product_id', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id}: {self.product_id} x{self.quantity}"
+
+class WBSyncState(models.Model):
+    """
+    Состояние инкрементальной синхронизации: водяной знак по продавцу и типу данных
+    """
+    seller = models.CharField(max_length=64)
+    kind = models.CharField(max_length=20)
+    watermark = models.DateTimeField(null=True, blank=True)
+    synced_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Sync State'
+        verbose_name_plural = 'Sync States'
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'kind'], name='wb_sync_state_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.seller}: {self.watermark}"
+
+
+class WBBackfillWindow(models.Model):
+    """Завершенное окно исторической загрузки заказов (контрольная точка backfill)"""
+    seller = models.CharField(max_length=64)
+    date_from = models.DateTimeField()
+    date_to = models.DateTimeField()
+    fetched = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Backfill Window'
+        verbose_name_plural = 'Backfill Windows'
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'date_from', 'date_to'], name='wb_backfill_window_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.seller}: {self.date_from} - {self.date_to}"
+
+
+class WBCategoryNode(models.Model):
+    """
+    Узел дерева категорий маркетплейса с материализованным путем.
+
+    path - ID предков и самой категории через '/', например '/1/5/12/':
+    поддерево категории - строки с path, начинающимся с ее path (индексный
+    диапазон), предки - ID из path. Заполняется wb_api.category_tree.
+    """
+    category_id = models.BigIntegerField(unique=True)
+    parent_id = models.BigIntegerField(null=True, blank=True)
+    name = models.CharField(max_length=255)
+    path = models.CharField(max_length=1000, db_index=True)
+    depth = models.PositiveSmallIntegerField(default=0)
+    position = models.PositiveIntegerField(default=0)  # Порядок среди соседей в ответе API
+    is_visible = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Category Node'
+        verbose_name_plural = 'Category Nodes'
+        indexes = [
+            models.Index(fields=['parent_id']),
         ]
 
     def __str__(self):
-        return f"{self.product_id} - {self.name[:50]}"
\ No newline at end of file
+        return f"{self.category_id} - {self.name}"
@@ -0,0 +1,332 @@
+"""
+Инкрементальная синхронизация данных Wildberries в локальные таблицы.
+
+Для каждого продавца хранится водяной знак (WBSyncState): максимальный
+updatedAt уже загруженных записей. Следующий запуск запрашивает только
+изменения начиная с него, а в БД пишутся только действительно изменившиеся
+строки - пакетным upsert'ом через bulk_create(update_conflicts=True).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from wb_api.client.models.cache import seller_key
+from wb_api.client.models.schemas import OrderSchema, ProductSchema
+from wb_api.client.orders import WBOrdersClient
+from wb_api.client.products import WBProductsClient
+from wb_api.client.stats import api_stats, mark_worker_thread
+from wb_api.exceptions import WBError
+from wb_api.models import WBBackfillWindow, WBOrder, WBOrderItem, WBProduct, WBSyncState
+
+logger = logging.getLogger(__name__)
+
+BRAND_ATTRIBUTES = ('brand', 'бренд')
+
+
+@dataclass
+class SyncResult:
+    fetched: int = 0
+    written: int = 0
+    watermark: Optional[datetime] = None
+
+
+@dataclass
+class BackfillResult:
+    windows: int = 0
+    skipped: int = 0
+    fetched: int = 0
+    written: int = 0
+    failed: List[Tuple[datetime, datetime, str]] = field(default_factory=list)
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Дата из API как aware-datetime: значения без часового пояса считаются UTC"""
+    if value is not None and timezone.is_naive(value):
+        return timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def product_row(product: ProductSchema, seller: str = '') -> WBProduct:
+    """Строка WBProduct по товару из API (цена и скидка - по первой цене)"""
+    price = product.prices[0]
+    brand = next((a.value for a in product.attributes if a.name.lower() in BRAND_ATTRIBUTES), '')
+    return WBProduct(
+        product_id=product.product_id,
+        name=product.name,
+        price=Decimal(str(price.price)).quantize(Decimal('0.01')),
+        discount=int(round(price.discount or 0)),
+        total_stock=sum(stock.amount for stock in product.stocks),
+        category=str(product.category_id) if product.category_id is not None else '',
+        brand=brand[:100],
+        seller=seller,
+        source_updated_at=as_utc(product.updated_at),
+        data=product.model_dump(mode='json', by_alias=True),
+    )
+
+
+class IncrementalSync:
+    """
+    Общий цикл инкрементальной синхронизации по водяному знаку updated_at.
+
+    Подклассы задают KIND, загрузку изменений (fetch) и запись пакета (write).
+    Водяной знак сохраняется только после успешного обхода всех страниц:
+    при ошибке следующий запуск повторит загрузку с прежней точки, а
+    повторная запись тех же данных пропускается сравнением с БД.
+    """
+    KIND = None
+
+    def __init__(self, client, batch_size: int = 500, page_size: Optional[int] = None):
+        self.client = client
+        self.batch_size = batch_size
+        self.page_size = page_size
+        # Страницы разбираются потоково: в памяти воркера нет целого ответа
+        self.stream = getattr(settings, 'WB_SYNC_STREAM', True)
+        self.seller = seller_key(client.token)
+
+    def fetch(self, since: Optional[datetime]) -> Iterator:
+        raise NotImplementedError
+
+    def write(self, batch: List) -> int:
+        """Запись пакета; возвращает число записанных строк"""
+        raise NotImplementedError
+
+    def run(self, full: bool = False) -> SyncResult:
+        """
+        Args:
+            full: игнорировать водяной знак и загрузить все данные
+        """
+        state, _ = WBSyncState.objects.get_or_create(seller=self.seller, kind=self.KIND)
+        result = SyncResult(watermark=state.watermark)
+
+        batch = []
+        for item in self.fetch(None if full else state.watermark):
+            result.fetched += 1
+            updated_at = as_utc(item.updated_at)
+            if result.watermark is None or updated_at > result.watermark:
+                result.watermark = updated_at
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                result.written += self.write(batch)
+                batch = []
+        result.written += self.write(batch)
+
+        state.watermark = result.watermark
+        state.synced_at = timezone.now()
+        state.save(update_fields=['watermark', 'synced_at'])
+        logger.info(f"Синхронизация {self.KIND} {self.seller}: получено {result.fetched}, записано {result.written}")
+        return result
+
+
+class ProductSyncEngine(IncrementalSync):
+    """Синхронизация товаров продавца в WBProduct"""
+    KIND = 'products'
+    FIELDS = ('name', 'price', 'discount', 'total_stock', 'category', 'brand', 'seller',
+              'source_updated_at', 'data')
+
+    def fetch(self, since):
+        filter = {'date_from': since} if since else {}
+        return self.client.iter_prds(filter, page_size=self.page_size, stream=self.stream)
+
+    def write(self, products: List[ProductSchema]) -> int:
+        """Upsert изменившихся товаров пакета"""
+        rows: Dict[str, WBProduct] = {}
+        for product in products:
+            rows[product.product_id] = product_row(product, self.seller)
+        if not rows:
+            return 0
+
+        current = {
+            values[0]: values[1:]
+            for values in WBProduct.objects.filter(product_id__in=rows).values_list('product_id', *self.FIELDS)
+        }
+        changed = [
+            row for product_id, row in rows.items()
+            if current.get(product_id) != tuple(getattr(row, field) for field in self.FIELDS)
+        ]
+        if changed:
+            WBProduct.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=['product_id'],
+                update_fields=[*self.FIELDS, 'updated_at'],
+            )
+        return len(changed)
+
+
+class OrderSyncEngine(IncrementalSync):
+    """
+    Загрузка заказов продавца в WBOrder/WBOrderItem.
+
+    Заказ считается изменившимся, если его updatedAt отличается от
+    сохраненного; позиции такого заказа перезаписываются целиком.
+    """
+    KIND = 'orders'
+    FIELDS = ('seller', 'status', 'total_amount', 'customer', 'delivery', 'city', 'created_at',
+              'source_updated_at')
+
+    def fetch(self, since):
+        params = {'dateFrom': since.isoformat()} if since else {}
+        return self.client.iter_orders(params, page_size=self.page_size, stream=self.stream)
+
+    def write(self, orders: List[OrderSchema]) -> int:
+        """Upsert изменившихся заказов пакета вместе с позициями"""
+        return write_orders(orders, self.seller)
+
+
+def order_row(order: OrderSchema, seller: str = '') -> WBOrder:
+    return WBOrder(
+        order_id=order.order_id,
+        seller=seller,
+        status=order.status,
+        total_amount=Decimal(str(order.total_amount)).quantize(Decimal('0.01')),
+        customer=order.customer.model_dump(mode='json'),
+        delivery=order.delivery.model_dump(mode='json'),
+        city=order.delivery.city[:100],
+        created_at=as_utc(order.created_at),
+        source_updated_at=as_utc(order.updated_at),
+    )
+
+
+def write_orders(orders: Iterable[OrderSchema], seller: str = '') -> int:
+    """
+    Upsert заказов, у которых изменился updatedAt, и перезапись их позиций.
+
+    Дубликаты order_id внутри пакета схлопываются в самую свежую версию.
+    Returns:
+        число записанных заказов
+    """
+    latest: Dict[str, OrderSchema] = {}
+    for order in orders:
+        known = latest.get(order.order_id)
+        if known is None or as_utc(order.updated_at) >= as_utc(known.updated_at):
+            latest[order.order_id] = order
+    if not latest:
+        return 0
+
+    # В БД source_updated_at хранится aware: сравнивается с приведенным к UTC updatedAt
+    current = dict(WBOrder.objects.filter(order_id__in=latest).values_list('order_id', 'source_updated_at'))
+    changed = [order for order_id, order in latest.items() if current.get(order_id) != as_utc(order.updated_at)]
+    if not changed:
+        return 0
+
+    with transaction.atomic():
+        WBOrder.objects.bulk_create(
+            [order_row(order, seller) for order in changed],
+            update_conflicts=True,
+            unique_fields=['order_id'],
+            update_fields=[*OrderSyncEngine.FIELDS, 'updated_at'],
+        )
+        ids = dict(WBOrder.objects.filter(order_id__in=[o.order_id for o in changed]).values_list('order_id', 'id'))
+        WBOrderItem.objects.filter(order_id__in=ids.values()).delete()
+        WBOrderItem.objects.bulk_create([
+            WBOrderItem(
+                order_id=ids[order.order_id],
+                item_id=item.item_id,
+                product_id=item.product_id,
+                quantity=item.quantity,
+                price=Decimal(str(item.price)).quantize(Decimal('0.01')),
+                discount=int(round(item.discount or 0)),
+                created_at=order.created_at,
+            )
+            for order in changed for item in order.items
+        ])
+    return len(changed)
+
+
+def sync_products(token: Optional[str] = None, full: bool = False, batch_size: int = 500) -> SyncResult:
+    """Синхронизация товаров продавца (по умолчанию - токен WB_API_TOKEN)"""
+    client = WBProductsClient(token=token or getattr(settings, 'WB_API_TOKEN', None))
+    return ProductSyncEngine(client, batch_size=batch_size).run(full=full)
+
+
+def sync_orders(token: Optional[str] = None, full: bool = False, batch_size: int = 500) -> SyncResult:
+    """Загрузка новых и изменившихся заказов продавца (по умолчанию - токен WB_API_TOKEN)"""
+    client = WBOrdersClient(token=token or getattr(settings, 'WB_API_TOKEN', None))
+    return OrderSyncEngine(client, batch_size=batch_size).run(full=full)
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def window_start(moment: datetime, step: timedelta) -> datetime:
+    """Ближайшая не позже moment граница окон: кратное step от начала эпохи (UTC)"""
+    return EPOCH + (moment - EPOCH) // step * step
+
+
+def split_windows(date_from: datetime, date_to: datetime, step: timedelta) -> List[Tuple[datetime, datetime]]:
+    """
+    Разбиение периода на окна по фиксированным границам window_start.
+
+    Границы не зависят от концов периода, поэтому при повторном запуске с
+    другим date_from/date_to полные окна совпадают с сохраненными контрольными
+    точками; короче step могут быть только первое и последнее окна.
+    """
+    windows = []
+    start = date_from
+    while start < date_to:
+        end = min(window_start(start, step) + step, date_to)
+        windows.append((start, end))
+        start = end
+    return windows
+
+
+def backfill_orders(date_from: datetime, date_to: datetime, token: Optional[str] = None,
+                    window: timedelta = timedelta(days=7), workers: Optional[int] = None,
+                    restart: bool = False) -> BackfillResult:
+    """
+    Параллельная загрузка истории заказов по окнам дат.
+
+    Окна загружаются в пуле потоков (только HTTP), запись в БД и контрольные
+    точки выполняются в вызывающем потоке по мере готовности окон. Завершенные
+    окна сохраняются в WBBackfillWindow и при повторном запуске пропускаются,
+    поэтому после сбоя загрузка продолжается с незавершенных окон. Заказы на
+    границах окон схлопываются по order_id при записи.
+
+    Args:
+        date_from: начало периода
+        date_to: конец периода
+        token: API-токен продавца (по умолчанию WB_API_TOKEN)
+        window: длина окна
+        workers: число параллельных загрузок (по умолчанию WB_BULK_MAX_CONCURRENCY)
+        restart: удалить контрольные точки и загрузить все окна заново
+    """
+    client = WBOrdersClient(token=token or getattr(settings, 'WB_API_TOKEN', None))
+    seller = seller_key(client.token)
+    workers = workers or getattr(settings, 'WB_BULK_MAX_CONCURRENCY', 8)
+
+    if restart:
+        WBBackfillWindow.objects.filter(seller=seller).delete()
+    windows = split_windows(date_from, date_to, window)
+    done = set(WBBackfillWindow.objects.filter(seller=seller).values_list('date_from', 'date_to'))
+    pending = [w for w in windows if w not in done]
+    result = BackfillResult(windows=len(windows), skipped=len(windows) - len(pending))
+
+    def fetch(start, end):
+        params = {'dateFrom': start.isoformat(), 'dateTo': end.isoformat()}
+        return list(client.iter_orders(params, prefetch=False))
+
+    with ThreadPoolExecutor(max_workers=workers, initializer=mark_worker_thread) as executor:
+        futures = {executor.submit(fetch, *w): w for w in pending}
+        for future in as_completed(futures):
+            start, end = futures[future]
+            try:
+                orders = future.result()
+            except WBError as e:
+                logger.warning(f"Окно заказов {start} - {end} не загружено: {e}")
+                result.failed.append((start, end, str(e)))
+                continue
+            result.fetched += len(orders)
+            result.written += write_orders(orders, seller)
+            WBBackfillWindow.objects.create(seller=seller, date_from=start, date_to=end, fetched=len(orders))
+            api_stats.maybe_flush()
+
+    logger.info(f"Backfill заказов {seller}: окон {result.windows}, пропущено {result.skipped}, "
+                f"получено {result.fetched}, записано {result.written}, ошибок {len(result.failed)}")
+    return result
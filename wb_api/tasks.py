@@ -1,6 +1,14 @@
+import inspect
+
+from asgiref.sync import async_to_sync
 from celery import shared_task
 from django.utils import timezone
+from django.utils.module_loading import import_string
+from wb_api.category_tree import load_category_tree
+from wb_api.client.models.backends import get_cache_backend
+from wb_api.client.models.cache import cache_namespace, make_cache_key, refresh_done
 from wb_api.models import APICache
+from wb_api.sync import sync_orders, sync_products
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,11 +19,59 @@ def clear_wb_cache_task(force=False):
     try:
         if force:
             count, _ = APICache.objects.all().delete()
+            count += get_cache_backend().clear()
             logger.info(f"Принудительно очищен весь кэш. Удалено: {count}")
         else:
             count, _ = APICache.objects.filter(expires_at__lt=timezone.now()).delete()
+            count += get_cache_backend().clear(expired_only=True)
             logger.info(f"Очищен просроченный кэш. Удалено: {count}")
         return count
     except Exception as e:
         logger.error(f"Ошибка очистки кэша: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+@shared_task
+def refresh_api_cache_task(client_path, method_name, token, args, kwargs, tenant=''):
+    """Фоновое обновление устаревшей записи кэша (stale-while-revalidate)"""
+    client_cls = import_string(client_path)
+    refresh = getattr(client_cls, method_name).refresh
+    client = client_cls(token=token, tenant=tenant)
+
+    # Ключ уже обновляет другой процесс - повторно API не вызываем
+    cache_key = make_cache_key(method_name, tuple(args), kwargs, cache_namespace(client))
+    lock = get_cache_backend().lock(cache_key)
+    if not lock.try_acquire():
+        return False
+    try:
+        if inspect.iscoroutinefunction(refresh):
+            response = async_to_sync(refresh)(client, *args, **kwargs)
+        else:
+            response = refresh(client, *args, **kwargs)
+    finally:
+        lock.release()
+        refresh_done(cache_key)
+    if not response.success:
+        logger.warning(f"Не удалось обновить кэш {client_path}.{method_name}: {response.error}")
+    return response.success
+
+
+@shared_task
+def sync_wb_products_task(token=None, full=False):
+    """Фоновая инкрементальная синхронизация товаров в WBProduct"""
+    result = sync_products(token, full=full)
+    return {'fetched': result.fetched, 'written': result.written}
+
+
+@shared_task
+def sync_wb_orders_task(token=None, full=False):
+    """Фоновая загрузка новых и изменившихся заказов"""
+    result = sync_orders(token, full=full)
+    return {'fetched': result.fetched, 'written': result.written}
+
+
+@shared_task
+def sync_wb_categories_task(token=None):
+    """Фоновая загрузка дерева категорий в WBCategoryNode (для поиска и индекса категорий)"""
+    result = load_category_tree(token)
+    return {'created': result.created, 'updated': result.updated, 'deleted': result.deleted}
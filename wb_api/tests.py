@@ -1,10 +1,68 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from unittest.mock import patch, MagicMock
+import httpx
+import pytest
+from asgiref.sync import async_to_sync
+from pydantic import ValidationError
 import requests  # Добавляем импорт requests
 
+from .client.aio import AsyncWBClientBase, AsyncWBProductsClient, build_async_http_client, get_async_http_client
 from .client.base import WBClientBase
 from .client.client import WBClient
-from wb_api.models import WBResponse
+from .client.models.cache import (
+    APICacheTag, CacheEntry, ClientAPICache, cache_api_call, cache_namespace, invalidate_tags, memory_cache,
+    product_tag, seller_key, seller_tag,
+)
+from .client.models.backends import DjangoCacheBackend, ORMCacheBackend, RedisCacheBackend, get_cache_backend
+from .client.models.memory import MemoryCache
+from .client.models.singleflight import AdvisoryLock, AsyncSingleFlight, SingleFlight
+from .client.orders import WBOrdersClient
+from .client.products import WBProductsClient
+from .client.sessions import SessionRegistry
+from .client.pool import ClientPool
+from .client.resilience import CircuitBreaker, Resilience
+from .client.ratelimit import LocalRateLimitStore, RateLimitGroup, RateLimiter, RedisRateLimitStore, parse_retry_after
+from .client.stats import StatsAggregator, api_stats, mark_worker_thread, normalize_endpoint
+from .client.streaming import JSONStream
+from .client.models.schemas import ProductListSchema, ProductSchema
+from .client.validation import LAZY, TRUSTED, LazyItems, parse, rehydrate, validated_response
+from wb_api import analytics, codec
+from wb_api.analytics import ProductColumns
+from wb_api.category_search import CategorySearchIndex, normalize, search_db, trigrams
+from wb_api.checks import shared_cache_check
+from wb_api.category_tree import CategoryIndex, flatten, get_category_index, sync_category_tree
+from wb_api.client.categories import WBCategoriesClient
+from wb_api.exceptions import WBAPIError, WBValidationError
+from wb_api.fragments import render_sections
+from wb_api.models import WBAPILatencyBucket, WBAPIStats, WBBackfillWindow, WBCategoryNode, WBOrder, WBOrderItem, WBProduct, WBResponse, WBSyncState
+from wb_api.sync import OrderSyncEngine, ProductSyncEngine, backfill_orders, split_windows
+
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+def mock_http_client(handler):
+    """httpx-клиент, отвечающий через handler(request) без сети"""
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
 
 
 class AuthTests(TestCase):
@@ -15,7 +73,7 @@ class AuthTests(TestCase):
     def test_valid_token(self, mock_request):
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"valid": True}
+        mock_response.content = json.dumps({"valid": True}).encode()
         mock_request.return_value = mock_response
 
         response = self.client.check_creds("valid_token")
@@ -46,7 +104,7 @@ class CategoryTests(TestCase):
     def test_get_categories(self, mock_request):
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = self.test_categories
+        mock_response.content = json.dumps(self.test_categories).encode()
         mock_request.return_value = mock_response
 
         response = self.client.get_categories()
@@ -63,7 +121,7 @@ class ProductTests(TestCase):
     def test_get_products(self, mock_request):
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"items": [self.test_product], "total": 1}
+        mock_response.content = json.dumps({"items": [self.test_product], "total": 1}).encode()
         mock_request.return_value = mock_response
 
         response = self.client.get_products()
@@ -74,7 +132,7 @@ class ProductTests(TestCase):
     def test_update_product(self, mock_request):
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = self.test_product
+        mock_response.content = json.dumps(self.test_product).encode()
         mock_request.return_value = mock_response
 
         response = self.client.update_product("12345", {"price": 1099})
@@ -91,7 +149,7 @@ class OrderTests(TestCase):
     def test_get_orders(self, mock_request):
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"items": [self.test_order], "total": 1}
+        mock_response.content = json.dumps({"items": [self.test_order], "total": 1}).encode()
         mock_request.return_value = mock_response
 
         response = self.client.get_orders()
@@ -154,4 +212,1299 @@ class IntegrationTests(TestCase):
         # Тестируем get_orders
         orders_response = self.client.get_orders()
         self.assertTrue(orders_response.success)
-        self.assertEqual(len(orders_response.data["items"]), 1)
\ No newline at end of file
+        self.assertEqual(len(orders_response.data["items"]), 1)
+
+
+class AsyncClientTests(TestCase):
+    def test_request_success(self):
+        def handler(request):
+            self.assertEqual(request.headers["Authorization"], "Bearer test_key")
+            return httpx.Response(200, json={"valid": True})
+
+        async def run():
+            async with AsyncWBClientBase(http_client=mock_http_client(handler)) as client:
+                return await client._request('GET', '/v1/auth/test')
+
+        response = asyncio.run(run())
+        self.assertTrue(response.success)
+        self.assertEqual(response.data, {"valid": True})
+
+    def test_request_error(self):
+        client = AsyncWBClientBase(http_client=mock_http_client(lambda request: httpx.Response(404, text="Not Found")))
+        response = asyncio.run(client._request('GET', '/invalid'))
+        self.assertFalse(response.success)
+        self.assertEqual(response.error, "Not Found")
+        self.assertEqual(response.status_code, 404)
+
+    @patch('wb_api.client.models.cache.set_cached')
+    @patch('wb_api.client.models.cache._load_cached')
+    def test_cached_coroutine(self, mock_get, mock_set):
+        client = AsyncWBProductsClient(http_client=mock_http_client(lambda request: httpx.Response(200, json=make_product(2))))
+
+        mock_get.return_value = CacheEntry(
+            {"success": True, "data": {"productId": "1"}, "error": None, "status_code": 200},
+            timezone.now() + timedelta(seconds=60)
+        )
+        response = asyncio.run(client.get_prd("1"))
+        self.assertEqual(response.data, {"productId": "1"})
+        mock_set.assert_not_called()
+
+        mock_get.return_value = None
+        response = asyncio.run(client.get_prd("2"))
+        self.assertEqual(response.data["product_id"], "2")
+        mock_set.assert_called_once()
+
+
+
+class BulkDetailsTests(TestCase):
+    def setUp(self):
+        self.client = WBProductsClient(token="test_key")
+
+    def test_details_in_input_order_with_errors(self):
+        ClientAPICache.set_cached_response(
+            f"{seller_key('test_key')}|get_prd:('1',):{{}}", WBResponse(success=True, data={"productId": "1"}), ttl=60
+        )
+
+        def fake_request(method, endpoint, **kwargs):
+            if endpoint == '/swagger/products/3':
+                return WBResponse(success=False, error="Not Found", status_code=404)
+            return WBResponse(success=True, data=make_product(endpoint.rsplit('/', 1)[-1]))
+
+        with patch.object(WBProductsClient, '_request', side_effect=fake_request) as mock_request:
+            response = self.client.get_prds_details(["3", "1", "2"], include_commission=False, max_concurrency=2)
+
+        self.assertEqual(mock_request.call_count, 2)  # "1" взят из кэша
+        self.assertEqual([item["prd_id"] for item in response.data["items"]], ["3", "1", "2"])
+        self.assertEqual(response.data["items"][1]["product"], {"productId": "1"})
+        self.assertEqual(response.data["errors"], {"3": "Not Found"})
+        self.assertFalse(response.success)
+        self.assertIsNotNone(ClientAPICache.get_cached_response(f"{seller_key('test_key')}|get_prd:('2',):{{}}"))
+        self.assertIsNone(ClientAPICache.get_cached_response(f"{seller_key('test_key')}|get_prd:('3',):{{}}"))
+
+
+
+class MemoryCacheTests(TestCase):
+    def test_lru_eviction_by_entries_and_bytes(self):
+        expires_at = timezone.now() + timedelta(seconds=60)
+        cache = MemoryCache(max_entries=2, max_bytes=100)
+        cache.set("a", {"v": 1}, expires_at, size=10)
+        cache.set("b", {"v": 2}, expires_at, size=10)
+        cache.get("a")
+        cache.set("c", {"v": 3}, expires_at, size=10)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {"v": 1})
+
+        cache.set("big", {"v": 4}, expires_at, size=85)
+        self.assertEqual(cache.current_bytes, 95)
+        self.assertIsNone(cache.get("c"))
+        cache.set("huge", {"v": 5}, expires_at, size=101)
+        self.assertIsNone(cache.get("huge"))
+
+    def test_fifo_and_expiry(self):
+        cache = MemoryCache(max_entries=2, policy="fifo")
+        cache.set("a", 1, timezone.now() + timedelta(seconds=60))
+        cache.set("b", 2, timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(cache.get("b"))
+        cache.set("c", 3, timezone.now() + timedelta(seconds=60))
+        cache.get("a")
+        cache.set("d", 4, timezone.now() + timedelta(seconds=60))
+        self.assertIsNone(cache.get("a"))
+
+    @override_settings(WB_RESILIENCE={'STALE_IF_ERROR': 0})
+    def test_hot_key_skips_database(self):
+        class Client:
+            calls = 0
+
+            @cache_api_call(ttl=60)
+            def get_categories(self):
+                Client.calls += 1
+                return WBResponse(success=True, data={"items": []})
+
+        client = Client()
+        client.get_categories()
+        with self.assertNumQueries(0):
+            response = client.get_categories()
+        self.assertEqual(response.data, {"items": []})
+        self.assertEqual(Client.calls, 1)
+
+        row = ClientAPICache.objects.get()
+        expires_ts = memory_cache._entries[row.endpoint[:-1]][1]
+        self.assertLessEqual(expires_ts, row.expires_at.timestamp())
+        self.assertAlmostEqual(expires_ts, time.time() + memory_cache.max_ttl, delta=5)
+
+    def test_other_process_memory_expires_after_invalidation(self):
+        other = MemoryCache.from_settings()  # Память другого процесса
+        entry = CacheEntry({"data": 1}, timezone.now() + timedelta(hours=1))
+        other.set("get_prd:('1',):{}", entry, entry.expires_at)
+        invalidate_tags(product_tag("1"))
+
+        self.assertIsNotNone(other.get("get_prd:('1',):{}"))
+        with patch("wb_api.client.models.memory.time.time", return_value=time.time() + other.max_ttl + 1):
+            self.assertIsNone(other.get("get_prd:('1',):{}"))
+
+
+
+class StaleWhileRevalidateTests(TestCase):
+    def setUp(self):
+        self.client = WBProductsClient(token="seller_token")
+        self.cache_key = f"{seller_key('seller_token')}|get_prds:():{{}}"
+        ClientAPICache.objects.create(
+            endpoint=f"{self.cache_key}:",
+            response={"success": True, "data": {"items": ["old"]}, "error": None, "status_code": 200},
+            expires_at=timezone.now() - timedelta(seconds=10),
+            stale_until=timezone.now() + timedelta(seconds=60),
+        )
+
+    @patch('wb_api.tasks.refresh_api_cache_task.delay')
+    @patch.object(WBProductsClient, '_request')
+    def test_stale_entry_served_and_refresh_queued(self, mock_request, mock_delay):
+        response = self.client.get_prds()
+        self.client.get_prds()
+
+        self.assertEqual(response.data, {"items": ["old"]})
+        mock_request.assert_not_called()
+        mock_delay.assert_called_once_with(
+            "wb_api.client.products.WBProductsClient", "get_prds", "seller_token", [], {},
+            tenant=seller_key("seller_token")
+        )
+
+    @patch.object(WBProductsClient, '_request')
+    def test_refresh_queued_again_after_next_expiry(self, mock_request):
+        from wb_api.tasks import refresh_api_cache_task
+
+        mock_request.return_value = WBResponse(success=True, data={"items": [make_product("new")], "total": 1})
+        with patch('wb_api.tasks.refresh_api_cache_task.delay', side_effect=refresh_api_cache_task) as mock_delay:
+            for cycle in range(1, 3):
+                # Запись устарела (после обновления - через ttl): отдается старая, обновление ставится заново
+                ClientAPICache.objects.update(expires_at=timezone.now() - timedelta(seconds=10))
+                memory_cache.clear()
+                self.client.get_prds()
+                self.assertEqual(mock_delay.call_count, cycle)
+                self.assertEqual(mock_request.call_count, cycle)
+
+    @override_settings(WB_RESILIENCE={'STALE_IF_ERROR': 0})
+    @patch.object(WBProductsClient, '_request')
+    def test_refresh_task_updates_entry(self, mock_request):
+        from wb_api.tasks import refresh_api_cache_task
+
+        mock_request.return_value = WBResponse(success=True, data={"items": [make_product("new")], "total": 1})
+        self.assertTrue(refresh_api_cache_task(
+            "wb_api.client.products.WBProductsClient", "get_prds", "seller_token", [], {}
+        ))
+
+        row = ClientAPICache.objects.get(endpoint=f"{self.cache_key}:")
+        self.assertEqual(row.response["data"]["items"][0]["productId"], "new")
+        self.assertGreater(row.expires_at, timezone.now())
+        self.assertEqual(row.stale_until - row.expires_at, timedelta(seconds=3600))
+
+    @patch.object(WBProductsClient, '_request')
+    def test_entry_past_grace_period_fetched_synchronously(self, mock_request):
+        ClientAPICache.objects.update(stale_until=timezone.now() - timedelta(seconds=1))
+        mock_request.return_value = WBResponse(success=True, data={"items": [make_product("new")], "total": 1})
+
+        response = self.client.get_prds()
+        self.assertEqual(response.data["items"][0]["productId"], "new")
+        mock_request.assert_called_once()
+
+
+
+class SingleFlightTests(TestCase):
+    def test_concurrent_threads_share_one_call(self):
+        flight = SingleFlight()
+        calls = []
+        results = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.1)
+            return WBResponse(success=True, data={"items": []})
+
+        threads = [threading.Thread(target=lambda: results.append(flight.do("key", fetch))) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_concurrent_coroutines_share_one_call(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        async def run():
+            return await asyncio.gather(*(flight.do("key", fetch) for _ in range(10)))
+
+        self.assertEqual(asyncio.run(run()), [1] * 10)
+        self.assertEqual(len(calls), 1)
+
+    def test_advisory_lock_is_noop_without_postgres(self):
+        lock = AdvisoryLock("get_categories:():{}")
+        self.assertTrue(lock.acquire(timeout=0))
+        self.assertFalse(lock.contended)
+        lock.release()
+
+
+
+class TagInvalidationTests(TestCase):
+    def setUp(self):
+        self.client = WBProductsClient(token="seller_token")
+
+    def fake_request(self, method, endpoint, **kwargs):
+        if endpoint == '/swagger/products':
+            return WBResponse(success=True, data={"items": [
+                make_product(1, category_id=10), make_product(2, category_id=20)
+            ], "total": 2})
+        return WBResponse(success=True, data=make_product(endpoint.rsplit('/', 1)[-1], category_id=None))
+
+    def test_set_prd_purges_entries_mentioning_product(self):
+        with patch.object(WBProductsClient, '_request', side_effect=self.fake_request):
+            self.client.get_prds()
+            self.client.get_prd("1")
+            self.client.get_prd("2")
+        self.assertEqual(ClientAPICache.objects.count(), 3)
+        self.assertTrue(APICacheTag.objects.filter(tag=seller_tag("seller_token")).exists())
+
+        with patch.object(WBProductsClient, '_request', return_value=WBResponse(success=True)):
+            self.client.set_prd("1", {"price": 100})
+
+        namespace = seller_key("seller_token")
+        self.assertEqual(
+            list(ClientAPICache.objects.values_list('endpoint', flat=True)), [f"{namespace}|get_prd:('2',):{{}}:"]
+        )
+        self.assertIsNone(memory_cache.get(f"{namespace}|get_prd:('1',):{{}}"))
+        self.assertIsNone(memory_cache.get(f"{namespace}|get_prds:():{{}}"))
+        self.assertFalse(APICacheTag.objects.filter(key=f"{namespace}|get_prds:():{{}}").exists())
+
+    def test_invalidate_by_category_and_seller(self):
+        with patch.object(WBProductsClient, '_request', side_effect=self.fake_request):
+            self.client.get_prds()
+            self.client.get_prd("1")
+
+        self.assertEqual(invalidate_tags("category:20"), 1)
+        self.assertEqual(invalidate_tags(seller_tag("seller_token")), 1)
+        self.assertFalse(ClientAPICache.objects.exists())
+
+
+
+class CacheBackendTestsMixin:
+    def make_backend(self):
+        raise NotImplementedError
+
+    def test_set_get_and_tags(self):
+        backend = self.make_backend()
+        now = timezone.now()
+        backend.set("fresh", CacheEntry({"data": 1}, now + timedelta(seconds=60)), tags=["product:1"])
+        backend.set("stale", CacheEntry({"data": 2}, now - timedelta(seconds=1), now + timedelta(seconds=60)),
+                    tags=["product:2"])
+
+        self.assertEqual(backend.get("fresh").payload, {"data": 1})
+        self.assertFalse(backend.get("stale").is_fresh())
+        self.assertIsNone(backend.get("missing"))
+        self.assertEqual(set(backend.get_many(["fresh", "stale", "missing"])), {"fresh"})
+
+        self.assertEqual(backend.invalidate_tags(["product:1"]), ["fresh"])
+        self.assertIsNone(backend.get("fresh"))
+        self.assertIsNotNone(backend.get("stale"))
+
+    def test_overwrite_moves_key_between_tags(self):
+        backend = self.make_backend()
+        expires_at = timezone.now() + timedelta(seconds=60)
+        backend.set("key", CacheEntry({"data": 1}, expires_at), tags=["product:1"])
+        backend.set("key", CacheEntry({"data": 2}, expires_at), tags=["product:2"])
+
+        self.assertEqual(backend.invalidate_tags(["product:1"]), [])
+        self.assertEqual(backend.invalidate_tags(["product:2"]), ["key"])
+
+    def test_lock_is_exclusive(self):
+        backend = self.make_backend()
+        first, second = backend.lock("key"), backend.lock("key")
+        self.assertTrue(first.try_acquire())
+        self.assertFalse(second.acquire(timeout=0))
+        first.release()
+        self.assertTrue(second.try_acquire())
+        second.release()
+
+
+class ORMCacheBackendTests(CacheBackendTestsMixin, TestCase):
+    def make_backend(self):
+        return ORMCacheBackend()
+
+    def test_lock_is_exclusive(self):
+        # advisory lock доступен только на PostgreSQL
+        lock = self.make_backend().lock("key")
+        self.assertTrue(lock.acquire(timeout=0))
+        lock.release()
+
+
+class TagIndexExpiryTestsMixin:
+    def test_expired_keys_pruned_from_tag(self):
+        backend = self.make_backend()
+        now = timezone.now()
+        backend.set("old", CacheEntry({"data": 1}, now - timedelta(seconds=5)), tags=["seller:1"])
+        backend.set("new", CacheEntry({"data": 2}, now + timedelta(seconds=60)), tags=["seller:1"])
+
+        self.assertEqual(self.tag_members("seller:1"), {"new"})
+
+
+class DjangoCacheBackendTests(TagIndexExpiryTestsMixin, CacheBackendTestsMixin, TestCase):
+    def make_backend(self):
+        self.backend = DjangoCacheBackend()
+        return self.backend
+
+    def tag_members(self, tag):
+        return set(self.backend.cache.get(self.backend._tag_key(tag)))
+
+    @override_settings(WB_CACHE_BACKEND={'BACKEND': 'wb_api.client.models.backends.DjangoCacheBackend'})
+    def test_cache_api_call_uses_configured_backend(self):
+        class Client:
+            token = "seller_token"
+
+            @cache_api_call(ttl=60)
+            def get_categories(self):
+                return WBResponse(success=True, data={"items": []})
+
+        self.assertIsInstance(get_cache_backend(), DjangoCacheBackend)
+        Client().get_categories()
+        self.assertFalse(ClientAPICache.objects.exists())
+        key = f"{seller_key('seller_token')}|get_categories:():{{}}"
+        self.assertEqual(get_cache_backend().get(key).payload["data"], {"items": []})
+
+
+@skipUnless(fakeredis, "fakeredis не установлен")
+class RedisCacheBackendTests(TagIndexExpiryTestsMixin, CacheBackendTestsMixin, TestCase):
+    def make_backend(self):
+        self.backend = RedisCacheBackend(client=fakeredis.FakeRedis())
+        return self.backend
+
+    def tag_members(self, tag):
+        return {key.decode() for key in self.backend.redis.zrange(self.backend._tag_key(tag), 0, -1)}
+
+    def test_tag_expires_with_longest_entry(self):
+        backend = self.make_backend()
+        now = timezone.now()
+        backend.set("short", CacheEntry({"data": 1}, now + timedelta(seconds=60)), tags=["seller:1"])
+        backend.set("long", CacheEntry({"data": 2}, now + timedelta(seconds=600)), tags=["seller:1"])
+        backend.set("short", CacheEntry({"data": 1}, now + timedelta(seconds=60)), tags=["seller:1"])
+
+        self.assertAlmostEqual(backend.redis.pttl(backend._tag_key("seller:1")) / 1000, 600, delta=5)
+        self.assertGreater(backend.redis.pttl(backend._entry_tags_key("short")), 0)
+
+
+
+@override_settings(WB_CACHE_COMPRESSION={'THRESHOLD': 100, 'CODEC': 'gzip'})
+class CompressedStorageTests(TestCase):
+    def setUp(self):
+        self.large = WBResponse(success=True, data={"items": [{"productId": str(i)} for i in range(50)]})
+
+    def test_large_payload_stored_compressed_and_decoded_lazily(self):
+        ClientAPICache.set_cached_response("get_prds", self.large, ttl=60)
+        ClientAPICache.set_cached_response("get_prd", WBResponse(success=True, data={}), ttl=60)
+
+        row = ClientAPICache.objects.get(endpoint="get_prds:")
+        self.assertEqual(row.encoding, "gzip")
+        self.assertIsNone(row.response)
+        self.assertLess(len(row.payload), len(json.dumps(self.large.data)))
+        self.assertEqual(ClientAPICache.objects.get(endpoint="get_prd:").encoding, "")
+
+        entry = ClientAPICache.get_cached_entry("get_prds")
+        self.assertIsNotNone(entry.raw)
+        self.assertGreater(entry.size, len(row.payload))
+        self.assertEqual(entry.payload["data"], self.large.data)
+        self.assertIsNone(entry.raw)
+
+    def test_compress_command_converts_existing_rows(self):
+        with override_settings(WB_CACHE_COMPRESSION={'THRESHOLD': None}):
+            ClientAPICache.set_cached_response("get_prds", self.large, ttl=60)
+        self.assertEqual(ClientAPICache.objects.get().encoding, "")
+
+        call_command('compress_wb_cache', stdout=io.StringIO())
+
+        row = ClientAPICache.objects.get()
+        self.assertEqual(row.encoding, "gzip")
+        self.assertEqual(ClientAPICache.get_cached_response("get_prds")["data"], self.large.data)
+
+
+
+def make_product(prd_id, category_id=1, price=100.0, updated_at="2025-01-02T00:00:00Z"):
+    return {
+        "productId": str(prd_id),
+        "name": f"Product {prd_id}",
+        "prices": [{"price": price, "discount": 10}],
+        "stocks": [{"warehouseId": 1, "amount": 5}],
+        "categoryId": category_id,
+        "createdAt": "2025-01-01T00:00:00Z",
+        "updatedAt": updated_at,
+    }
+
+
+def make_order(order_id, status="new", created_at="2025-01-01T00:00:00Z", updated_at=None, items=1):
+    return {
+        "orderId": str(order_id),
+        "status": status,
+        "items": [
+            {"itemId": f"{order_id}-{i}", "productId": str(i), "quantity": 1, "price": 100.0}
+            for i in range(items)
+        ],
+        "customer": {"name": "Иван"},
+        "delivery": {"address": "ул. Ленина, 1", "city": "Москва"},
+        "createdAt": created_at,
+        "updatedAt": updated_at or created_at,
+        "totalAmount": 100.0 * items,
+    }
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        self.client = WBProductsClient(token="test_key")
+        self.products = [make_product(i) for i in range(7)]
+
+    def fake_request(self, method, endpoint, params=None):
+        offset, limit = params["offset"], params["limit"]
+        return WBResponse(success=True, data={
+            "items": self.products[offset:offset + limit], "total": len(self.products),
+            "limit": limit, "offset": offset,
+        })
+
+    def test_iter_prds_walks_all_pages(self):
+        for prefetch in (True, False):
+            with patch.object(WBProductsClient, '_request', side_effect=self.fake_request) as mock_request:
+                products = list(self.client.iter_prds({"status": "active", "limit": 2}, page_size=3, prefetch=prefetch))
+
+            self.assertEqual([p.product_id for p in products], [str(i) for i in range(7)])
+            self.assertEqual(mock_request.call_count, 3)
+            self.assertEqual(mock_request.call_args.kwargs["params"], {"status": "active", "limit": 3, "offset": 6})
+
+    def test_iter_prds_continues_when_server_caps_limit(self):
+        self.products = [make_product(i) for i in range(250)]
+
+        def capped_request(method, endpoint, params=None):
+            return self.fake_request(method, endpoint, {**params, "limit": min(params["limit"], 100)})
+
+        with patch.object(WBProductsClient, '_request', side_effect=capped_request) as mock_request:
+            products = list(self.client.iter_prds(page_size=1000, prefetch=False))
+
+        self.assertEqual(len(products), 250)
+        self.assertEqual(mock_request.call_count, 3)
+
+    def test_iter_orders_raises_on_failed_page(self):
+        client = WBOrdersClient(token="test_key")
+        with patch.object(WBOrdersClient, '_request', return_value=WBResponse(success=False, error="Bad Gateway", status_code=502)):
+            with self.assertRaises(WBAPIError) as ctx:
+                list(client.iter_orders(page_size=10))
+        self.assertEqual(ctx.exception.status_code, 502)
+
+
+class ProductSyncTests(TestCase):
+    def setUp(self):
+        self.client = WBProductsClient(token="test_key")
+        self.products = [make_product(i, updated_at=f"2025-01-0{i + 1}T00:00:00Z") for i in range(3)]
+
+    def fake_request(self, method, endpoint, params=None, **kwargs):
+        items = self.products
+        if "dateFrom" in params:
+            items = [p for p in items if p["updatedAt"].replace("Z", "+00:00") >= params["dateFrom"]]
+        page = items[params["offset"]:params["offset"] + params["limit"]]
+        return WBResponse(success=True, data={"items": page, "total": len(items)})
+
+    def sync(self, **kwargs):
+        with patch.object(WBProductsClient, '_request', side_effect=self.fake_request) as mock_request:
+            result = ProductSyncEngine(self.client, batch_size=2, page_size=2).run(**kwargs)
+        return result, mock_request
+
+    def test_sync_writes_products_and_watermark(self):
+        result, _ = self.sync()
+
+        self.assertEqual((result.fetched, result.written), (3, 3))
+        product = WBProduct.objects.get(product_id="1")
+        self.assertEqual((product.price, product.discount, product.total_stock, product.category), (100, 10, 5, "1"))
+        self.assertEqual(product.data["productId"], "1")
+        state = WBSyncState.objects.get(kind="products")
+        self.assertEqual(state.watermark.isoformat(), "2025-01-03T00:00:00+00:00")
+
+    def test_incremental_sync_writes_only_changed_rows(self):
+        self.sync()
+        self.products[2]["prices"][0]["price"] = 150.0
+        self.products[2]["stocks"][0]["amount"] = 1
+
+        result, mock_request = self.sync()
+
+        self.assertEqual(mock_request.call_args.kwargs["params"]["dateFrom"], "2025-01-03T00:00:00+00:00")
+        self.assertEqual((result.fetched, result.written), (1, 1))
+        product = WBProduct.objects.get(product_id="2")
+        self.assertEqual((product.price, product.total_stock), (150, 1))
+
+        result, _ = self.sync()
+        self.assertEqual(result.written, 0)
+
+    def test_naive_updated_at_treated_as_utc(self):
+        self.products = [make_product(i, updated_at=f"2025-01-0{i + 1}T00:00:00") for i in range(3)]
+        self.sync()
+        result, _ = self.sync(full=True)
+
+        self.assertEqual(result.watermark.isoformat(), "2025-01-03T00:00:00+00:00")
+        self.assertEqual(WBProduct.objects.get(product_id="2").source_updated_at.isoformat(), "2025-01-03T00:00:00+00:00")
+        self.assertEqual((result.fetched, result.written), (3, 0))
+
+    def test_failed_sync_keeps_watermark(self):
+        self.sync()
+        with patch.object(WBProductsClient, '_request', return_value=WBResponse(success=False, error="Bad Gateway", status_code=502)):
+            with self.assertRaises(WBAPIError):
+                ProductSyncEngine(self.client).run(full=True)
+
+        state = WBSyncState.objects.get(kind="products")
+        self.assertEqual(state.watermark.isoformat(), "2025-01-03T00:00:00+00:00")
+
+
+class OrderSyncTests(TestCase):
+    def setUp(self):
+        self.client = WBOrdersClient(token="test_key")
+        self.orders = [make_order(i, created_at=f"2025-01-0{i + 1}T00:00:00Z", items=2) for i in range(3)]
+
+    def sync(self, orders):
+        response = WBResponse(success=True, data={"orders": orders, "total": len(orders)})
+        with patch.object(WBOrdersClient, '_request', return_value=response) as mock_request:
+            result = OrderSyncEngine(self.client).run()
+        return result, mock_request
+
+    def test_sync_stores_orders_with_items(self):
+        result, mock_request = self.sync(self.orders)
+
+        self.assertEqual((result.fetched, result.written), (3, 3))
+        self.assertNotIn("dateFrom", mock_request.call_args.kwargs["params"])
+        self.assertEqual(WBOrderItem.objects.count(), 6)
+        order = WBOrder.objects.get(order_id="2")
+        self.assertEqual((order.city, order.total_amount), ("Москва", 200))
+        self.assertEqual(WBSyncState.objects.get(kind="orders").watermark.isoformat(), "2025-01-03T00:00:00+00:00")
+
+    def test_resync_of_naive_dates_writes_nothing(self):
+        orders = [make_order(i, created_at=f"2025-01-0{i + 1}T00:00:00") for i in range(3)]
+        self.sync(orders)
+
+        result, _ = self.sync(orders)
+        self.assertEqual((result.fetched, result.written), (3, 0))
+
+    def test_poll_moves_only_delta(self):
+        self.sync(self.orders)
+        updated = make_order(0, status="delivered", updated_at="2025-01-05T00:00:00Z", items=1)
+
+        result, mock_request = self.sync([self.orders[2], updated])
+
+        self.assertEqual(mock_request.call_args.kwargs["params"]["dateFrom"], "2025-01-03T00:00:00+00:00")
+        self.assertEqual((result.fetched, result.written), (2, 1))
+        order = WBOrder.objects.get(order_id="0")
+        self.assertEqual(order.status, "delivered")
+        self.assertEqual(list(order.items.values_list("item_id", flat=True)), ["0-0"])
+        self.assertEqual(WBOrder.objects.count(), 3)
+
+
+class OrderBackfillTests(TestCase):
+    def setUp(self):
+        self.date_from = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        self.date_to = datetime(2025, 1, 10, tzinfo=dt_timezone.utc)
+
+    def fake_request(self, method, endpoint, params=None, **kwargs):
+        if params["dateFrom"].startswith("2025-01-03") and self.fail_window:
+            return WBResponse(success=False, error="Bad Gateway", status_code=502)
+        day = params["dateFrom"][:10]
+        # Заказ "edge" попадает в каждое окно - должен быть записан один раз
+        orders = [make_order(f"order-{day}", created_at=f"{day}T00:00:00Z"), make_order("edge")]
+        return WBResponse(success=True, data={"orders": orders, "total": len(orders)})
+
+    def backfill(self):
+        with patch.object(WBOrdersClient, '_request', side_effect=self.fake_request) as mock_request:
+            result = backfill_orders(self.date_from, self.date_to, token="test_key",
+                                     window=timedelta(days=3), workers=3)
+        return result, mock_request
+
+    def test_split_windows(self):
+        windows = split_windows(self.date_from, self.date_to, timedelta(days=4))
+        # Границы - кратные 4 дням от начала эпохи (31.12, 04.01, 08.01...)
+        self.assertEqual([(a.day, b.day) for a, b in windows], [(1, 4), (4, 8), (8, 10)])
+        # Сдвиг концов периода не меняет полные окна
+        shifted = split_windows(self.date_from + timedelta(days=1), self.date_to + timedelta(days=5), timedelta(days=4))
+        self.assertIn(windows[1], shifted)
+
+    def test_backfill_dedupes_and_resumes_after_failure(self):
+        self.fail_window = True
+        result, _ = self.backfill()
+
+        self.assertEqual((result.windows, len(result.failed)), (4, 1))
+        self.assertEqual(WBBackfillWindow.objects.count(), 3)
+        self.assertEqual(WBOrder.objects.filter(order_id="edge").count(), 1)
+
+        self.fail_window = False
+        result, mock_request = self.backfill()
+
+        self.assertEqual((result.skipped, result.failed), (3, []))
+        self.assertEqual(mock_request.call_count, 1)
+        self.assertEqual(WBOrder.objects.count(), 5)
+
+
+class APIStatsTests(TestCase):
+    def test_normalize_endpoint(self):
+        self.assertEqual(normalize_endpoint("/swagger/products/123/commission"), "/swagger/products/{id}/commission")
+        self.assertEqual(normalize_endpoint("/api/v1/orders?limit=10"), "/api/v1/orders")
+
+    def test_request_is_buffered_without_db_writes(self):
+        client = WBClientBase(token="test_key")
+        http_response = MagicMock(status_code=200, content=b"{}")
+        http_response.content = json.dumps({}).encode()
+        with patch.object(client.session, 'request', return_value=http_response):
+            with self.assertNumQueries(0):
+                client._request("GET", "/swagger/products/42")
+                client._request("GET", "/swagger/products/43")
+
+        stats = api_stats.pending()[("/swagger/products/{id}", 200)]
+        self.assertEqual((stats.count, stats.success), (2, 2))
+        self.assertEqual(sum(stats.buckets.values()), 2)
+
+    def test_flush_increments_existing_rows(self):
+        aggregator = StatsAggregator(flush_interval=0)
+        for _ in range(2):
+            aggregator.record("/v1/categories", 200, True, 0.07)
+            aggregator.record("/v1/categories", 502, False, 3.0)
+            self.assertEqual(aggregator.flush(), 2)
+
+        ok = WBAPIStats.objects.get(endpoint="/v1/categories", status_code=200)
+        self.assertEqual((ok.request_count, ok.success_count), (2, 2))
+        self.assertAlmostEqual(ok.avg_response_time, 0.07)
+        self.assertEqual(WBAPILatencyBucket.objects.get(endpoint="/v1/categories", status_code=502, le="5").count, 2)
+        self.assertEqual(aggregator.pending(), {})
+
+    def test_worker_threads_do_not_flush(self):
+        aggregator = StatsAggregator(flush_interval=0)
+        aggregator.record("/v1/categories", 200, True, 0.07)
+        with patch.object(aggregator, 'flush') as flush:
+            with ThreadPoolExecutor(max_workers=1, initializer=mark_worker_thread) as pool:
+                pool.submit(aggregator.maybe_flush).result()
+            flush.assert_not_called()
+            aggregator.maybe_flush()
+            flush.assert_called_once()
+
+    def test_record_request_delegates_to_aggregator(self):
+        WBAPIStats.record_request("/v1/categories", success=False, response_time=0.2)
+        self.assertEqual(WBAPIStats.objects.count(), 0)
+        self.assertEqual(api_stats.pending()[("/v1/categories", 0)].count, 1)
+
+
+class RateLimiterTests(TestCase):
+    def make_limiter(self, store=None):
+        group = RateLimitGroup("products", rate=10, burst=2, prefixes=["/swagger/products"])
+        return RateLimiter(store or LocalRateLimitStore(), [group], RateLimitGroup("default", rate=100, burst=100))
+
+    def test_bucket_allows_burst_then_spaces_requests(self):
+        limiter = self.make_limiter()
+        delays = [limiter.reserve("seller", "/swagger/products/1") for _ in range(4)]
+
+        self.assertEqual(delays[:2], [0.0, 0.0])
+        self.assertAlmostEqual(delays[2], 0.1, places=2)
+        self.assertAlmostEqual(delays[3], 0.2, places=2)
+        # Другая группа и другой продавец считаются отдельно
+        self.assertEqual(limiter.reserve("seller", "/v1/categories"), 0.0)
+        self.assertEqual(limiter.reserve("other", "/swagger/products"), 0.0)
+
+    def test_retry_after_blocks_group(self):
+        limiter = self.make_limiter()
+        limiter.penalize("seller", "/swagger/products", retry_after=5)
+        self.assertAlmostEqual(limiter.reserve("seller", "/swagger/products"), 5, places=1)
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertIsNone(parse_retry_after(None))
+
+    @skipUnless(fakeredis, "fakeredis не установлен")
+    def test_redis_store_shares_buckets(self):
+        server = fakeredis.FakeServer()
+        first = self.make_limiter(RedisRateLimitStore(client=fakeredis.FakeRedis(server=server)))
+        second = self.make_limiter(RedisRateLimitStore(client=fakeredis.FakeRedis(server=server)))
+
+        self.assertEqual(first.reserve("seller", "/swagger/products"), 0.0)
+        self.assertEqual(second.reserve("seller", "/swagger/products"), 0.0)
+        self.assertGreater(first.reserve("seller", "/swagger/products"), 0.05)
+
+    def test_request_retries_after_429(self):
+        client = WBClientBase(token="test_key")
+        throttled = MagicMock(status_code=429, text="Too Many Requests", headers={"Retry-After": "0"})
+        ok = MagicMock(status_code=200, content=b"{}")
+        ok.content = json.dumps({"ok": True}).encode()
+        with patch.object(client.session, 'request', side_effect=[throttled, ok]) as mock_request:
+            response = client._request("GET", "/swagger/products")
+
+        self.assertTrue(response.success)
+        self.assertEqual(mock_request.call_count, 2)
+
+
+class ResilienceTests(TestCase):
+    def setUp(self):
+        self.resilience = Resilience(retries=2, backoff_base=0, breaker_failures=2, breaker_recovery=60)
+
+    def test_retries_transient_errors_for_idempotent_methods(self):
+        send = MagicMock(side_effect=[
+            WBResponse(success=False, error="Bad Gateway", status_code=502),
+            WBResponse(success=True, data={"ok": True}),
+        ])
+        self.assertTrue(self.resilience.call("GET", "/v1/categories", send).success)
+        self.assertEqual(send.call_count, 2)
+
+        send = MagicMock(return_value=WBResponse(success=False, error="Bad Gateway", status_code=502))
+        self.assertFalse(self.resilience.call("PATCH", "/swagger/products/1", send).success)
+        self.assertEqual(send.call_count, 1)
+
+        send = MagicMock(return_value=WBResponse(success=False, error="Not Found", status_code=404))
+        self.resilience.call("GET", "/swagger/products/1", send)
+        self.assertEqual(send.call_count, 1)
+
+    def test_breaker_opens_and_recovers(self):
+        failing = MagicMock(return_value=WBResponse(success=False, error="Unavailable", status_code=503))
+        for _ in range(2):
+            self.resilience.call("GET", "/swagger/products/1", failing)
+        self.assertEqual(failing.call_count, 6)
+
+        response = self.resilience.call("GET", "/swagger/products/2", failing)
+        self.assertTrue(response.error.startswith("Circuit open"))
+        self.assertEqual(failing.call_count, 6)
+
+        breaker = self.resilience.breaker("/swagger/products/1")
+        breaker.opened_at -= 60
+        ok = MagicMock(return_value=WBResponse(success=True))
+        self.assertTrue(self.resilience.call("GET", "/swagger/products/1", ok).success)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_hedged_get_returns_first_success(self):
+        resilience = Resilience(retries=0, hedge_after=0.01)
+        calls = []
+
+        def send():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.3)
+                return WBResponse(success=True, data="slow")
+            return WBResponse(success=True, data="fast")
+
+        self.assertEqual(resilience.call("GET", "/v1/categories", send).data, "fast")
+        self.assertEqual(len(calls), 2)
+
+    @patch.object(WBProductsClient, '_request')
+    def test_cached_response_served_while_upstream_fails(self, mock_request):
+        client = WBProductsClient(token="test_key")
+        ClientAPICache.objects.create(
+            endpoint=f"{seller_key('test_key')}|get_prd:('1',):{{}}:",
+            response={"success": True, "data": {"productId": "1"}, "error": None, "status_code": 200},
+            expires_at=timezone.now() - timedelta(seconds=10),
+            stale_until=timezone.now() + timedelta(hours=1),
+        )
+        mock_request.return_value = WBResponse(success=False, error="Circuit open", status_code=503)
+
+        response = client.get_prd("1")
+
+        self.assertTrue(response.success)
+        self.assertEqual(response.data, {"productId": "1"})
+        mock_request.assert_called_once()
+
+
+class SessionRegistryTests(TestCase):
+    def test_clients_share_session_per_base_url(self):
+        first, second = WBProductsClient(token="seller_a"), WBOrdersClient(token="seller_b")
+
+        self.assertIs(first.session, second.session)
+        self.assertNotIn("Authorization", first.session.headers)
+        self.assertIn("gzip", first.session.headers["Accept-Encoding"])
+
+    def test_authorization_sent_per_request(self):
+        first, second = WBClientBase(token="seller_a"), WBClientBase(token="seller_a")
+        ok = MagicMock(status_code=200, content=b"{}")
+        ok.content = json.dumps({}).encode()
+        with patch.object(first.session, 'request', return_value=ok) as mock_request:
+            first.check_creds("seller_b")
+            second._request("GET", "/v1/categories")
+
+        auth = [call.kwargs["headers"]["Authorization"] for call in mock_request.call_args_list]
+        self.assertEqual(auth, ["Bearer seller_b", "Bearer seller_a"])
+        self.assertEqual(first.token, "seller_a")
+
+    def test_tenants_do_not_share_cookies(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                received.append((self.headers["Authorization"], self.headers.get("Cookie")))
+                self.send_response(200)
+                self.send_header("Set-Cookie", f"session={self.headers['Authorization'][-1]}; Path=/")
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+        session = SessionRegistry().get(base_url)
+        for token in ("seller_a", "seller_b"):
+            session.get(f"{base_url}/v1/auth/test", headers={"Authorization": f"Bearer {token}"})
+
+        self.assertEqual(received, [("Bearer seller_a", None), ("Bearer seller_b", None)])
+        self.assertEqual(len(session.cookies), 0)
+
+        async_client = build_async_http_client()
+        request = httpx.Request("GET", "https://api.test/v1/auth/test")
+        async_client.cookies.extract_cookies(httpx.Response(200, headers={"Set-Cookie": "session=a; Path=/"}, request=request))
+        self.assertEqual(len(async_client.cookies), 0)
+        async_to_sync(async_client.aclose)()
+
+    def test_pool_size_and_eviction(self):
+        registry = SessionRegistry(pool_maxsize=7, max_sessions=2)
+        first = registry.get("https://a.test")
+        registry.get("https://b.test")
+        registry.get("https://c.test")
+
+        self.assertEqual(len(registry), 2)
+        self.assertIsNot(registry.get("https://a.test"), first)
+        self.assertEqual(first.get_adapter("https://a.test")._pool_maxsize, 7)
+        registry.close_all()
+        self.assertEqual(len(registry), 0)
+
+
+class ClientPoolTests(TestCase):
+    def test_pool_reuses_clients_per_seller(self):
+        pool = ClientPool(max_clients=2)
+        client = pool.get(WBProductsClient, "seller_a")
+
+        self.assertIs(pool.get(WBProductsClient, "seller_a"), client)
+        self.assertIsNot(pool.get(WBProductsClient, "seller_b"), client)
+        self.assertEqual(client.tenant, seller_tag("seller_a").split(":")[1])
+        pool.get(WBOrdersClient, "seller_a")
+        self.assertEqual(len(pool), 2)
+
+    def test_tenants_do_not_share_cache(self):
+        pool = ClientPool()
+        first, second = pool.get(WBProductsClient, "seller_a"), pool.get(WBProductsClient, "seller_b")
+        responses = {
+            "seller_a": WBResponse(success=True, data={"items": [make_product("a")], "total": 1}),
+            "seller_b": WBResponse(success=True, data={"items": [make_product("b")], "total": 1}),
+        }
+
+        def fake_request(client, method, endpoint, **kwargs):
+            return responses[client.token]
+
+        with patch.object(WBProductsClient, '_request', autospec=True, side_effect=fake_request) as mock_request:
+            self.assertEqual(first.get_prds().data["items"][0]["productId"], "a")
+            self.assertEqual(second.get_prds().data["items"][0]["productId"], "b")
+            self.assertEqual(first.get_prds().data["items"][0]["productId"], "a")
+        self.assertEqual(mock_request.call_count, 2)
+
+        self.assertTrue(ClientAPICache.objects.filter(endpoint__startswith=f"{first.tenant}|get_prds:").exists())
+        self.assertFalse(ClientAPICache.objects.filter(endpoint__startswith="get_prds:").exists())
+
+    def test_clients_without_tenant_do_not_share_cache(self):
+        first, second = WBProductsClient(token="seller_a"), WBProductsClient(token="seller_b")
+        responses = {
+            "seller_a": WBResponse(success=True, data={"items": [make_product("a")], "total": 1}),
+            "seller_b": WBResponse(success=True, data={"items": [make_product("b")], "total": 1}),
+        }
+
+        def fake_request(client, method, endpoint, **kwargs):
+            return responses[client.token]
+
+        with patch.object(WBProductsClient, '_request', autospec=True, side_effect=fake_request) as mock_request:
+            self.assertEqual(first.get_prds().data["items"][0]["productId"], "a")
+            self.assertEqual(second.get_prds().data["items"][0]["productId"], "b")
+        self.assertEqual(mock_request.call_count, 2)
+        self.assertEqual(cache_namespace(first), seller_key("seller_a"))
+
+
+class ValidationTests(TestCase):
+    def test_strict_rejects_invalid_payload(self):
+        response = WBResponse(success=True, data={"items": [{"name": "no id"}], "total": 1}, status_code=200)
+        result = validated_response(response, ProductListSchema)
+
+        self.assertFalse(result.success)
+        self.assertEqual(result.status_code, 500)
+        self.assertIn("Validation error", result.error)
+
+    def test_trusted_builds_nested_models_without_validation(self):
+        product = parse(ProductSchema, make_product(1), TRUSTED)
+
+        self.assertEqual(product.product_id, "1")
+        self.assertEqual(product.stocks[0].warehouse_id, 1)
+        # Значения не приводятся к типам полей
+        self.assertEqual(product.created_at, "2025-01-01T00:00:00Z")
+
+    def test_lazy_validates_items_on_access(self):
+        data = {"items": [make_product(1), {"name": "broken"}], "total": 2}
+        result = parse(ProductListSchema, data, LAZY)
+
+        self.assertIsInstance(result.items, LazyItems)
+        self.assertEqual(result.total, 2)
+        self.assertEqual(result.items[0].product_id, "1")
+        with self.assertRaises(ValidationError):
+            result.items[1]
+
+    def test_response_items_validated_in_every_mode(self):
+        data = {"items": [make_product(1), {"name": "broken"}], "total": 2}
+        for mode in (LAZY, TRUSTED):
+            with self.settings(WB_VALIDATION_MODE=mode):
+                result = validated_response(WBResponse(success=True, data=data, status_code=200), ProductListSchema)
+                self.assertFalse(result.success)
+                self.assertIsInstance(rehydrate(ProductListSchema, {"items": [make_product(1)], "total": 1}).items,
+                                      LazyItems if mode == LAZY else list)
+
+
+class CodecTests(TestCase):
+    def test_codecs_build_identical_cache_keys(self):
+        params = {"b": [1, 2], "a": "Товар", "c": None}
+        keys = {codec.StdlibCodec().dumps(params, sort_keys=True)}
+        if codec.orjson is not None:
+            keys.add(codec.OrjsonCodec().dumps(params, sort_keys=True))
+        self.assertEqual(keys, {'{"a":"Товар","b":[1,2],"c":null}'.encode()})
+
+    def test_codecs_serialize_dates_identically(self):
+        params = {"from": datetime(2025, 1, 1, tzinfo=dt_timezone.utc), "day": datetime(2025, 1, 2).date()}
+        codecs = [codec.StdlibCodec()] + ([codec.OrjsonCodec()] if codec.orjson is not None else [])
+        for name in [c.name for c in codecs]:
+            with override_settings(WB_JSON_CODEC=name):
+                self.assertEqual(codec.canonical(params), '{"day":"2025-01-02","from":"2025-01-01T00:00:00+00:00"}')
+                self.assertEqual(codec.dumps_str(params, default=codec.django_default),
+                                 '{"from":"2025-01-01T00:00:00Z","day":"2025-01-02"}')
+
+    @override_settings(WB_JSON_CODEC='json')
+    def test_codec_setting_and_bytes_decode(self):
+        self.assertIsInstance(codec.get_codec(), codec.StdlibCodec)
+        self.assertEqual(codec.loads('{"items":[1]}'.encode()), {"items": [1]})
+        with self.assertRaises(codec.JSONDecodeError):
+            codec.loads(b"not json")
+
+    def test_json_field_writes_through_codec(self):
+        data = {"at": datetime(2025, 1, 1, 12, 30, tzinfo=dt_timezone.utc), "price": Decimal("99.90"), "name": "Товар"}
+        with patch.object(codec, "dumps_str", wraps=codec.dumps_str) as dumps_str:
+            WBProduct.objects.create(product_id="1", name="Товар", price=1, data=data)
+        dumps_str.assert_called()
+
+        product = WBProduct.objects.get(product_id="1")
+        self.assertEqual(product.data, {"at": "2025-01-01T12:30:00Z", "price": "99.90", "name": "Товар"})
+        self.assertTrue(WBProduct.objects.filter(data__price="99.90").exists())
+
+    def test_cached_payload_roundtrip(self):
+        data = {"items": [make_product(1)], "total": 1}
+        ClientAPICache.set_cached_response("get_prds", WBResponse(success=True, data=data), params={"limit": 1})
+
+        entry = ClientAPICache.get_cached_entry("get_prds", params={"limit": 1})
+        self.assertEqual(entry.payload["data"], data)
+
+
+def chunked(data, size):
+    body = json.dumps(data, ensure_ascii=False).encode()
+    return (body[i:i + size] for i in range(0, len(body), size))
+
+
+class StreamingTests(TestCase):
+    def test_items_parsed_across_chunk_boundaries(self):
+        data = {"limit": 3, "items": [make_product(i) for i in range(3)] + [{"name": "ка\"вычки}]"}], "total": 4}
+        for size in (1, 7, 4096):
+            stream = JSONStream(chunked(data, size))
+            self.assertEqual(list(stream.items()), data["items"])
+            self.assertEqual(stream.envelope, {"limit": 3, "total": 4})
+            self.assertEqual(stream.count, 4)
+
+    def test_truncated_body_raises(self):
+        body = json.dumps({"items": [make_product(1), make_product(2)]}).encode()[:-30]
+        with self.assertRaises(WBValidationError):
+            list(JSONStream([body]).items())
+
+    @patch('requests.Session.request')
+    def test_iter_prds_streams_pages(self, mock_request):
+        products = [make_product(i) for i in range(5)]
+
+        def respond(method, url, params=None, stream=False, **kwargs):
+            page = {"items": products[params["offset"]:params["offset"] + params["limit"]], "total": len(products)}
+            response = MagicMock(status_code=200)
+            response.iter_content.return_value = chunked(page, 16)
+            self.assertTrue(stream)
+            return response
+
+        mock_request.side_effect = respond
+        client = WBProductsClient(token="test_key")
+        result = list(client.iter_prds(page_size=2, stream=True))
+
+        self.assertEqual([p.product_id for p in result], [str(i) for i in range(5)])
+        self.assertEqual(mock_request.call_count, 3)
+
+
+class ProductColumnsTests(TestCase):
+    def setUp(self):
+        self.products = [make_product(i, category_id=i % 2, price=100.0 + i) for i in range(4)]
+        self.products[3]["stocks"] = [{"warehouseId": 1, "amount": 2}, {"warehouseId": 7, "amount": 3}]
+        self.products[2]["stocks"] = []
+
+    def check_aggregates(self, columns):
+        self.assertEqual(len(columns), 4)
+        self.assertEqual(columns.total_stock_sum(), 15)
+        self.assertEqual(columns.stock_by_warehouse(), {1: 12, 7: 3})
+        self.assertEqual(columns.avg_price_by_category(), {0: 101.0, 1: 102.0})
+        self.assertEqual(columns.stock_by_category(), {0: 5, 1: 10})
+        self.assertEqual(list(columns.select(category_id=1, in_stock=True)), [1, 3])
+        self.assertEqual(columns.filter(min_price=102, max_price=102).row(0)["stocks"], {})
+
+    def test_from_response_data(self):
+        columns = ProductColumns.from_data({"items": self.products, "total": 4})
+
+        self.check_aggregates(columns)
+        self.assertEqual(columns.row(3)["stocks"], {1: 2, 7: 3})
+        with patch.object(analytics, 'numpy', None):
+            self.check_aggregates(columns)
+
+    def test_from_queryset(self):
+        self.client = WBProductsClient(token="test_key")
+        response = WBResponse(success=True, data={"items": self.products, "total": 4})
+        with patch.object(WBProductsClient, '_request', return_value=response):
+            ProductSyncEngine(self.client).run()
+
+        columns = ProductColumns.from_queryset(WBProduct.objects.order_by("product_id"))
+        self.check_aggregates(columns)
+        self.assertLess(columns.memory_usage(), len(json.dumps(self.products)) * 2)
+
+    def test_numpy_matches_fallback(self):
+        numpy = pytest.importorskip("numpy")
+        columns = ProductColumns()
+        for i in range(200):
+            stocks = [(w, (i * w) % 5) for w in range(i % 4)]
+            category = (3, 5, -1, 8)[i % 4]
+            columns.append(str(i), f"Product {i}", 50.0 + (i * 37) % 300 / 4, 0.0, category, f"brand{i % 3}", stocks)
+
+        self.assertTrue(numpy.shares_memory(columns.column("price"), numpy.frombuffer(columns.price)))
+        queries = [
+            {}, {"category_id": 3}, {"category_id": -1, "in_stock": False}, {"min_price": 80, "max_price": 100.25},
+            {"in_stock": True, "brand": "brand1"}, {"brand": "missing"},
+        ]
+
+        def results():
+            return (
+                [list(map(int, columns.select(**query))) for query in queries],
+                columns.total_stock_sum(), columns.stock_by_warehouse(), columns.stock_by_category(),
+                columns.avg_price_by_category(),
+            )
+
+        vectorized = results()
+        with patch.object(analytics, "numpy", None):
+            fallback = results()
+
+        self.assertEqual(vectorized[:4], fallback[:4])
+        self.assertEqual(vectorized[4].keys(), fallback[4].keys())
+        for key, value in vectorized[4].items():
+            self.assertAlmostEqual(value, fallback[4][key])
+
+
+class FragmentViewTests(TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def handler(request):
+            self.calls.append(request.url.path)
+            if request.url.path == "/swagger/products":
+                return httpx.Response(200, json={"items": [make_product(1)], "total": 1})
+            if request.url.path == "/api/v1/orders":
+                return httpx.Response(200, json={"orders": [make_order(7)]})
+            return httpx.Response(200, json={"items": [{"id": 3, "name": "Обувь"}], "total": 1})
+
+        patcher = patch('wb_api.client.aio.build_async_http_client', side_effect=lambda: mock_http_client(handler))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(WB_API_TOKEN="seller_a")
+    def test_overview_gathers_sections_and_reuses_fragments(self):
+        response = self.client.get("/overview/")
+        self.assertContains(response, "Product 1")
+        self.assertContains(response, "Заказ #7")
+        self.assertContains(response, "Обувь")
+        self.assertEqual(sorted(self.calls), ["/api/v1/orders", "/swagger/products", "/v1/categories"])
+
+        with patch('wb_api.fragments.render_to_string') as mock_render:
+            response = self.client.get("/overview/")
+        self.assertContains(response, "Product 1")
+        mock_render.assert_not_called()
+        self.assertEqual(len(self.calls), 3)
+
+        # Новая запись кэша - новая версия фрагмента
+        invalidate_tags(seller_tag("seller_a"))
+        self.client.get("/async/dashboard/")
+        self.assertEqual(self.calls[-1], "/swagger/products")
+        self.assertEqual(len(self.calls), 4)
+
+    def test_sellers_rendered_separately_over_shared_client(self):
+        async def render_for_sellers():
+            await render_sections(["products"], "seller_a")
+            http = get_async_http_client()
+            await render_sections(["products"], "seller_b")
+            return http, get_async_http_client()
+
+        first, second = async_to_sync(render_for_sellers)()
+        self.assertIs(first, second)
+        self.assertEqual(self.calls, ["/swagger/products", "/swagger/products"])
+
+
+class ProductListingTests(TestCase):
+    def setUp(self):
+        WBProduct.objects.bulk_create([
+            WBProduct(product_id=str(i), name=f"Product {i}", price=[300, 100, 200, 100, 250][i],
+                      total_stock=i % 2, category="5" if i < 3 else "6")
+            for i in range(5)
+        ])
+
+    def walk(self, **params):
+        pages, cursor = [], None
+        while True:
+            response = self.client.get("/api/products/", {**params, **({"cursor": cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.content)
+            pages.append([item["product_id"] for item in data["items"]])
+            cursor = data["next_cursor"]
+            if not cursor:
+                return pages
+
+    def test_keyset_pages_follow_sort_with_ties(self):
+        self.assertEqual(self.walk(sort="price", limit=2), [["1", "3"], ["2", "4"], ["0"]])
+        self.assertEqual(self.walk(sort="-price", limit=2), [["0", "4"], ["2", "3"], ["1"]])
+
+    def test_cursor_is_row_comparison(self):
+        cursor = json.loads(self.client.get("/api/products/", {"sort": "price", "limit": 2}).content)["next_cursor"]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/products/", {"sort": "price", "limit": 2, "cursor": cursor})
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertRegex(sql, r'\("wb_api_wbproduct"\."price", "wb_api_wbproduct"\."id"\) > \(')
+        self.assertNotIn(" OR ", sql)
+
+    def test_filters(self):
+        self.assertEqual(self.walk(category="5", in_stock="1"), [["1"]])
+        self.assertEqual(self.walk(min_price="150", max_price="250", sort="-price"), [["4", "2"]])
+
+    def test_invalid_params(self):
+        for params in ({"sort": "name"}, {"limit": "1000"}, {"limit": "0"}, {"limit": "-5"}, {"cursor": "garbage"}, {"min_price": "abc"}):
+            response = self.client.get("/api/products/", params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", json.loads(response.content))
+
+
+def category_tree():
+    return {"items": [
+        {"id": 1, "name": "Одежда", "children": [
+            {"id": 10, "name": "Платья", "children": [{"id": 100, "name": "Вечерние"}]},
+            {"id": 2, "name": "Брюки"},
+        ]},
+        {"id": 5, "name": "Обувь", "children": []},
+    ], "total": 2}
+
+
+class CategoryTreeTests(TestCase):
+    def test_index_queries(self):
+        index = CategoryIndex(flatten(category_tree()))
+
+        self.assertEqual(index.parent(100).id, 10)
+        self.assertEqual([n.id for n in index.ancestors(100)], [1, 10])
+        self.assertEqual((index.root(100).id, index.depth(100)), (1, 2))
+        self.assertEqual(sorted(index.subtree_ids(1)), [1, 2, 10, 100])
+        self.assertEqual(index.subtree_ids(5), [5])
+        self.assertTrue(index.is_descendant(100, 1))
+        self.assertFalse(index.is_descendant(2, 10))
+        self.assertEqual([n.id for n in index.children_of(1)], [10, 2])
+
+    def test_sync_writes_only_changes_and_reloads_index(self):
+        self.assertEqual(sync_category_tree(category_tree()).created, 5)
+        self.assertEqual(WBCategoryNode.objects.get(category_id=100).path, "/1/10/100/")
+        self.assertEqual(len(get_category_index()), 5)
+
+        tree = category_tree()
+        tree["items"][0]["children"][1]["name"] = "Джинсы"
+        del tree["items"][1]
+        result = sync_category_tree(tree)
+
+        self.assertEqual((result.created, result.updated, result.deleted), (0, 1, 1))
+        self.assertNotIn(5, get_category_index())
+        self.assertEqual(get_category_index().get(2).name, "Джинсы")
+        self.assertFalse(sync_category_tree(tree).changed)
+
+    def test_index_reloads_after_write_from_another_process(self):
+        sync_category_tree(category_tree())
+        self.assertEqual(get_category_index().get(2).name, "Брюки")
+
+        # Запись другого процесса: локальный индекс не сбрасывается, меняется только БД
+        WBCategoryNode.objects.filter(category_id=2).update(
+            name="Джинсы", updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(get_category_index().get(2).name, "Брюки")
+
+        later = time.monotonic() + settings.WB_CATEGORY_INDEX_CHECK_INTERVAL
+        with patch("wb_api.category_tree.time.monotonic", return_value=later):
+            self.assertEqual(get_category_index().get(2).name, "Джинсы")
+        WBCategoryNode.objects.filter(category_id=5).delete()
+        with patch("wb_api.category_tree.time.monotonic", return_value=later * 2):
+            self.assertNotIn(5, get_category_index())
+
+    def test_process_local_django_cache_reported(self):
+        self.assertEqual(shared_cache_check(None), [])
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual([warning.id for warning in shared_cache_check(None)], ["wb_api.W001"])
+
+    def test_get_categories_refresh_updates_tree(self):
+        client = WBCategoriesClient(token="test_key")
+        response = WBResponse(success=True, data=category_tree())
+        with patch.object(WBCategoriesClient, '_request', return_value=response) as mock_request:
+            client.get_categories()
+            client.get_categories()
+            client.get_categories({"parent_id": 1})
+
+        self.assertEqual(mock_request.call_count, 2)
+        self.assertEqual(WBCategoryNode.objects.count(), 5)
+        self.assertEqual(WBCategoryNode.objects.filter(path__startswith="/1/").count(), 4)
+
+
+class CategorySearchTests(TestCase):
+    def setUp(self):
+        self.index = CategorySearchIndex(CategoryIndex(flatten(category_tree())))
+
+    def test_trigrams_match_pg_trgm(self):
+        self.assertEqual(trigrams("Ёж"), {"  е", " еж", "еж "})
+        self.assertEqual(normalize("Платья, вечерние!"), "платья вечерние")
+
+    def test_ranked_prefix_and_fuzzy_matches(self):
+        self.assertEqual([m.id for m in self.index.search("плат")], [10])
+        self.assertEqual(self.index.search("вечер")[0].path, "Одежда / Платья / Вечерние")
+        self.assertEqual(self.index.search("Обувь")[0].score, 4.0)
+        # Опечатка находится по триграммам
+        self.assertEqual([m.id for m in self.index.search("платя")], [10])
+        self.assertEqual(self.index.search("xyz"), [])
+
+    def test_search_endpoint_over_loaded_tree(self):
+        response = WBResponse(success=True, data=category_tree())
+        with patch.object(WBCategoriesClient, '_request', return_value=response) as mock_request:
+            self.assertEqual(json.loads(self.client.get("/categories/search/", {"q": "брю"}).content)["items"], [])
+            mock_request.assert_not_called()
+            call_command("sync_wb_categories", stdout=io.StringIO())
+
+        data = json.loads(self.client.get("/categories/search/", {"q": "брю"}).content)
+        self.assertEqual(data["items"][0]["id"], 2)
+        self.assertEqual(data["items"][0]["path"], "Одежда / Брюки")
+        for limit in ("a", "-1", "101"):
+            self.assertEqual(self.client.get("/categories/search/", {"q": "x", "limit": limit}).status_code, 400)
+
+    @skipUnless(connection.vendor == 'postgresql', "pg_trgm доступен только в PostgreSQL")
+    def test_db_search_uses_trigram_operator(self):
+        sync_category_tree(category_tree())
+        with CaptureQueriesContext(connection) as queries:
+            matches = search_db("платя", 10, 0.3)
+
+        self.assertEqual([m.id for m in matches], [10])
+        self.assertEqual(matches[0].path, "Одежда / Платья")
+        sql = next(query["sql"] for query in queries if "SIMILARITY(" in query["sql"].upper())
+        self.assertIn(" % ", sql)
@@ -1,5 +1,8 @@
 from django.urls import path
-from .views import DashboardView, OrdersView, CategoriesView
+from .views import (
+    AsyncCategoriesView, AsyncDashboardView, AsyncOrdersView, CategoriesView, DashboardView, OrdersView, OverviewView,
+    CategorySearchView, ProductListAPIView,
+)
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -7,6 +10,12 @@ urlpatterns = [
     path('dashboard/', DashboardView.as_view(), name='wb_dashboard'),
     path('orders/', OrdersView.as_view(), name='wb_orders'),
     path('categories/', CategoriesView.as_view(), name='wb_categories'),
+    path('categories/search/', CategorySearchView.as_view(), name='wb_categories_search'),
+    path('overview/', OverviewView.as_view(), name='wb_overview'),
+    path('async/dashboard/', AsyncDashboardView.as_view(), name='wb_dashboard_async'),
+    path('async/orders/', AsyncOrdersView.as_view(), name='wb_orders_async'),
+    path('async/categories/', AsyncCategoriesView.as_view(), name='wb_categories_async'),
+    path('api/products/', ProductListAPIView.as_view(), name='wb_products_api'),
 ]
 
 if settings.DEBUG:
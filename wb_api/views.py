@@ -1,8 +1,14 @@
 # wb_api/views.py
+from django.shortcuts import render
+from django.views import View
 from django.views.generic import TemplateView
 from wb_api.client.orders import WBOrdersClient
 from wb_api.client.products import WBProductsClient
 from wb_api.client.categories import WBCategoriesClient
+from wb_api.category_search import search_categories, search_options
+from wb_api.codec import JSONResponse
+from wb_api.fragments import render_sections
+from wb_api.listing import ListingError, list_products
 
 
 class DashboardView(TemplateView):
@@ -53,4 +59,73 @@ class CategoriesView(TemplateView):
             context["error"] = response.error
             context["categories"] = []
 
-        return context
\ No newline at end of file
+        return context
+
+
+class OverviewView(View):
+    """
+    Асинхронная страница из разделов: разделы загружаются одновременно,
+    а их HTML кэшируется по версии записи кэша API (см. wb_api.fragments)
+    """
+    template_name = 'wb_api/overview.html'
+    title = 'Обзор Wildberries'
+    sections = ('products', 'orders', 'categories')
+
+    async def get(self, request, *args, **kwargs):
+        fragments = await render_sections(self.sections)
+        return render(request, self.template_name, {
+            'title': self.title,
+            'fragments': [fragments[name] for name in self.sections],
+        })
+
+
+class AsyncDashboardView(OverviewView):
+    title = 'Товары Wildberries'
+    sections = ('products',)
+
+
+class AsyncOrdersView(OverviewView):
+    title = 'Заказы Wildberries'
+    sections = ('orders',)
+
+
+class AsyncCategoriesView(OverviewView):
+    title = 'Категории Wildberries'
+    sections = ('categories',)
+
+
+class ProductListAPIView(View):
+    """
+    JSON-листинг товаров из WBProduct с фильтрами, сортировкой и курсором
+    (параметры - см. wb_api.listing.list_products)
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            page = list_products(request.GET)
+        except ListingError as e:
+            return JSONResponse({'error': str(e)}, status=400)
+        return JSONResponse(page.as_dict())
+
+
+class CategorySearchView(View):
+    """
+    JSON-поиск категорий по части названия: ?q=...&limit=...
+
+    Ищет по уже загруженному дереву (задача sync_wb_categories_task или
+    команда sync_wb_categories), к API не обращается.
+    """
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get('q', '').strip()
+        max_limit = search_options()['max_limit']
+        try:
+            limit = int(request.GET.get('limit') or 0) or None
+        except ValueError:
+            return JSONResponse({'error': 'Invalid limit'}, status=400)
+        if limit is not None and not 1 <= limit <= max_limit:
+            return JSONResponse({'error': f'limit must be between 1 and {max_limit}'}, status=400)
+        if not query:
+            return JSONResponse({'query': query, 'items': []})
+        matches = search_categories(query, limit)
+        return JSONResponse({'query': query, 'items': [match.as_dict() for match in matches]})